@@ -0,0 +1,249 @@
+"""Probe scheduling driven by Claude Code activity (inotify on ~/.claude)."""
+
+import ctypes
+import os
+import select
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from .models import UsageSnapshot
+from .parser import parse_reset_time
+from .transcripts import projects_dir
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+IN_IGNORED = 0x00008000
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event header: wd, mask, cookie, len (name follows)
+_EVENT = struct.Struct("iIII")
+
+# Longest single wait, so a stop request is noticed promptly
+_MAX_WAIT = 1.0
+
+# Seconds after a limit resets before probing, so the new window shows up
+RESET_GRACE = 30
+
+
+def claude_dir() -> Path:
+    """Claude Code's state directory ($CLAUDE_CONFIG_DIR or ~/.claude)."""
+    return projects_dir().parent
+
+
+class InotifyWatcher:
+    """
+    Reports writes under the Claude state directory via inotify.
+
+    Watches the directory itself, its projects/ directory and every project
+    directory in it, adding watches for project directories created later.
+    """
+
+    def __init__(self, root: Path | None = None) -> None:
+        self.root = Path(root or claude_dir())
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._dirs: dict[int, Path] = {}
+        self._watch(self.root)
+        self._watch_projects()
+
+    def _watch(self, path: Path) -> None:
+        """Add a watch on one directory (missing directories are skipped)."""
+        wd = self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = path
+
+    def _watch_projects(self) -> None:
+        """Watch projects/ and the project directories in it."""
+        projects = self.root / "projects"
+        if projects in self._dirs.values():
+            return
+        self._watch(projects)
+        try:
+            for child in projects.iterdir():
+                if child.is_dir():
+                    self._watch(child)
+        except OSError:
+            pass
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait up to timeout seconds for activity.
+
+        Returns:
+            True if anything under the directory was written
+        """
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        return bool(ready) and self.drain()
+
+    def drain(self) -> bool:
+        """Consume pending events; returns True if there were any."""
+        seen = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return seen
+            seen = True
+            self._handle(data)
+
+    def _handle(self, data: bytes) -> None:
+        """Follow new directories and forget removed ones."""
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+            elif mask & IN_CREATE and mask & IN_ISDIR and wd in self._dirs:
+                parent = self._dirs[wd]
+                if parent == self.root and name == b"projects":
+                    self._watch_projects()
+                elif parent == self.root / "projects":
+                    self._watch(parent / os.fsdecode(name))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Fallback for systems without inotify: compares file sizes and mtimes.
+
+    Rescans at most every poll_interval seconds.
+    """
+
+    def __init__(self, root: Path | None = None, poll_interval: float = 5.0) -> None:
+        self.root = Path(root or claude_dir())
+        self.poll_interval = poll_interval
+        self._signature = self._scan()
+        self._scanned_at = time.monotonic()
+
+    def _scan(self) -> frozenset:
+        """Size and mtime of every file the inotify watcher would cover."""
+        signature = set()
+        for pattern in ("*", "projects/*/*"):
+            for path in self.root.glob(pattern):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if not path.is_dir():
+                    signature.add((str(path), stat.st_size, stat.st_mtime_ns))
+        return frozenset(signature)
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(max(0.0, timeout))
+        if time.monotonic() - self._scanned_at < self.poll_interval:
+            return False
+        return self.drain()
+
+    def drain(self) -> bool:
+        signature = self._scan()
+        self._scanned_at = time.monotonic()
+        changed = signature != self._signature
+        self._signature = signature
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def open_watcher(root: Path | None = None) -> InotifyWatcher | PollingWatcher:
+    """An inotify watcher where available, else a polling one."""
+    try:
+        return InotifyWatcher(root)
+    except (AttributeError, OSError):
+        return PollingWatcher(root)
+
+
+def _next_reset(snapshot: UsageSnapshot | None, now: float) -> float | None:
+    """Epoch seconds of the earliest upcoming limit reset shown in snapshot."""
+    if snapshot is None:
+        return None
+    reference = datetime.fromtimestamp(now).astimezone()
+    upcoming = [
+        reset.timestamp()
+        for text in (snapshot.session_reset, snapshot.weekly_reset)
+        if text and (reset := parse_reset_time(text, reference)) is not None
+    ]
+    future = [t for t in upcoming if t > now]
+    return min(future) if future else None
+
+
+class ActivityTrigger:
+    """
+    Decides when a watch loop should probe next, based on Claude activity.
+
+    Probes debounce seconds after activity stops, at most busy_interval
+    seconds apart while activity continues, shortly after a limit resets,
+    and otherwise only every idle_interval seconds.
+    """
+
+    def __init__(
+        self,
+        watcher: InotifyWatcher | PollingWatcher,
+        debounce: float = 15,
+        busy_interval: float = 300,
+        idle_interval: float = 3600,
+    ) -> None:
+        self.watcher = watcher
+        self.debounce = debounce
+        self.busy_interval = busy_interval
+        self.idle_interval = idle_interval
+        self.last_reason = "start"
+        self._snapshot: UsageSnapshot | None = None
+
+    def observe(self, snapshot: UsageSnapshot) -> UsageSnapshot:
+        """
+        Note a fresh snapshot (for reset times); returns it for chaining.
+
+        Events caused by the probe itself (claude writes its own state) are
+        discarded.
+        """
+        self.watcher.drain()
+        snapshot.diagnostics = {**snapshot.diagnostics, "trigger": self.last_reason}
+        if not snapshot.error:
+            self._snapshot = snapshot
+        return snapshot
+
+    def wait(self, stop: threading.Event) -> None:
+        """Block until the next probe is due or stop is set."""
+        start = time.monotonic()
+        deadline = start + self.idle_interval
+        reason = "idle"
+        reset_at = _next_reset(self._snapshot, time.time())
+        if reset_at is not None:
+            reset_deadline = start + reset_at - time.time() + RESET_GRACE
+            if reset_deadline < deadline:
+                deadline, reason = reset_deadline, "reset"
+
+        first_activity = last_activity = None
+        while not stop.is_set():
+            now = time.monotonic()
+            if last_activity is not None:
+                due = min(last_activity + self.debounce, first_activity + self.busy_interval)
+                if now >= due:
+                    self.last_reason = "activity"
+                    return
+            else:
+                due = deadline
+                if now >= due:
+                    self.last_reason = reason
+                    return
+            if self.watcher.wait(min(due - now, _MAX_WAIT)):
+                last_activity = time.monotonic()
+                first_activity = first_activity or last_activity
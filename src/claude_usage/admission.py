@@ -0,0 +1,129 @@
+"""Host-wide admission control for probes: a lock-file semaphore shared by all users."""
+
+import fcntl
+import os
+import random
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+# World-writable with the sticky bit, like /tmp: everyone can add slot
+# files, nobody can remove someone else's
+_SHARED_DIR_MODE = 0o1777
+
+# Slot files must be readable by every user, who open them to flock()
+_SLOT_FILE_MODE = 0o644
+
+# Pause between scans for a free slot, randomized so waiters don't retry in step
+_RETRY_DELAY = 0.5
+
+
+def shared_lock_dir() -> Path:
+    """Default directory for probe slot files, shared by every user on the host."""
+    return Path(tempfile.gettempdir()) / "claudebar-probes"
+
+
+def _ensure_shared_dir(path: Path) -> None:
+    """Create the shared directory (sticky, world-writable) if it is missing."""
+    try:
+        path.mkdir(parents=True)
+    except FileExistsError:
+        return
+    # mkdir() is subject to the umask
+    os.chmod(path, _SHARED_DIR_MODE)
+
+
+class ProbeSlots:
+    """
+    Counting semaphore over slot-<n>.lock files in a shared directory.
+
+    Holding an flock() on one of max_concurrent slot files is the permit to
+    probe. The kernel drops the lock when the holder exits, so a crashed
+    probe never leaks its slot.
+    """
+
+    def __init__(self, max_concurrent: int, directory: Path | None = None) -> None:
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.directory = Path(directory or shared_lock_dir())
+
+    def _open(self, slot: int) -> int:
+        """Open (creating if needed) a slot file without following symlinks."""
+        path = self.directory / f"slot-{slot}.lock"
+        fd = os.open(
+            path, os.O_RDONLY | os.O_CREAT | os.O_NOFOLLOW | os.O_CLOEXEC, _SLOT_FILE_MODE
+        )
+        try:
+            # O_CREAT is subject to the umask; fix up files this user created
+            stat = os.fstat(fd)
+            if stat.st_uid == os.getuid() and stat.st_mode & 0o777 != _SLOT_FILE_MODE:
+                os.fchmod(fd, _SLOT_FILE_MODE)
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+
+    def try_acquire(self) -> tuple[int, int] | None:
+        """
+        Take a free slot without waiting.
+
+        Returns:
+            (slot, fd) to pass to release(), or None if all slots are busy
+        """
+        _ensure_shared_dir(self.directory)
+        # Start at a random slot so waiters don't all contend for slot 0
+        first = random.randrange(self.max_concurrent)
+        for offset in range(self.max_concurrent):
+            slot = (first + offset) % self.max_concurrent
+            try:
+                fd = self._open(slot)
+            except OSError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            return slot, fd
+        return None
+
+    def release(self, fd: int) -> None:
+        """Give a slot back."""
+        os.close(fd)
+
+    @contextmanager
+    def acquire(self, timeout: float) -> Iterator[int]:
+        """
+        Hold a slot for the duration of the with block.
+
+        Yields:
+            The slot number
+
+        Raises:
+            TimeoutError: If no slot became free within timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        while (held := self.try_acquire()) is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"all {self.max_concurrent} host-wide probe slots busy for {timeout:g}s"
+                )
+            time.sleep(min(remaining, random.uniform(0.5, 1.5) * _RETRY_DELAY))
+        slot, fd = held
+        try:
+            yield slot
+        finally:
+            self.release(fd)
+
+
+def jitter_delay(max_jitter: float) -> float:
+    """Sleep a random 0..max_jitter seconds so aligned timers spread out; returns the delay."""
+    if max_jitter <= 0:
+        return 0.0
+    delay = random.uniform(0, max_jitter)
+    time.sleep(delay)
+    return delay
@@ -0,0 +1,359 @@
+"""Pluggable sources of usage snapshots and a fallback chain over them."""
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Protocol
+
+from .admission import ProbeSlots, jitter_delay
+from .backoff import CircuitBreaker
+from .codec import expand
+from .daemon import daemon_starting, request_snapshot, spawn_daemon
+from .models import UsageSnapshot
+from .parser import parse_usage
+from .probe import DeadlineExceeded, ProbeOptions, ProbeResult, probe_usage
+from .shm import read_shared
+from .state import load_latest
+from .transcripts import TranscriptIndex, estimate
+
+
+class BackendUnavailable(Exception):
+    """A backend cannot answer right now (missing, not running, too stale, ...)."""
+
+
+class Backend(Protocol):
+    """A source of usage snapshots."""
+
+    name: str
+
+    def fetch(self) -> UsageSnapshot:
+        """
+        Return a current snapshot.
+
+        Raises:
+            BackendUnavailable: If this source cannot answer; the chain moves on
+        """
+        ...
+
+
+@dataclass
+class Attempt:
+    """One backend tried by the chain."""
+
+    backend: str
+    elapsed: float
+    error: str | None = None
+
+
+@dataclass
+class ChainResult:
+    """The answer of a BackendChain and how it was obtained."""
+
+    snapshot: UsageSnapshot
+    backend: str
+    elapsed: float
+    attempts: list[Attempt] = field(default_factory=list)
+
+
+class ProbeDeferred(BackendUnavailable):
+    """The probe was not run because the host is busy with other probes."""
+
+
+class ProbeTimedOut(BackendUnavailable):
+    """The probe ran out of time (deadline or per-step timeout) before the Usage view rendered."""
+
+
+class ChainExhausted(BackendUnavailable):
+    """No backend in the chain could answer."""
+
+    def __init__(self, attempts: list[Attempt], last: BackendUnavailable | None = None) -> None:
+        self.attempts = attempts
+        self.last = last
+        reason = attempts[-1].error if attempts else "no backends configured"
+        super().__init__(reason)
+
+
+class BackendChain:
+    """
+    Tries backends in order (cheapest first) until one answers.
+
+    A backend is skipped only when it raises BackendUnavailable; other
+    exceptions propagate.
+    """
+
+    def __init__(self, backends: list[Backend]) -> None:
+        self.backends = backends
+
+    def fetch(self) -> ChainResult:
+        """
+        Return the first available snapshot.
+
+        Raises:
+            ChainExhausted: If every backend was unavailable
+        """
+        attempts = []
+        last = None
+        for backend in self.backends:
+            started = time.monotonic()
+            try:
+                snapshot = backend.fetch()
+            except BackendUnavailable as e:
+                attempts.append(Attempt(backend.name, time.monotonic() - started, str(e)))
+                last = e
+                continue
+            elapsed = time.monotonic() - started
+            attempts.append(Attempt(backend.name, elapsed))
+            snapshot.diagnostics = {
+                **snapshot.diagnostics,
+                "backend": backend.name,
+                "backend_seconds": round(elapsed, 3),
+            }
+            return ChainResult(snapshot, backend.name, elapsed, attempts)
+        raise ChainExhausted(attempts, last)
+
+
+def _with_cached_account(snapshot: UsageSnapshot) -> UsageSnapshot:
+    """
+    Fill account fields the probe did not capture from the last good snapshot.
+
+    Happens when the Status view was skipped or its parallel session failed.
+    """
+    if snapshot.error or (snapshot.account_tier and snapshot.account_email):
+        return snapshot
+    latest = load_latest()
+    if latest is not None:
+        snapshot.account_tier = snapshot.account_tier or latest.account_tier
+        snapshot.account_email = snapshot.account_email or latest.account_email
+    return snapshot
+
+
+# Snapshot fields each CLI view provides (Opus is not shown on every plan)
+_VIEW_FIELDS = {
+    "usage": ("session_percent", "session_reset", "weekly_percent", "weekly_reset"),
+    "status": ("account_tier", "account_email"),
+}
+
+
+def _missing_fields(snapshot: UsageSnapshot, views: list[str]) -> list[str]:
+    """Fields of the views a probe did not capture that are still unknown."""
+    return [
+        name
+        for view in views
+        for name in _VIEW_FIELDS[view]
+        if getattr(snapshot, name) is None
+    ]
+
+
+class ProbeBackend:
+    """Spawns claude in a PTY (slowest, always authoritative)."""
+
+    name = "probe"
+
+    def __init__(
+        self,
+        options: ProbeOptions | None = None,
+        breaker: CircuitBreaker | None = None,
+        after_probe: Callable[[UsageSnapshot, float], None] | None = None,
+        slots: ProbeSlots | None = None,
+        slot_wait: float = 60,
+        jitter: float = 0,
+    ) -> None:
+        self.options = options or ProbeOptions()
+        self.breaker = breaker
+        self.after_probe = after_probe
+        self.slots = slots
+        self.slot_wait = slot_wait
+        self.jitter = jitter
+
+    def fetch(self) -> UsageSnapshot:
+        if self.breaker is not None and self.breaker.is_open():
+            raise BackendUnavailable(
+                f"backing off after {self.breaker.state.consecutive_failures} failures"
+            )
+        admission = {}
+        jitter = jitter_delay(self.jitter)
+        if jitter:
+            admission["jitter_seconds"] = round(jitter, 3)
+        if self.slots is None:
+            result, duration = self._probe()
+        else:
+            waiting = time.monotonic()
+            try:
+                with self.slots.acquire(self.slot_wait) as slot:
+                    admission["slot"] = slot
+                    admission["slot_wait_seconds"] = round(time.monotonic() - waiting, 3)
+                    result, duration = self._probe()
+            except TimeoutError as e:
+                # Not the probe's fault: the breaker is left alone
+                raise ProbeDeferred(str(e)) from e
+        snapshot = _with_cached_account(parse_usage(result.output, result.status_output))
+        if snapshot.session_percent is None and snapshot.weekly_percent is None:
+            # Nothing usable, even if no exception said so: a failed probe
+            if "usage" in result.missing_views:
+                self._fail(ProbeTimedOut("Usage view did not render in time"), result, duration)
+            self._fail(BackendUnavailable("Could not parse usage data"), result, duration)
+        snapshot.missing_fields = _missing_fields(snapshot, result.missing_views)
+        snapshot.diagnostics = {**result.diagnostics, **admission}
+        self._record(snapshot, duration)
+        return snapshot
+
+    def _probe(self) -> tuple[ProbeResult, float]:
+        """Run the probe, reporting failures to after_probe; returns the result and its duration."""
+        started = time.monotonic()
+        try:
+            result = probe_usage(self.options)
+        except (FileNotFoundError, RuntimeError) as e:
+            self._record(UsageSnapshot(error=str(e)), time.monotonic() - started)
+            if isinstance(e, DeadlineExceeded):
+                raise ProbeTimedOut(str(e)) from e
+            raise BackendUnavailable(str(e)) from e
+        return result, time.monotonic() - started
+
+    def _fail(self, error: BackendUnavailable, result: ProbeResult, duration: float) -> None:
+        """Report a probe that produced nothing usable to after_probe, then raise error."""
+        self._record(UsageSnapshot(error=str(error), diagnostics=result.diagnostics), duration)
+        raise error
+
+    def _record(self, snapshot: UsageSnapshot, duration: float) -> None:
+        """Report the probe's outcome to after_probe, if set."""
+        if self.after_probe is not None:
+            self.after_probe(snapshot, duration)
+
+
+class DaemonBackend:
+    """
+    Asks a running claude-usage daemon over its Unix socket.
+
+    With a spawn command, a missing daemon is started on demand and its
+    first snapshot awaited for up to spawn_timeout seconds. The same wait
+    applies to a daemon that is still starting (socket activation, or
+    started by another client); a running one must answer within timeout.
+    """
+
+    name = "daemon"
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        max_age: float = 600,
+        timeout: float = 1.0,
+        spawn: list[str] | None = None,
+        spawn_timeout: float = 45,
+    ) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.timeout = timeout
+        self.spawn = spawn
+        self.spawn_timeout = spawn_timeout
+
+    def fetch(self) -> UsageSnapshot:
+        try:
+            try:
+                starting = daemon_starting(self.path, self.spawn_timeout)
+                timeout = self.spawn_timeout if starting else self.timeout
+                snapshot, captured_at = request_snapshot(self.path, timeout)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if not self.spawn:
+                    raise
+                spawn_daemon(self.spawn)
+                snapshot, captured_at = self._await_spawned()
+        except (OSError, ValueError) as e:
+            raise BackendUnavailable(f"daemon: {e}") from e
+        if time.time() - captured_at > self.max_age:
+            raise BackendUnavailable("daemon snapshot too old")
+        if snapshot.error:
+            raise BackendUnavailable(f"daemon: {snapshot.error}")
+        return snapshot
+
+    def _await_spawned(self) -> tuple[UsageSnapshot, float]:
+        """Wait for a just-started daemon to listen, then for its first snapshot."""
+        deadline = time.monotonic() + self.spawn_timeout
+        while True:
+            try:
+                return request_snapshot(self.path, max(self.timeout, deadline - time.monotonic()))
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
+
+
+class SharedMemoryBackend:
+    """Reads the snapshot a daemon publishes into shared memory (no IPC round-trip)."""
+
+    name = "shm"
+
+    def __init__(self, path: Path | None = None, max_age: float = 600) -> None:
+        self.path = path
+        self.max_age = max_age
+
+    def fetch(self) -> UsageSnapshot:
+        try:
+            shared = read_shared(self.path)
+        except (OSError, ValueError) as e:
+            raise BackendUnavailable(f"shm: {e}") from e
+        if shared is None:
+            raise BackendUnavailable("shm: no snapshot yet")
+        if time.time() - shared.captured_at > self.max_age:
+            raise BackendUnavailable("shared snapshot too old")
+        if shared.error:
+            raise BackendUnavailable(f"shm: {shared.error}")
+        return expand(shared)
+
+
+class CacheBackend:
+    """Serves the latest good snapshot persisted by an earlier probe."""
+
+    name = "cache"
+
+    def __init__(self, max_age: float = 300) -> None:
+        self.max_age = max_age
+
+    def fetch(self) -> UsageSnapshot:
+        latest = load_latest()
+        if latest is None:
+            raise BackendUnavailable("no cached snapshot")
+        if time.time() - latest.captured_at > self.max_age:
+            raise BackendUnavailable("cached snapshot too old")
+        return expand(latest)
+
+
+class ReplayBackend:
+    """Parses a previously captured raw CLI output (e.g. from --dump-raw)."""
+
+    name = "replay"
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+
+    def fetch(self) -> UsageSnapshot:
+        try:
+            raw_text = self.path.read_text(encoding="utf-8")
+        except OSError as e:
+            raise BackendUnavailable(f"replay: {e}") from e
+        return parse_usage(raw_text)
+
+
+class TranscriptBackend:
+    """Estimates from local transcripts, calibrated by recent probes."""
+
+    name = "transcripts"
+
+    def __init__(self, max_calibration_age: float = 3600) -> None:
+        self.max_calibration_age = max_calibration_age
+
+    def fetch(self) -> UsageSnapshot:
+        latest = load_latest()
+        if latest is None or time.time() - latest.captured_at > self.max_calibration_age:
+            raise BackendUnavailable("calibration too old")
+        index = TranscriptIndex.load()
+        index.refresh()
+        index.save()
+        snapshot = estimate(index)
+        if snapshot is None:
+            raise BackendUnavailable("not calibrated")
+        return snapshot
+
+
+# Backend names accepted by --backends, cheapest first
+BACKEND_NAMES = ("shm", "daemon", "cache", "replay", "transcripts", "probe")
@@ -0,0 +1,89 @@
+"""Failure backoff and circuit breaker around the probe, persisted across runs."""
+
+import time
+from dataclasses import asdict, dataclass, fields
+
+from .state import load_json, save_json
+
+FAILURE_STATE_FILE = "failure-state.json"
+
+# The delay stops doubling after this many further failures (max_delay caps it long before)
+MAX_DOUBLINGS = 32
+
+
+@dataclass
+class FailureState:
+    """Consecutive probe failures and when the next probe is allowed."""
+
+    consecutive_failures: int = 0
+    last_error: str | None = None
+    last_failure_at: float = 0.0
+    retry_at: float = 0.0
+
+    @classmethod
+    def load(cls) -> "FailureState":
+        """Load persisted state (a clean state if none)."""
+        data = load_json(FAILURE_STATE_FILE)
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def save(self) -> None:
+        """Persist state."""
+        save_json(FAILURE_STATE_FILE, asdict(self))
+
+
+class CircuitBreaker:
+    """
+    Stops probing after repeated failures, with exponential backoff.
+
+    After `threshold` consecutive failures the breaker opens and no probe
+    is attempted until retry_at. The delay doubles with every further
+    failure (base_delay, 2x, 4x, ... capped at max_delay). Once it expires
+    one probe is let through; success closes the breaker.
+    """
+
+    def __init__(
+        self,
+        state: FailureState | None = None,
+        threshold: int = 2,
+        base_delay: float = 60,
+        max_delay: float = 3600,
+    ) -> None:
+        self.state = state if state is not None else FailureState.load()
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_open(self, now: float | None = None) -> bool:
+        """True if probing should be skipped right now."""
+        now = time.time() if now is None else now
+        return self.state.consecutive_failures >= self.threshold and now < self.state.retry_at
+
+    def retry_in(self, now: float | None = None) -> float:
+        """Seconds until the next probe is allowed (0 if allowed now)."""
+        now = time.time() if now is None else now
+        return max(0.0, self.state.retry_at - now) if self.is_open(now) else 0.0
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful probe."""
+        if self.state.consecutive_failures:
+            self.state = FailureState()
+            self.state.save()
+
+    def record_failure(self, error: str, now: float | None = None) -> None:
+        """Count a failed probe and push retry_at out exponentially."""
+        now = time.time() if now is None else now
+        failures = self.state.consecutive_failures + 1
+        retry_at = 0.0
+        if failures >= self.threshold:
+            # A float base_delay overflows after about 1000 doublings
+            doublings = min(failures - self.threshold, MAX_DOUBLINGS)
+            delay = min(self.max_delay, self.base_delay * 2**doublings)
+            retry_at = now + delay
+        self.state = FailureState(
+            consecutive_failures=failures,
+            last_error=error,
+            last_failure_at=now,
+            retry_at=retry_at,
+        )
+        self.state.save()
@@ -2,17 +2,472 @@
 
 import argparse
 import json
+import os
 import sys
+import threading
+import time
+from collections.abc import Callable
 from importlib.metadata import version
 
-from .probe import fetch_usage_raw
-from .parser import parse_usage
-from .formatters import format_waybar, format_plain, format_json
+from .activity import ActivityTrigger, open_watcher
+from .admission import ProbeSlots
+from .backends import (
+    BACKEND_NAMES,
+    Backend,
+    BackendChain,
+    CacheBackend,
+    ChainExhausted,
+    DaemonBackend,
+    ProbeBackend,
+    ProbeDeferred,
+    ProbeTimedOut,
+    ReplayBackend,
+    SharedMemoryBackend,
+    TranscriptBackend,
+)
+from .backoff import CircuitBreaker
+from .codec import compact, expand
+from .daemon import (
+    SnapshotServer,
+    acquire_daemon_lock,
+    activation_socket,
+    request_memory_report,
+    stop_when_idle,
+    subscribe,
+)
+from .hooks import DEFAULT_MIN_INTERVAL, Hook, HookRunner, parse_hook_spec
+from .memory import RAW_POLICIES, MemoryMonitor, RawRetention, format_memory_report
+from .metrics import make_server, parse_listen_address, record_probe, write_textfile
+from .probe import PROBE_PROFILES, STATUS_SOURCES, ProbeOptions, probe_usage
+from .formatters import FORMATS, format_waybar, format_json, render
 from .models import UsageSnapshot
+from .shm import SharedSnapshotWriter
+from .sinks import Sink, emit, parse_output_spec
+from .state import load_latest, save_latest
+from .team import TeamIndex, TeamLog, default_host, format_team
+from .transcripts import TranscriptIndex, calibrate
+from .trend import DEFAULT_HOURS, record_trend, with_trend
+from .watch import STREAMING_FORMATS, run_watch
 
 
-def main() -> int:
-    """Main entry point for the CLI."""
+# Idle timeout for daemons started by --spawn-daemon
+DEFAULT_SPAWNED_IDLE_EXIT = 900
+
+# Seconds between reconnection attempts of --subscribe
+SUBSCRIBE_RETRY = 5
+
+
+def _output_spec(spec: str) -> Sink:
+    """argparse type for --output."""
+    try:
+        return parse_output_spec(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _hook_spec(spec: str) -> Hook:
+    """argparse type for --hook."""
+    try:
+        return parse_hook_spec(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _report_error(args: argparse.Namespace, message: str) -> None:
+    """Report a failure to every --output sink, or to stdout/stderr as before."""
+    error_snapshot = UsageSnapshot(error=message)
+    if args.output:
+        emit(error_snapshot, args.output)
+    elif args.format == "waybar":
+        print(json.dumps(format_waybar(error_snapshot)))
+    else:
+        print(f"Error: {message}", file=sys.stderr)
+
+
+def _backend_list(value: str) -> list[str]:
+    """argparse type for --backends."""
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in BACKEND_NAMES]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(
+            f"unknown backend '{','.join(unknown)}' (choose from {', '.join(BACKEND_NAMES)})"
+        )
+    return names
+
+
+def _non_negative_int(value: str) -> int:
+    """argparse type for counts where 0 means none."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid count '{value}'")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"count must be 0 or more, got {number}")
+    return number
+
+
+def _probe_options(args: argparse.Namespace) -> ProbeOptions:
+    """Probe settings from the command line."""
+    return ProbeOptions(
+        timeout=args.timeout,
+        low_impact=args.low_impact,
+        io_idle=args.io_idle,
+        max_address_space=args.limit_memory * 1024 * 1024 if args.limit_memory else None,
+        max_cpu_seconds=args.limit_cpu,
+        max_open_files=args.limit_files,
+        status=args.status,
+        adaptive_timeouts=args.adaptive_timeouts,
+        deadline=args.deadline,
+        profile=args.profile,
+    )
+
+
+def _breaker(args: argparse.Namespace) -> CircuitBreaker:
+    """Circuit breaker configured from the command line, with persisted state."""
+    return CircuitBreaker(
+        threshold=args.backoff_threshold,
+        base_delay=args.backoff_base,
+        max_delay=args.backoff_max,
+    )
+
+
+def _held_snapshot(args: argparse.Namespace) -> UsageSnapshot | None:
+    """
+    While the circuit breaker is open, return what to show instead of probing.
+
+    Returns:
+        The last good snapshot marked stale (or an error snapshot if there is
+        none), or None if a probe should be attempted
+    """
+    if args.no_backoff:
+        return None
+    breaker = _breaker(args)
+    if not breaker.is_open():
+        return None
+
+    return _stale_snapshot(f"{breaker.state.last_error} (retry in {round(breaker.retry_in())}s)")
+
+
+def _stale_snapshot(reason: str) -> UsageSnapshot:
+    """The last good snapshot marked stale for reason, or an error snapshot if there is none."""
+    latest = load_latest()
+    if latest is None:
+        return UsageSnapshot(error=reason)
+    snapshot = expand(latest)
+    last_update = time.strftime("%H:%M", time.localtime(latest.captured_at))
+    snapshot.stale_reason = f"{reason}, last update {last_update}"
+    return snapshot
+
+
+def _backend_names(args: argparse.Namespace) -> list[str]:
+    """Backends to try, in order; --estimate puts transcripts before the probe."""
+    names = list(args.backends or (["replay"] if args.replay else ["probe"]))
+    if args.estimate and "transcripts" not in names:
+        position = names.index("probe") if "probe" in names else len(names)
+        names.insert(position, "transcripts")
+    return names
+
+
+def _build_chain(args: argparse.Namespace, exclude: tuple[str, ...] = ()) -> BackendChain:
+    """Backend chain configured from the command line."""
+    backends: list[Backend] = []
+    for name in _backend_names(args):
+        if name in exclude:
+            continue
+        if name == "shm":
+            backends.append(SharedMemoryBackend(args.shm_file, max_age=args.max_age))
+        elif name == "daemon":
+            backends.append(
+                DaemonBackend(
+                    args.socket,
+                    max_age=args.max_age,
+                    spawn=_daemon_command(args) if args.spawn_daemon else None,
+                )
+            )
+        elif name == "cache":
+            backends.append(CacheBackend(max_age=args.max_age))
+        elif name == "replay":
+            if args.replay:
+                backends.append(ReplayBackend(args.replay))
+        elif name == "transcripts":
+            backends.append(TranscriptBackend(max_calibration_age=args.recalibrate_after))
+        elif name == "probe":
+            backends.append(
+                ProbeBackend(
+                    _probe_options(args),
+                    breaker=None if args.no_backoff else _breaker(args),
+                    after_probe=lambda snapshot, duration: _record_probe(args, snapshot, duration),
+                    slots=ProbeSlots(args.max_concurrent_probes, args.probe_lock_dir)
+                    if args.max_concurrent_probes
+                    else None,
+                    slot_wait=args.slot_wait,
+                    jitter=args.probe_jitter,
+                )
+            )
+    return BackendChain(backends)
+
+
+def _record_probe(args: argparse.Namespace, snapshot: UsageSnapshot, duration: float) -> None:
+    """Update persisted state after a probe: counters, backoff, latest good snapshot, metrics."""
+    try:
+        record_probe(duration, ok=snapshot.error is None, diagnostics=snapshot.diagnostics)
+        if not args.no_backoff:
+            if snapshot.error is None:
+                _breaker(args).record_success()
+            else:
+                _breaker(args).record_failure(snapshot.error)
+        if snapshot.error is None and (
+            snapshot.session_percent is not None or snapshot.weekly_percent is not None
+        ):
+            latest = compact(snapshot)
+            save_latest(latest)
+            if args.team_dir:
+                TeamLog(args.team_dir, args.host_name).append(latest)
+            if args.sparkline_hours > 0:
+                record_trend(snapshot, args.sparkline_hours)
+            if args.hook:
+                HookRunner(args.hook, args.hook_min_interval).observe(snapshot)
+            if "transcripts" in _backend_names(args):
+                index = TranscriptIndex.load()
+                index.refresh()
+                index.save()
+                calibrate(index, latest)
+        if args.metrics_textfile:
+            write_textfile(args.metrics_textfile)
+    except OSError as e:
+        # State is best effort; never let it break the bar output
+        print(f"Warning: could not save state: {e}", file=sys.stderr)
+
+
+def _fetch_snapshot(args: argparse.Namespace, exclude: tuple[str, ...] = ()) -> UsageSnapshot:
+    """
+    Get a snapshot from the backend chain, turning failures into an error snapshot.
+
+    When every backend is unavailable and the probe is backing off, was
+    deferred or ran out of --deadline, the last good snapshot is served
+    marked stale.
+    """
+    try:
+        snapshot = _build_chain(args, exclude).fetch().snapshot
+        return with_trend(snapshot, args.sparkline_hours) if args.sparkline_hours > 0 else snapshot
+    except ChainExhausted as e:
+        if isinstance(e.last, (ProbeDeferred, ProbeTimedOut)):
+            return _stale_snapshot(str(e.last))
+        return _held_snapshot(args) or UsageSnapshot(error=str(e))
+    except Exception as e:
+        return UsageSnapshot(error=f"Unexpected error: {e}")
+
+
+def _write_output(args: argparse.Namespace, snapshot: UsageSnapshot) -> int:
+    """Write a snapshot to stdout or every --output sink; returns the exit code."""
+    if args.dump_parsed:
+        print(json.dumps({**format_json(snapshot), "diagnostics": snapshot.diagnostics}, indent=2))
+        return 0
+
+    if not args.output:
+        print(render(snapshot, args.format))
+        return 0
+
+    # Fan the snapshot out to every --output sink
+    failed = emit(snapshot, args.output)
+    for error in failed:
+        print(f"Error: could not write output: {error}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _start_metrics_server(address: tuple[str, int]) -> None:
+    """Serve /metrics from the cached snapshot in a background thread."""
+    server = make_server(*address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def _watch(
+    args: argparse.Namespace,
+    fetch: Callable[[], UsageSnapshot],
+    sinks: list[Sink],
+    stop: threading.Event | None = None,
+) -> None:
+    """run_watch() on a fixed interval, or driven by Claude activity with --on-activity."""
+    if not args.on_activity:
+        run_watch(fetch, sinks, args.interval, stop)
+        return
+    watcher = open_watcher()
+    trigger = ActivityTrigger(
+        watcher,
+        debounce=args.debounce,
+        busy_interval=args.interval,
+        idle_interval=args.idle_interval,
+    )
+    try:
+        run_watch(lambda: trigger.observe(fetch()), sinks, args.interval, stop, wait=trigger.wait)
+    finally:
+        watcher.close()
+
+
+# Options about this process's own mode and outputs; everything else affects
+# probing and is passed on to a spawned daemon
+_NOT_FOR_DAEMON = frozenset(
+    {
+        "help",
+        "version",
+        "format",
+        "output",
+        "backends",
+        "replay",
+        "daemon",
+        "idle_exit",
+        "subscribe",
+        "spawn_daemon",
+        "aggregate",
+        "memory_report",
+        "watch",
+        "serve_metrics",
+        "dump_raw",
+        "dump_parsed",
+    }
+)
+
+
+def _argv_value(value) -> str:
+    """Inverse of an option's argparse type."""
+    if isinstance(value, Hook):
+        return f"{value.trigger}:{value.command}"
+    return str(value)
+
+
+def _daemon_command(args: argparse.Namespace) -> list[str]:
+    """Command line for a daemon started on demand by --spawn-daemon, with the caller's options."""
+    command = [sys.executable, "-m", "claude_usage.cli", "--daemon"]
+    command += ["--idle-exit", str(args.idle_exit or DEFAULT_SPAWNED_IDLE_EXIT)]
+    for action in _build_parser()._actions:
+        if not action.option_strings or action.dest in _NOT_FOR_DAEMON:
+            continue
+        flag, value = action.option_strings[0], getattr(args, action.dest)
+        if action.nargs == 0:
+            if value:
+                command.append(flag)
+        elif isinstance(value, list):
+            for item in value:
+                command += [flag, _argv_value(item)]
+        elif value is not None:
+            command += [flag, _argv_value(value)]
+    return command
+
+
+def _memory_monitor(args: argparse.Namespace) -> MemoryMonitor:
+    """Memory monitor for a resident mode, with the --keep-raw policy."""
+    return MemoryMonitor(RawRetention(args.keep_raw, args.keep_raw_count), trace=args.trace_memory)
+
+
+def _print_memory_report(args: argparse.Namespace) -> int:
+    """Print the running daemon's memory report."""
+    try:
+        report = request_memory_report(args.socket)
+    except (OSError, ValueError) as e:
+        print(f"Error: no memory report from the daemon: {e}", file=sys.stderr)
+        return 1
+    if args.format == "json":
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_memory_report(report))
+    return 0
+
+
+def _print_team(args: argparse.Namespace) -> int:
+    """Merge what the hosts appended to --aggregate since the last run and print the team view."""
+    if args.format not in ("waybar", "plain", "json"):
+        print("Error: --aggregate supports --format waybar, plain or json", file=sys.stderr)
+        return 1
+    index = TeamIndex.load(args.aggregate)
+    index.refresh()
+    try:
+        index.save()
+    except OSError as e:
+        print(f"Warning: could not save state: {e}", file=sys.stderr)
+    print(format_team(index.accounts(), args.format))
+    return 0
+
+
+def _run_subscribe(args: argparse.Namespace, sinks: list[Sink]) -> int:
+    """Write output whenever the daemon pushes a change, reconnecting if it goes away."""
+    updates = None
+
+    def fetch() -> UsageSnapshot:
+        nonlocal updates
+        try:
+            if updates is None:
+                updates = subscribe(args.socket)
+            return next(updates)[0]
+        except (OSError, ValueError) as e:
+            updates = None
+            return UsageSnapshot(error=f"daemon: {e}")
+
+    def wait(stop: threading.Event) -> None:
+        # A live subscription blocks in fetch() until the next change
+        if updates is None:
+            stop.wait(SUBSCRIBE_RETRY)
+
+    try:
+        run_watch(fetch, sinks, SUBSCRIBE_RETRY, wait=wait)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _run_daemon(args: argparse.Namespace) -> int:
+    """Probe every --interval seconds and publish the latest snapshot on the socket and in shm."""
+    lock = acquire_daemon_lock(args.socket)
+    if lock is None:
+        print("Error: a daemon is already serving this socket", file=sys.stderr)
+        return 1
+    monitor = _memory_monitor(args)
+    shared = SharedSnapshotWriter(args.shm_file)
+    server = SnapshotServer(
+        args.socket,
+        listener=activation_socket(),
+        memory_report=monitor.report,
+        last_access=shared.last_read,
+    )
+    stop = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    if args.idle_exit:
+        threading.Thread(
+            target=stop_when_idle, args=(server, args.idle_exit, stop), daemon=True
+        ).start()
+    if args.serve_metrics:
+        _start_metrics_server(args.serve_metrics)
+
+    def fetch() -> UsageSnapshot:
+        # The daemon never asks itself
+        snapshot = server.publish(monitor.observe(_fetch_snapshot(args, exclude=("shm", "daemon"))))
+        try:
+            return shared.publish_snapshot(snapshot)
+        except ValueError as e:
+            print(f"Warning: could not publish to shared memory: {e}", file=sys.stderr)
+            return snapshot
+
+    try:
+        _watch(args, fetch, args.output, stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+        shared.close()
+        os.close(lock)
+    return 0
+
+
+def _listen_address(value: str) -> tuple[str, int]:
+    """argparse type for --serve-metrics."""
+    try:
+        return parse_listen_address(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid address '{value}', expected [HOST:]PORT")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """The command line parser."""
     parser = argparse.ArgumentParser(
         description="Monitor Claude CLI usage for Waybar",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -20,6 +475,14 @@ def main() -> int:
 Examples:
   claude-usage                    # Output Waybar JSON
   claude-usage --format plain     # Human-readable output
+  claude-usage --output waybar --output json:/tmp/claude.json --output plain:/tmp/claude.fifo
+                                  # One probe, several outputs
+  claude-usage --format i3bar     # Resident i3bar/swaybar status_command
+  claude-usage --watch --format polybar
+                                  # Resident polybar tail=true module
+  claude-usage --daemon &         # Probe in the background ...
+  claude-usage --backends daemon,probe
+                                  # ... and answer from it, probing only if it is down
   claude-usage --dump-raw         # Debug: show raw CLI output
   claude-usage --dump-parsed      # Debug: show parsed data
         """,
@@ -32,16 +495,352 @@ Examples:
     )
     parser.add_argument(
         "--format",
-        choices=["waybar", "json", "plain"],
+        choices=FORMATS,
         default="waybar",
         help="Output format (default: waybar)",
     )
+    parser.add_argument(
+        "--output",
+        "-o",
+        metavar="FORMAT[:DEST]",
+        type=_output_spec,
+        action="append",
+        default=[],
+        help=(
+            "Write FORMAT to DEST: '-' for stdout (default), a file (replaced atomically) "
+            "or a FIFO. Repeatable; the CLI is probed once for all outputs. Overrides --format"
+        ),
+    )
     parser.add_argument(
         "--timeout",
         type=int,
         default=15,
         help="Seconds to wait for Claude CLI (default: 15)",
     )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Overall time limit for one probe, shared by all its steps. If it runs out after "
+            "the Usage view rendered, the probe returns what it has, marked partial"
+        ),
+    )
+    parser.add_argument(
+        "--adaptive-timeouts",
+        action="store_true",
+        help=(
+            "Give up on each probe step (startup, Usage, Status, exit) after twice its p99 "
+            "latency learned on this machine, instead of the fixed --timeout; needs a few "
+            "probes of history first"
+        ),
+    )
+    parser.add_argument(
+        "--low-impact",
+        action="store_true",
+        help="Run claude at reduced CPU (nice +10) and I/O priority",
+    )
+    parser.add_argument(
+        "--io-idle",
+        action="store_true",
+        help="With --low-impact, use the idle I/O class instead of lowest best-effort",
+    )
+    parser.add_argument(
+        "--limit-memory",
+        type=int,
+        metavar="MB",
+        help="Cap claude's address space (RLIMIT_AS); Node reserves a lot, so be generous",
+    )
+    parser.add_argument(
+        "--limit-cpu",
+        type=int,
+        metavar="SECONDS",
+        help="Cap claude's CPU time (RLIMIT_CPU)",
+    )
+    parser.add_argument(
+        "--limit-files",
+        type=int,
+        metavar="N",
+        help="Cap claude's open file descriptors (RLIMIT_NOFILE)",
+    )
+    parser.add_argument(
+        "--status",
+        choices=STATUS_SOURCES,
+        default="tab",
+        help=(
+            "How to read the account tier and email: after Usage in the same session (tab, "
+            "default), from a second session at the same time (parallel, faster but starts two "
+            "claude processes), or not at all, reusing the last known values (cached)"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROBE_PROFILES,
+        default="default",
+        help=(
+            "Terminal claude is probed in: default (80x24), or quiet (narrower, no colour, "
+            "title or update notice) to cut redraw output. --dump-parsed shows the bytes, "
+            "escape sequences and redraw frames read"
+        ),
+    )
+    parser.add_argument(
+        "--max-concurrent-probes",
+        type=int,
+        metavar="N",
+        help=(
+            "Host-wide cap on simultaneous claude probes, shared by all users through lock "
+            "files in --probe-lock-dir; others wait up to --slot-wait seconds"
+        ),
+    )
+    parser.add_argument(
+        "--probe-lock-dir",
+        metavar="PATH",
+        help="Shared directory for the probe slot lock files (default: /tmp/claudebar-probes)",
+    )
+    parser.add_argument(
+        "--slot-wait",
+        type=float,
+        default=60,
+        metavar="SECONDS",
+        help="How long to wait for a free probe slot before showing the last snapshot (default: 60)",
+    )
+    parser.add_argument(
+        "--probe-jitter",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Delay each probe by a random 0..SECONDS so timers on many machines or users drift apart",
+    )
+    parser.add_argument(
+        "--backends",
+        type=_backend_list,
+        metavar="LIST",
+        help=(
+            f"Comma-separated sources to try in order until one answers: {', '.join(BACKEND_NAMES)} "
+            "(default: probe). E.g. daemon,cache,probe"
+        ),
+    )
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=300,
+        metavar="SECONDS",
+        help="Oldest snapshot the daemon and cache backends may serve (default: 300)",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="FILE",
+        help="Raw CLI capture (from --dump-raw) for the replay backend; alone, implies --backends replay",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run resident: probe every --interval seconds and serve snapshots on --socket and --shm-file",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Daemon socket (default: $XDG_RUNTIME_DIR/claudebar/daemon.sock)",
+    )
+    parser.add_argument(
+        "--idle-exit",
+        type=float,
+        metavar="SECONDS",
+        help="Stop the daemon after SECONDS without a client request (default: never)",
+    )
+    parser.add_argument(
+        "--subscribe",
+        action="store_true",
+        help=(
+            "Run resident without probing or polling: the daemon on --socket pushes each "
+            "change, and output is written as it arrives"
+        ),
+    )
+    parser.add_argument(
+        "--spawn-daemon",
+        action="store_true",
+        help=(
+            "With the daemon backend, start a daemon if none is running (it exits after "
+            f"--idle-exit seconds unused, default {DEFAULT_SPAWNED_IDLE_EXIT})"
+        ),
+    )
+    parser.add_argument(
+        "--shm-file",
+        metavar="PATH",
+        help=(
+            "Memory-mapped file the daemon publishes each snapshot to, read by the shm "
+            "backend (default: $XDG_RUNTIME_DIR/claudebar/snapshot.shm)"
+        ),
+    )
+    parser.add_argument(
+        "--sparkline-hours",
+        type=float,
+        default=DEFAULT_HOURS,
+        metavar="HOURS",
+        help=(
+            "Show a sparkline of the session percentage and the weekly trend over the last "
+            f"HOURS in the Waybar tooltip (default: {DEFAULT_HOURS:g}, 0 to disable)"
+        ),
+    )
+    parser.add_argument(
+        "--hook",
+        metavar="TRIGGER:COMMAND",
+        type=_hook_spec,
+        action="append",
+        default=[],
+        help=(
+            "Run COMMAND (via the shell, or 'notify' for a desktop notification) in the "
+            "background when a probe shows TRIGGER: LIMIT-below-N, LIMIT-empty or LIMIT-reset, "
+            "LIMIT being session, weekly or opus. Repeatable"
+        ),
+    )
+    parser.add_argument(
+        "--hook-min-interval",
+        type=float,
+        default=DEFAULT_MIN_INTERVAL,
+        metavar="SECONDS",
+        help=f"Run each hook at most this often (default: {DEFAULT_MIN_INTERVAL})",
+    )
+    parser.add_argument(
+        "--team-dir",
+        metavar="PATH",
+        help=(
+            "Shared directory (e.g. on NFS or a synced folder) to append each probed snapshot "
+            "to, for --aggregate on another machine"
+        ),
+    )
+    parser.add_argument(
+        "--host-name",
+        default=default_host(),
+        metavar="NAME",
+        help="Name this host writes under in --team-dir; one writer per name (default: hostname)",
+    )
+    parser.add_argument(
+        "--aggregate",
+        metavar="PATH",
+        help=(
+            "Print the team view of a --team-dir: the freshest snapshot of every account "
+            "across hosts (--format waybar, plain or json)"
+        ),
+    )
+    parser.add_argument(
+        "--keep-raw",
+        choices=RAW_POLICIES,
+        default="last",
+        help=(
+            "In --watch/--daemon mode, which raw CLI captures stay in memory: none, the last "
+            "--keep-raw-count (default), or the last --keep-raw-count that failed to parse"
+        ),
+    )
+    parser.add_argument(
+        "--keep-raw-count",
+        type=_non_negative_int,
+        default=1,
+        metavar="N",
+        help="Raw captures kept by --keep-raw last/failed (default: 1)",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="In --watch/--daemon mode, trace allocations (tracemalloc) for --memory-report",
+    )
+    parser.add_argument(
+        "--memory-report",
+        action="store_true",
+        help=(
+            "Print the running daemon's memory diagnostics: RSS over time, buffer sizes and, "
+            "with --trace-memory, the top allocation sites (JSON with --format json)"
+        ),
+    )
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help=(
+            "Estimate usage from local transcripts (~/.claude/projects) and only probe "
+            "claude to recalibrate every --recalibrate-after seconds"
+        ),
+    )
+    parser.add_argument(
+        "--recalibrate-after",
+        type=float,
+        default=3600,
+        metavar="SECONDS",
+        help="With --estimate, probe when the last official numbers are older than this (default: 3600)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "Keep running, re-probing every --interval seconds and writing output only "
+            "when it changes (implied by --format i3bar)"
+        ),
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=300,
+        help="Seconds between probes in --watch mode (default: 300)",
+    )
+    parser.add_argument(
+        "--on-activity",
+        action="store_true",
+        help=(
+            "In --watch/--daemon mode, probe when Claude Code has been used (writes under "
+            "~/.claude) instead of on a fixed timer; --interval bounds the wait while busy"
+        ),
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=15,
+        metavar="SECONDS",
+        help="With --on-activity, probe this long after activity stops (default: 15)",
+    )
+    parser.add_argument(
+        "--idle-interval",
+        type=float,
+        default=3600,
+        metavar="SECONDS",
+        help="With --on-activity, probe this often when idle, besides at limit resets (default: 3600)",
+    )
+    parser.add_argument(
+        "--no-backoff",
+        action="store_true",
+        help="Always probe, even after repeated failures",
+    )
+    parser.add_argument(
+        "--backoff-threshold",
+        type=int,
+        default=2,
+        help="Consecutive failures before probing pauses (default: 2)",
+    )
+    parser.add_argument(
+        "--backoff-base",
+        type=float,
+        default=60,
+        help="First pause in seconds; doubles with each further failure (default: 60)",
+    )
+    parser.add_argument(
+        "--backoff-max",
+        type=float,
+        default=3600,
+        help="Longest pause in seconds (default: 3600)",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="PATH",
+        help="After each probe, atomically write Prometheus gauges to PATH (node-exporter textfile)",
+    )
+    parser.add_argument(
+        "--serve-metrics",
+        metavar="[HOST:]PORT",
+        type=_listen_address,
+        help=(
+            "Serve Prometheus metrics on http://HOST:PORT/metrics (default host 127.0.0.1; "
+            "OpenMetrics if the scraper asks for it) from the "
+            "cached snapshot. Scrapes never probe; alone it only serves, with --watch it also probes"
+        ),
+    )
     parser.add_argument(
         "--dump-raw",
         action="store_true",
@@ -52,62 +851,59 @@ Examples:
         action="store_true",
         help="Output parsed data before formatting (for debugging)",
     )
+    return parser
 
-    args = parser.parse_args()
 
-    try:
-        # Fetch raw usage data
-        raw_text = fetch_usage_raw(timeout=args.timeout)
-
-        if args.dump_raw:
-            print(raw_text)
-            return 0
-
-        # Parse the raw text
-        snapshot = parse_usage(raw_text)
-
-        if args.dump_parsed:
-            print(json.dumps(format_json(snapshot), indent=2))
-            return 0
-
-        # Format output
-        if args.format == "waybar":
-            output = format_waybar(snapshot)
-            print(json.dumps(output))
-        elif args.format == "json":
-            output = format_json(snapshot)
-            print(json.dumps(output, indent=2))
-        elif args.format == "plain":
-            print(format_plain(snapshot))
+def main() -> int:
+    """Main entry point for the CLI."""
+    args = _build_parser().parse_args()
+    sinks = args.output or [Sink(args.format)]
 
+    watching = args.watch or args.on_activity or any(sink.fmt in STREAMING_FORMATS for sink in sinks)
+
+    if args.serve_metrics and not (watching or args.daemon):
+        # Metrics only: serve whatever other runs have cached, never probe
+        try:
+            make_server(*args.serve_metrics).serve_forever()
+        except KeyboardInterrupt:
+            pass
         return 0
 
-    except FileNotFoundError as e:
-        # Claude not installed
-        error_snapshot = UsageSnapshot(error=str(e))
-        if args.format == "waybar":
-            print(json.dumps(format_waybar(error_snapshot)))
-        else:
-            print(f"Error: {e}", file=sys.stderr)
-        return 1
+    if args.memory_report:
+        return _print_memory_report(args)
+
+    if args.aggregate:
+        return _print_team(args)
+
+    if args.daemon:
+        return _run_daemon(args)
 
-    except RuntimeError as e:
-        # Interaction failed
-        error_snapshot = UsageSnapshot(error=str(e))
-        if args.format == "waybar":
-            print(json.dumps(format_waybar(error_snapshot)))
-        else:
+    if args.subscribe:
+        return _run_subscribe(args, sinks)
+
+    if watching:
+        if args.serve_metrics:
+            _start_metrics_server(args.serve_metrics)
+        monitor = _memory_monitor(args)
+        try:
+            _watch(args, lambda: monitor.observe(_fetch_snapshot(args)), sinks)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    if args.dump_raw:
+        try:
+            print(probe_usage(_probe_options(args)).raw_text)
+        except (FileNotFoundError, RuntimeError) as e:
             print(f"Error: {e}", file=sys.stderr)
-        return 1
+            return 1
+        return 0
 
-    except Exception as e:
-        # Unexpected error
-        error_snapshot = UsageSnapshot(error=f"Unexpected error: {e}")
-        if args.format == "waybar":
-            print(json.dumps(format_waybar(error_snapshot)))
-        else:
-            print(f"Unexpected error: {e}", file=sys.stderr)
+    snapshot = _fetch_snapshot(args)
+    if snapshot.error:
+        _report_error(args, snapshot.error)
         return 1
+    return _write_output(args, snapshot)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,329 @@
+"""Convert snapshots to the compact form and a fixed-layout binary encoding."""
+
+import struct
+import sys
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .models import CompactSnapshot, UsageSnapshot
+from .parser import parse_reset_time
+
+CODEC_VERSION = 1
+
+# version, flags, session %, weekly %, opus %, pad,
+# captured_at, session_reset_at, weekly_reset_at,
+# string ids: tier, email, timezone, error, raw_ref
+RECORD = struct.Struct("<BBBBBxxxqqqHHHHH")
+
+# Marks a missing percentage (valid values are 0-100)
+_NO_PERCENT = 0xFF
+
+# Flag bits telling which reset fields are present
+_HAS_SESSION_RESET = 0x01
+_HAS_WEEKLY_RESET = 0x02
+
+# Flag bits marking a stale or partial snapshot
+_STALE = 0x04
+_PARTIAL = 0x08
+
+# Fields a partial snapshot may lack, in the order expand() lists them
+_CAPTURED_FIELDS = (
+    "session_percent",
+    "session_reset",
+    "weekly_percent",
+    "weekly_reset",
+    "account_tier",
+    "account_email",
+)
+
+_STRING_LENGTH = struct.Struct("<H")
+
+
+class StringTable:
+    """
+    Interns repeated strings (tier, email, timezone) to small integer ids.
+
+    Id 0 is reserved for None, so a record stays fixed-size regardless of
+    which optional strings it carries. A table shared across many records
+    (e.g., a history file) stores each distinct string only once.
+    """
+
+    def __init__(self, strings: list[str] | None = None) -> None:
+        self._strings: list[str] = []
+        self._ids: dict[str, int] = {}
+        for value in strings or []:
+            self.intern(value)
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+    def intern(self, value: str | None) -> int:
+        """Return the id for value, adding it to the table if new."""
+        if value is None:
+            return 0
+        string_id = self._ids.get(value)
+        if string_id is None:
+            if len(self._strings) >= 0xFFFF:
+                raise ValueError("String table is full")
+            self._strings.append(sys.intern(value))
+            string_id = len(self._strings)
+            self._ids[value] = string_id
+        return string_id
+
+    def lookup(self, string_id: int) -> str | None:
+        """Return the string for an id (None for id 0)."""
+        if string_id == 0:
+            return None
+        try:
+            return self._strings[string_id - 1]
+        except IndexError:
+            raise ValueError(f"Unknown string id: {string_id}") from None
+
+    def to_bytes(self) -> bytes:
+        """Serialize as a count followed by length-prefixed UTF-8 strings."""
+        parts = [_STRING_LENGTH.pack(len(self._strings))]
+        for value in self._strings:
+            data = value.encode("utf-8")
+            parts.append(_STRING_LENGTH.pack(len(data)))
+            parts.append(data)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview) -> "StringTable":
+        """Inverse of to_bytes()."""
+        (count,) = _STRING_LENGTH.unpack_from(data, 0)
+        offset = _STRING_LENGTH.size
+        strings = []
+        for _ in range(count):
+            (length,) = _STRING_LENGTH.unpack_from(data, offset)
+            offset += _STRING_LENGTH.size
+            strings.append(bytes(data[offset : offset + length]).decode("utf-8"))
+            offset += length
+        return cls(strings)
+
+
+def _epoch(reset_time: str | None, now: datetime) -> tuple[int | None, str | None]:
+    """Resolve a reset string to epoch seconds and its IANA zone name."""
+    if not reset_time:
+        return None, None
+    resolved = parse_reset_time(reset_time, now)
+    if resolved is None:
+        return None, None
+    zone = resolved.tzinfo.key if isinstance(resolved.tzinfo, ZoneInfo) else None
+    return int(resolved.timestamp()), zone
+
+
+def compact(
+    snapshot: UsageSnapshot,
+    captured_at: float | None = None,
+    raw_ref: str | None = None,
+) -> CompactSnapshot:
+    """
+    Convert a parsed snapshot to its compact form.
+
+    Reset strings that cannot be resolved to an absolute time are dropped.
+
+    Args:
+        snapshot: Parsed snapshot
+        captured_at: Capture time in epoch seconds (default: the snapshot's own, else now)
+        raw_ref: Optional reference to where the raw capture is kept
+
+    Returns:
+        CompactSnapshot without the raw capture
+    """
+    if captured_at is None:
+        captured_at = time.time() if snapshot.captured_at is None else snapshot.captured_at
+    captured_at = int(captured_at)
+    now = datetime.fromtimestamp(captured_at).astimezone()
+    session_reset_at, session_zone = _epoch(snapshot.session_reset, now)
+    weekly_reset_at, weekly_zone = _epoch(snapshot.weekly_reset, now)
+    intern = sys.intern
+
+    return CompactSnapshot(
+        session_percent=snapshot.session_percent,
+        weekly_percent=snapshot.weekly_percent,
+        opus_percent=snapshot.opus_percent,
+        session_reset_at=session_reset_at,
+        weekly_reset_at=weekly_reset_at,
+        reset_timezone=session_zone or weekly_zone,
+        account_email=intern(snapshot.account_email) if snapshot.account_email else None,
+        account_tier=intern(snapshot.account_tier) if snapshot.account_tier else None,
+        error=snapshot.error,
+        captured_at=captured_at,
+        raw_ref=raw_ref,
+        stale=snapshot.stale_reason is not None,
+        partial=bool(snapshot.missing_fields),
+    )
+
+
+def _format_reset(epoch: int, timezone: str | None, captured_at: int) -> str:
+    """Render an epoch reset the way the Claude CLI prints it."""
+    tz = None
+    if timezone:
+        try:
+            tz = ZoneInfo(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            tz = None
+    reset = datetime.fromtimestamp(epoch, tz).astimezone(tz)
+    captured = datetime.fromtimestamp(captured_at, tz).astimezone(tz)
+
+    hour = reset.hour % 12 or 12
+    period = "am" if reset.hour < 12 else "pm"
+    clock = f"{hour}{period}" if reset.minute == 0 else f"{hour}:{reset.minute:02d}{period}"
+    suffix = f" ({timezone})" if tz else ""
+
+    if reset.date() == captured.date():
+        return f"{clock}{suffix}"
+    if reset.hour == 0 and reset.minute == 0:
+        return f"{reset:%b} {reset.day}, {reset.year}{suffix}"
+    return f"{reset:%b} {reset.day}, {reset.year}, {clock}{suffix}"
+
+
+def expand(snapshot: CompactSnapshot) -> UsageSnapshot:
+    """
+    Convert a compact snapshot back into a UsageSnapshot for the formatters.
+
+    Reset times are re-rendered from their epoch values; raw_text is empty.
+    A stale or partial snapshot is marked again, naming its capture time
+    and the fields it lacks.
+    """
+    expanded = UsageSnapshot(
+        session_percent=snapshot.session_percent,
+        weekly_percent=snapshot.weekly_percent,
+        opus_percent=snapshot.opus_percent,
+        session_reset=(
+            _format_reset(snapshot.session_reset_at, snapshot.reset_timezone, snapshot.captured_at)
+            if snapshot.session_reset_at is not None
+            else None
+        ),
+        weekly_reset=(
+            _format_reset(snapshot.weekly_reset_at, snapshot.reset_timezone, snapshot.captured_at)
+            if snapshot.weekly_reset_at is not None
+            else None
+        ),
+        account_email=snapshot.account_email,
+        account_tier=snapshot.account_tier,
+        error=snapshot.error,
+        captured_at=snapshot.captured_at,
+    )
+    if snapshot.stale:
+        last_update = time.strftime("%H:%M", time.localtime(snapshot.captured_at))
+        expanded.stale_reason = f"last update {last_update}"
+    if snapshot.partial:
+        expanded.missing_fields = [
+            name for name in _CAPTURED_FIELDS if getattr(expanded, name) is None
+        ]
+    return expanded
+
+
+def _pack_percent(percent: int | None) -> int:
+    """Store a percentage in one byte, using _NO_PERCENT for None."""
+    if percent is None:
+        return _NO_PERCENT
+    if not 0 <= percent <= 100:
+        raise ValueError(f"Percentage out of range: {percent}")
+    return percent
+
+
+def _unpack_percent(value: int) -> int | None:
+    """Inverse of _pack_percent()."""
+    return None if value == _NO_PERCENT else value
+
+
+def encode(snapshot: CompactSnapshot, strings: StringTable) -> bytes:
+    """
+    Encode a snapshot as a fixed-size record (RECORD.size bytes).
+
+    Args:
+        snapshot: Snapshot to encode
+        strings: Table the record's string ids refer to; new strings are added
+
+    Returns:
+        Encoded record
+    """
+    flags = 0
+    if snapshot.session_reset_at is not None:
+        flags |= _HAS_SESSION_RESET
+    if snapshot.weekly_reset_at is not None:
+        flags |= _HAS_WEEKLY_RESET
+    if snapshot.stale:
+        flags |= _STALE
+    if snapshot.partial:
+        flags |= _PARTIAL
+
+    return RECORD.pack(
+        CODEC_VERSION,
+        flags,
+        _pack_percent(snapshot.session_percent),
+        _pack_percent(snapshot.weekly_percent),
+        _pack_percent(snapshot.opus_percent),
+        snapshot.captured_at,
+        snapshot.session_reset_at or 0,
+        snapshot.weekly_reset_at or 0,
+        strings.intern(snapshot.account_tier),
+        strings.intern(snapshot.account_email),
+        strings.intern(snapshot.reset_timezone),
+        strings.intern(snapshot.error),
+        strings.intern(snapshot.raw_ref),
+    )
+
+
+def decode(data: bytes | memoryview, strings: StringTable, offset: int = 0) -> CompactSnapshot:
+    """
+    Decode a record produced by encode().
+
+    Args:
+        data: Buffer holding the record
+        strings: Table the record's string ids refer to
+        offset: Position of the record within data
+
+    Raises:
+        ValueError: If the record version is not supported
+    """
+    (
+        version,
+        flags,
+        session_percent,
+        weekly_percent,
+        opus_percent,
+        captured_at,
+        session_reset_at,
+        weekly_reset_at,
+        tier_id,
+        email_id,
+        timezone_id,
+        error_id,
+        raw_ref_id,
+    ) = RECORD.unpack_from(data, offset)
+    if version != CODEC_VERSION:
+        raise ValueError(f"Unsupported snapshot record version: {version}")
+
+    return CompactSnapshot(
+        session_percent=_unpack_percent(session_percent),
+        weekly_percent=_unpack_percent(weekly_percent),
+        opus_percent=_unpack_percent(opus_percent),
+        session_reset_at=session_reset_at if flags & _HAS_SESSION_RESET else None,
+        weekly_reset_at=weekly_reset_at if flags & _HAS_WEEKLY_RESET else None,
+        reset_timezone=strings.lookup(timezone_id),
+        account_email=strings.lookup(email_id),
+        account_tier=strings.lookup(tier_id),
+        error=strings.lookup(error_id),
+        captured_at=captured_at,
+        raw_ref=strings.lookup(raw_ref_id),
+        stale=bool(flags & _STALE),
+        partial=bool(flags & _PARTIAL),
+    )
+
+
+def pack(snapshot: CompactSnapshot) -> bytes:
+    """Encode a single self-contained snapshot (record plus its own strings), e.g. for IPC."""
+    strings = StringTable()
+    record = encode(snapshot, strings)
+    return record + strings.to_bytes()
+
+
+def unpack(data: bytes | memoryview) -> CompactSnapshot:
+    """Inverse of pack()."""
+    strings = StringTable.from_bytes(memoryview(data)[RECORD.size :])
+    return decode(data, strings)
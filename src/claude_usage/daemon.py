@@ -0,0 +1,410 @@
+"""Resident snapshot daemon: probes on an interval and answers clients over a Unix socket."""
+
+import fcntl
+import json
+import os
+import select
+import socket
+import socketserver
+import subprocess
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import fields
+from pathlib import Path
+
+from .formatters import format_json
+from .models import UsageSnapshot
+from .state import runtime_dir
+
+SOCKET_NAME = "daemon.sock"
+
+# First file descriptor passed by systemd socket activation (SD_LISTEN_FDS_START)
+_LISTEN_FDS_START = 3
+
+# Snapshot fields sent over the socket (raw_text stays in the daemon)
+_WIRE_FIELDS = [f.name for f in fields(UsageSnapshot) if f.name != "raw_text"]
+
+# How often an idle subscription checks whether its client hung up
+_SUBSCRIBER_POLL = 1.0
+
+# A subscriber that doesn't take a change within this many seconds is dropped
+_SUBSCRIBER_SEND_TIMEOUT = 30.0
+
+
+def socket_path() -> Path:
+    """Default daemon socket ($XDG_RUNTIME_DIR/claudebar/daemon.sock)."""
+    return runtime_dir() / SOCKET_NAME
+
+
+def activation_socket() -> socket.socket | None:
+    """
+    The listening socket passed by systemd socket activation, if any.
+
+    Consumes the LISTEN_* variables so child processes don't see them.
+    """
+    if os.environ.get("LISTEN_PID") != str(os.getpid()):
+        return None
+    try:
+        count = int(os.environ.get("LISTEN_FDS", "0"))
+    except ValueError:
+        return None
+    for name in ("LISTEN_PID", "LISTEN_FDS", "LISTEN_FDNAMES"):
+        os.environ.pop(name, None)
+    if count < 1:
+        return None
+    return socket.socket(fileno=_LISTEN_FDS_START)
+
+
+def acquire_daemon_lock(path: Path | None = None) -> int | None:
+    """
+    Lock that only one daemon per socket may hold.
+
+    The lock file records the holder's pid and start time for
+    daemon_starting().
+
+    Returns:
+        The locked file descriptor (keep it open while serving), or None if
+        another daemon holds it
+    """
+    fd = os.open(_lock_path(path), os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    os.ftruncate(fd, 0)
+    os.write(fd, f"{os.getpid()} {int(time.time())}\n".encode("ascii"))
+    return fd
+
+
+def daemon_starting(path: Path | None = None, window: float = 30) -> bool:
+    """
+    Whether the daemon behind a socket may still be starting up.
+
+    True when the daemon recorded in the lock file is not running (a
+    socket-activated one is being started) or started less than window
+    seconds ago (its first probe may still run). Its first answer can then
+    take as long as that probe.
+    """
+    try:
+        with open(_lock_path(path), "rb") as f:
+            pid, started_at = f.read(64).split()
+        pid, started_at = int(pid), float(started_at)
+    except (OSError, ValueError):
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        # The pid was reused by another user's process
+        return True
+    return time.time() - started_at < window
+
+
+def _lock_path(path: Path | None) -> Path:
+    return Path(f"{path or socket_path()}.lock")
+
+
+def encode_snapshot(snapshot: UsageSnapshot, captured_at: float) -> bytes:
+    """Serialize a snapshot as one NDJSON line."""
+    data = {**format_json(snapshot), "diagnostics": snapshot.diagnostics}
+    return json.dumps({"snapshot": data, "captured_at": captured_at}).encode("utf-8") + b"\n"
+
+
+def encode_changes(changed: dict, captured_at: float) -> bytes:
+    """Serialize the fields that changed since the last message as one NDJSON line."""
+    return json.dumps({"changed": changed, "captured_at": captured_at}).encode("utf-8") + b"\n"
+
+
+def changed_fields(before: dict, after: dict) -> dict:
+    """Fields of format_json() output that differ, with their new values."""
+    return {name: value for name, value in after.items() if before.get(name) != value}
+
+
+def decode_snapshot(line: bytes) -> tuple[UsageSnapshot, float]:
+    """
+    Inverse of encode_snapshot().
+
+    Raises:
+        ValueError: If the line is not a snapshot message
+    """
+    message = json.loads(line)
+    if "snapshot" not in message:
+        raise ValueError(message.get("error", "not a snapshot message"))
+    data = message["snapshot"]
+    snapshot = UsageSnapshot(**{name: data[name] for name in _WIRE_FIELDS if name in data})
+    return snapshot, message["captured_at"]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One client connection: a command line in, a response line out."""
+
+    server: "SnapshotServer"
+
+    def handle(self) -> None:
+        self.server.last_request = time.monotonic()
+        command = self.rfile.readline(64).strip().upper()
+        if command == b"GET":
+            # A freshly activated daemon answers once its first probe is done
+            latest = self.server.wait_latest(self.server.first_snapshot_wait)
+            if latest is None:
+                self.wfile.write(b'{"error": "no snapshot yet"}\n')
+            else:
+                self.wfile.write(encode_snapshot(*latest))
+        elif command == b"SUBSCRIBE":
+            self._subscribe()
+        elif command == b"MEMORY" and self.server.memory_report is not None:
+            report = {"memory": self.server.memory_report()}
+            self.wfile.write(json.dumps(report).encode("utf-8") + b"\n")
+        else:
+            self.wfile.write(b'{"error": "unknown command"}\n')
+
+    def _subscribe(self) -> None:
+        """
+        Stream the snapshot, then the changed fields of each new one.
+
+        Publications are only flagged, never queued: however many arrive
+        while the client is still reading, it gets one message with the
+        difference from what it last received.
+        """
+        self.connection.settimeout(_SUBSCRIBER_SEND_TIMEOUT)
+        with self.server.subscription() as pending:
+            latest = self.server.wait_latest(self.server.first_snapshot_wait)
+            if latest is None:
+                self.wfile.write(b'{"error": "no snapshot yet"}\n')
+                return
+            try:
+                self.wfile.write(encode_snapshot(*latest))
+                sent = format_json(latest[0])
+                while not self.server.closing.is_set():
+                    if not pending.wait(_SUBSCRIBER_POLL):
+                        if self._peer_closed():
+                            return
+                        continue
+                    pending.clear()
+                    snapshot, captured_at = self.server.latest()
+                    current = format_json(snapshot)
+                    changed = changed_fields(sent, current)
+                    if changed:
+                        self.wfile.write(encode_changes(changed, captured_at))
+                        sent = current
+            except OSError:
+                # Hung up, or too slow to take a message
+                return
+
+    def _peer_closed(self) -> bool:
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+
+
+class SnapshotServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Serves the most recently published snapshot on a Unix socket.
+
+    Protocol: the client sends "GET\\n" and receives one NDJSON line,
+    either {"snapshot": {...}, "captured_at": ...} or {"error": "..."}.
+    After "SUBSCRIBE\\n" the connection stays open: the snapshot line
+    comes first, then {"changed": {...}, "captured_at": ...} with the
+    fields that differ whenever a published snapshot changes.
+    With a memory_report callable, "MEMORY\\n" is answered with
+    {"memory": {...}}.
+
+    With a listener (e.g. from systemd socket activation) the server
+    accepts on it instead of binding path, and leaves the path alone.
+    With a last_access callable (epoch seconds or None), clients that read
+    the snapshot elsewhere keep the server from counting as idle.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        path: Path | None = None,
+        listener: socket.socket | None = None,
+        first_snapshot_wait: float = 30,
+        memory_report: Callable[[], dict] | None = None,
+        last_access: Callable[[], float | None] | None = None,
+    ) -> None:
+        self.path = Path(path or socket_path())
+        self.first_snapshot_wait = first_snapshot_wait
+        self.memory_report = memory_report
+        self.last_access = last_access
+        self.last_request = time.monotonic()
+        self._latest: tuple[UsageSnapshot, float] | None = None
+        self._lock = threading.Lock()
+        self._published = threading.Event()
+        self._subscribers: set[threading.Event] = set()
+        self.closing = threading.Event()
+        self._owns_path = listener is None
+        if listener is not None:
+            super().__init__(str(self.path), _Handler, bind_and_activate=False)
+            self.socket.close()
+            self.socket = listener
+            self.server_address = listener.getsockname()
+            return
+        if self.path.exists():
+            self.path.unlink()
+        super().__init__(str(self.path), _Handler)
+        os.chmod(self.path, 0o600)
+
+    def publish(self, snapshot: UsageSnapshot, captured_at: float | None = None) -> UsageSnapshot:
+        """
+        Make snapshot the one served to clients; returns it for chaining.
+
+        captured_at defaults to the snapshot's own capture time (set on stale
+        snapshots), else now.
+        """
+        if captured_at is None:
+            captured_at = time.time() if snapshot.captured_at is None else snapshot.captured_at
+        with self._lock:
+            self._latest = (snapshot, captured_at)
+            subscribers = list(self._subscribers)
+        self._published.set()
+        for pending in subscribers:
+            pending.set()
+        return snapshot
+
+    @contextmanager
+    def subscription(self) -> Iterator[threading.Event]:
+        """Register a subscriber; the event is set whenever a snapshot is published."""
+        pending = threading.Event()
+        with self._lock:
+            self._subscribers.add(pending)
+        try:
+            yield pending
+        finally:
+            with self._lock:
+                self._subscribers.discard(pending)
+            self.last_request = time.monotonic()
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def latest(self) -> tuple[UsageSnapshot, float] | None:
+        """The latest published snapshot and its capture time."""
+        with self._lock:
+            return self._latest
+
+    def wait_latest(self, timeout: float) -> tuple[UsageSnapshot, float] | None:
+        """Like latest(), but wait up to timeout seconds for the first publication."""
+        self._published.wait(timeout)
+        return self.latest()
+
+    def idle_seconds(self) -> float:
+        """
+        Seconds since the last client request (or since startup); 0 while anyone subscribes.
+
+        Clients that read elsewhere (last_access, e.g. the shared memory file)
+        count as requests too.
+        """
+        if self.subscriber_count():
+            return 0.0
+        idle = time.monotonic() - self.last_request
+        accessed = self.last_access() if self.last_access is not None else None
+        if accessed is not None:
+            idle = min(idle, max(0.0, time.time() - accessed))
+        return idle
+
+    def server_close(self) -> None:
+        self.closing.set()
+        super().server_close()
+        if not self._owns_path:
+            return
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def stop_when_idle(server: SnapshotServer, idle_exit: float, stop: threading.Event) -> None:
+    """Set stop once no client has asked server for idle_exit seconds (run in a thread)."""
+    while not stop.wait(min(idle_exit, 5.0)):
+        if server.idle_seconds() >= idle_exit:
+            stop.set()
+
+
+def spawn_daemon(command: list[str]) -> None:
+    """Start a daemon detached from this process (own session, no stdio)."""
+    subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def request_snapshot(path: Path | None = None, timeout: float = 1.0) -> tuple[UsageSnapshot, float]:
+    """
+    Ask a running daemon for its latest snapshot.
+
+    Raises:
+        OSError: If no daemon is listening
+        ValueError: If the daemon has no snapshot or answers garbage
+    """
+    return decode_snapshot(_request(path, b"GET", timeout))
+
+
+def request_memory_report(path: Path | None = None, timeout: float = 5.0) -> dict:
+    """
+    Ask a running daemon for its memory diagnostics.
+
+    Raises:
+        OSError: If no daemon is listening
+        ValueError: If the daemon does not report memory
+    """
+    message = json.loads(_request(path, b"MEMORY", timeout))
+    if "memory" not in message:
+        raise ValueError(message.get("error", "not a memory report"))
+    return message["memory"]
+
+
+def subscribe(
+    path: Path | None = None, timeout: float = 1.0
+) -> Iterator[tuple[UsageSnapshot, float]]:
+    """
+    Follow a running daemon's snapshots as they are published.
+
+    Yields the current snapshot first, then each changed one, rebuilt from
+    the field changes the daemon sends. Blocks between changes.
+
+    Args:
+        path: Daemon socket
+        timeout: Seconds to wait for the connection and the first snapshot
+
+    Raises:
+        OSError: If no daemon is listening, or it goes away
+        ValueError: If the daemon has no snapshot or answers garbage
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path or socket_path()))
+        sock.sendall(b"SUBSCRIBE\n")
+        with sock.makefile("rb") as reader:
+            snapshot, captured_at = decode_snapshot(reader.readline())
+            sock.settimeout(None)
+            # Probe diagnostics are only in the first message
+            data = format_json(snapshot)
+            yield snapshot, captured_at
+            for line in reader:
+                message = json.loads(line)
+                if "changed" not in message:
+                    raise ValueError(message.get("error", "not a change message"))
+                data.update(message["changed"])
+                snapshot = UsageSnapshot(**{name: data[name] for name in _WIRE_FIELDS if name in data})
+                yield snapshot, message["captured_at"]
+        raise ConnectionResetError("daemon closed the subscription")
+
+
+def _request(path: Path | None, command: bytes, timeout: float) -> bytes:
+    """Send one command to the daemon and return its response line."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path or socket_path()))
+        sock.sendall(command + b"\n")
+        with sock.makefile("rb") as reader:
+            return reader.readline()
@@ -0,0 +1,233 @@
+"""Scriptable stand-in for the claude TUI, for exercising the probe offline."""
+
+import argparse
+import os
+import signal
+import sys
+import termios
+import time
+import tty
+from pathlib import Path
+
+# Phases a fake session can be told to hang in
+HANG_PHASES = ("startup", "usage", "status", "exit")
+
+# Terminal sequences the real TUI wraps each redraw in
+_FRAME_START = "\x1b[?2026h"
+_FRAME_END = "\x1b[?2026l"
+_CLEAR_LINES = "\x1b[2K\x1b[1A" * 12 + "\x1b[2K\x1b[G"
+
+_BAR_WIDTH = 50
+
+
+def _width() -> int:
+    """Columns of the terminal, so rules span it as the real TUI's do."""
+    try:
+        return os.get_terminal_size(sys.stdout.fileno()).columns
+    except OSError:
+        return 80
+
+
+def _colour(text: str) -> str:
+    """Colour text the way the real TUI does, unless NO_COLOR/FORCE_COLOR=0 asks not to."""
+    if os.environ.get("NO_COLOR") or os.environ.get("FORCE_COLOR") == "0":
+        return text
+    return f"\x1b[38;5;246m{text}\x1b[39m"
+
+
+def _bar(percent: int) -> str:
+    filled = _BAR_WIDTH * percent // 100
+    return "█" * filled + " " * (_BAR_WIDTH - filled)
+
+
+def usage_view(session: int, weekly: int, opus: int | None = None) -> str:
+    """The Usage tab as the real CLI renders it (percentages used)."""
+    lines = [
+        " Settings:  Status   Config   Usage  (tab to cycle)",
+        "",
+        " Current session",
+        f" {_bar(session)} {session}% used",
+        " Resets 4pm (Europe/Tallinn)",
+        "",
+        " Current week (all models)",
+        f" {_bar(weekly)} {weekly}% used",
+        " Resets Jan 1, 2026, 10:59am (Europe/Tallinn)",
+    ]
+    if opus is not None:
+        lines += ["", " Opus", f" {_bar(opus)} {opus}% used", " Resets Jan 5, 2026"]
+    return "\n".join([*lines, "", " Esc to cancel"])
+
+
+def status_view(tier: str, email: str) -> str:
+    """The Status tab as the real CLI renders it."""
+    return "\n".join(
+        [
+            " Settings:  Status   Config   Usage  (tab to cycle)",
+            "",
+            " Version: 2.0.74",
+            f" Login method: Claude {tier} Account",
+            f" Email: {email}",
+            "",
+            " Esc to cancel",
+        ]
+    )
+
+
+class FakeClaude:
+    """One fake session: reads keystrokes from stdin, renders views to stdout."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.view: str | None = None
+
+    def write(self, text: str) -> None:
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def frame(self, body: str) -> None:
+        """Render one synchronized redraw frame."""
+        self.write(f"{_FRAME_START}{_CLEAR_LINES}\n{body}\n{_FRAME_END}")
+
+    def hang(self, phase: str) -> None:
+        """Stop responding if told to hang in phase: ignore input and polite signals."""
+        if self.args.hang != phase:
+            return
+        for signum in (signal.SIGHUP, signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, signal.SIG_IGN)
+        while True:
+            time.sleep(3600)
+
+    def start(self) -> None:
+        time.sleep(self.args.startup_delay)
+        self.hang("startup")
+        if self.args.trust_prompt:
+            self.write("Do you trust this folder? (y/n)\n")
+            while sys.stdin.read(1) not in ("y", ""):
+                pass
+        self.prompt()
+
+    def prompt(self) -> None:
+        # Prompt box, then the help hint under it, as the real TUI draws them
+        self.view = None
+        rule = _colour("─" * _width())
+        self.frame(f"{rule}\n> \n{rule}\n  ? for shortcuts")
+
+    def show_usage(self) -> None:
+        time.sleep(self.args.usage_delay)
+        self.hang("usage")
+        # Half-rendered redraws first, like the real TUI while it fetches limits
+        for n in range(self.args.frames):
+            self.frame(f"> /usage\n{_colour(' Loading usage' + '.' * (n % 3 + 1))}")
+        self.view = "usage"
+        rule = _colour("─" * _width())
+        self.frame(f"> /usage\n{rule}\n" + usage_view(self.args.session, self.args.weekly, self.args.opus))
+
+    def show_status(self) -> None:
+        time.sleep(self.args.status_delay)
+        self.hang("status")
+        self.view = "status"
+        self.frame(status_view(self.args.tier, self.args.email))
+
+    def exit(self) -> bool:
+        """Handle /exit; returns True if the session should end."""
+        self.hang("exit")
+        if self.args.ignore_exit:
+            return False
+        time.sleep(self.args.exit_delay)
+        return True
+
+    def command(self, line: str) -> bool:
+        """Run one entered line; returns True if the session should end."""
+        line = line.strip()
+        if line.endswith("/usage"):
+            self.show_usage()
+        elif line.endswith("/status"):
+            self.show_status()
+        elif line.endswith("/exit"):
+            return self.exit()
+        return False
+
+    def run(self) -> None:
+        self.start()
+        line = ""
+        while ch := sys.stdin.read(1):
+            if ch in ("\r", "\n"):
+                if self.command(line):
+                    return
+                line = ""
+            elif ch == "\t" and self.view == "usage":
+                self.show_status()
+            elif ch == "\x1b":
+                line = ""
+                self.prompt()
+            else:
+                line += ch
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Scriptable stand-in for the claude TUI")
+    parser.add_argument("--startup-delay", type=float, default=0.0, metavar="SECONDS")
+    parser.add_argument("--trust-prompt", action="store_true", help="Ask to trust the folder first")
+    parser.add_argument("--usage-delay", type=float, default=0.0, metavar="SECONDS")
+    parser.add_argument(
+        "--frames", type=int, default=0, metavar="N", help="Redraw frames before the Usage view"
+    )
+    parser.add_argument("--status-delay", type=float, default=0.0, metavar="SECONDS")
+    parser.add_argument("--exit-delay", type=float, default=0.0, metavar="SECONDS")
+    parser.add_argument("--ignore-exit", action="store_true", help="Keep running after /exit")
+    parser.add_argument(
+        "--hang",
+        choices=HANG_PHASES,
+        help="Stop responding (ignoring SIGHUP/SIGINT/SIGTERM) when this phase is reached",
+    )
+    parser.add_argument("--session", type=int, default=30, metavar="PERCENT", help="Session used")
+    parser.add_argument("--weekly", type=int, default=15, metavar="PERCENT", help="Week used")
+    parser.add_argument("--opus", type=int, metavar="PERCENT", help="Opus used (omitted by default)")
+    parser.add_argument("--tier", default="Max")
+    parser.add_argument("--email", default="a@example.com")
+    return parser
+
+
+def install(directory: Path, argv: list[str] | None = None) -> Path:
+    """
+    Write an executable named claude into directory that runs a fake session.
+
+    Args:
+        directory: Where to put it (prepend it to PATH to have the probe use it)
+        argv: Fake options, e.g. ["--frames", "100", "--hang", "exit"]
+
+    Returns:
+        Path of the executable
+    """
+    # Importable from a source checkout as well as from an installed package
+    package_root = str(Path(__file__).resolve().parent.parent)
+    script = Path(directory) / "claude"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"sys.path.insert(0, {package_root!r})\n"
+        "from claude_usage.fakeclaude import main\n"
+        f"sys.exit(main({list(argv or [])!r}))\n"
+    )
+    script.chmod(0o755)
+    return script
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run a fake session on the controlling terminal."""
+    args = _parser().parse_args(argv)
+    interactive = os.isatty(sys.stdin.fileno())
+    if interactive:
+        saved = termios.tcgetattr(sys.stdin.fileno())
+        # Keystrokes arrive one by one, as they do for the real TUI
+        tty.setcbreak(sys.stdin.fileno())
+    try:
+        FakeClaude(args).run()
+    finally:
+        if interactive:
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, saved)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,49 @@
 """Format UsageSnapshot for various outputs."""
 
+import json
 import re
+from functools import lru_cache
 
 from .models import UsageSnapshot
 
+# Timezone suffix like "(Europe/Tallinn)" at the end of a reset time
+_TIMEZONE_PATTERN = re.compile(r"\s*\([^)]+\)\s*$")
+
+# 12h times like "4pm", "11:30am", "4:59pm"
+_TIME_12H_PATTERN = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b", re.IGNORECASE)
+
+# Reset strings and percentages repeat across refreshes, so a small cache is plenty
+_RENDER_CACHE_SIZE = 64
+
 
 def _strip_timezone(reset_time: str) -> str:
     """Strip timezone info like '(Europe/Tallinn)' from reset time."""
-    return re.sub(r"\s*\([^)]+\)\s*$", "", reset_time).strip()
+    return _TIMEZONE_PATTERN.sub("", reset_time).strip()
 
 
-def _convert_to_24h(time_str: str) -> str:
-    """Convert 12h time format to 24h format (e.g., '4pm' -> '16:00')."""
-    # Match patterns like "4pm", "11:30am", "4:59pm"
-    pattern = r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)\b"
+def _replace_time(match: re.Match) -> str:
+    """Render a single 12h time match in 24h format."""
+    hour = int(match.group(1))
+    minutes = match.group(2) or "00"
+    period = match.group(3).lower()
+
+    if period == "pm" and hour != 12:
+        hour += 12
+    elif period == "am" and hour == 12:
+        hour = 0
+
+    return f"{hour:02d}:{minutes}"
 
-    def replace_time(match: re.Match) -> str:
-        hour = int(match.group(1))
-        minutes = match.group(2) or "00"
-        period = match.group(3).lower()
 
-        if period == "pm" and hour != 12:
-            hour += 12
-        elif period == "am" and hour == 12:
-            hour = 0
+def _convert_to_24h(time_str: str) -> str:
+    """Convert 12h time format to 24h format (e.g., '4pm' -> '16:00')."""
+    return _TIME_12H_PATTERN.sub(_replace_time, time_str)
 
-        return f"{hour:02d}:{minutes}"
 
-    return re.sub(pattern, replace_time, time_str, flags=re.IGNORECASE)
+@lru_cache(maxsize=_RENDER_CACHE_SIZE)
+def _format_reset(reset_time: str) -> str:
+    """Render a raw reset string for display (timezone stripped, 24h clock)."""
+    return _convert_to_24h(_strip_timezone(reset_time))
 
 
 def get_css_class(percent: int | None) -> str:
@@ -58,6 +74,7 @@ _COLORS = {
 }
 
 
+@lru_cache(maxsize=_RENDER_CACHE_SIZE)
 def _colored_percent(percent: int) -> str:
     """Return percentage with Pango color markup based on level."""
     css_class = get_css_class(percent)
@@ -65,6 +82,39 @@ def _colored_percent(percent: int) -> str:
     return f'<span foreground="{color}">{percent:3d}%</span>'
 
 
+@lru_cache(maxsize=_RENDER_CACHE_SIZE)
+def _build_tooltip(
+    account_tier: str | None,
+    session_percent: int | None,
+    session_reset: str | None,
+    weekly_percent: int | None,
+    weekly_reset: str | None,
+) -> str:
+    """Build the Waybar tooltip showing account tier, session and weekly usage."""
+    tooltip_parts = []
+    if account_tier:
+        tooltip_parts.append(f"Claude {account_tier}")
+    if session_percent is not None:
+        reset_info = f" (resets {_format_reset(session_reset)})" if session_reset else ""
+        tooltip_parts.append(f"Session: {_colored_percent(session_percent)}{reset_info}")
+    if weekly_percent is not None:
+        reset_info = f" (resets {_format_reset(weekly_reset)})" if weekly_reset else ""
+        tooltip_parts.append(f"Weekly:  {_colored_percent(weekly_percent)}{reset_info}")
+
+    return "\n".join(tooltip_parts) if tooltip_parts else "Claude Usage"
+
+
+def _trend_lines(sparkline: str | None, weekly_change: int | None, hours: float | None) -> str:
+    """Tooltip lines for the recent trend (empty without history)."""
+    lines = ""
+    if sparkline:
+        lines += f"\nLast {hours:g}h: <tt>{sparkline}</tt>"
+    if weekly_change is not None:
+        arrow = "↗" if weekly_change > 0 else "↘" if weekly_change < 0 else "→"
+        lines += f"\nWeekly trend: {arrow} {weekly_change:+d}% in {hours:g}h"
+    return lines
+
+
 def format_waybar(snapshot: UsageSnapshot) -> dict:
     """
     Format snapshot for Waybar custom module.
@@ -95,32 +145,29 @@ def format_waybar(snapshot: UsageSnapshot) -> dict:
             "class": "unknown",
         }
 
-    # Build tooltip showing account tier, session and weekly
-    tooltip_parts = []
-    if snapshot.account_tier:
-        tooltip_parts.append(f"Claude {snapshot.account_tier}")
-    if snapshot.session_percent is not None:
-        reset_info = (
-            f" (resets {_convert_to_24h(_strip_timezone(snapshot.session_reset))})"
-            if snapshot.session_reset
-            else ""
-        )
-        tooltip_parts.append(f"Session: {_colored_percent(snapshot.session_percent)}{reset_info}")
-    if snapshot.weekly_percent is not None:
-        reset_info = (
-            f" (resets {_convert_to_24h(_strip_timezone(snapshot.weekly_reset))})"
-            if snapshot.weekly_reset
-            else ""
-        )
-        tooltip_parts.append(f"Weekly:  {_colored_percent(snapshot.weekly_percent)}{reset_info}")
+    tooltip = _build_tooltip(
+        snapshot.account_tier,
+        snapshot.session_percent,
+        snapshot.session_reset,
+        snapshot.weekly_percent,
+        snapshot.weekly_reset,
+    )
 
-    tooltip = "\n".join(tooltip_parts) if tooltip_parts else "Claude Usage"
+    tooltip += _trend_lines(snapshot.sparkline, snapshot.weekly_change, snapshot.trend_hours)
+    # A snapshot can be both partial and stale: keep every marker
+    classes = [get_css_class(primary_percent)]
+    if snapshot.missing_fields:
+        tooltip += f"\n⚠ Partial: {', '.join(snapshot.missing_fields)} not captured"
+        classes.append("partial")
+    if snapshot.stale_reason:
+        tooltip += f"\n⚠ Stale: {snapshot.stale_reason}"
+        classes.append("stale")
 
     return {
         "text": f"{primary_percent}%",
         "tooltip": tooltip,
         "percentage": primary_percent,
-        "class": get_css_class(primary_percent),
+        "class": classes if len(classes) > 1 else classes[0],
     }
 
 
@@ -140,6 +187,10 @@ def format_plain(snapshot: UsageSnapshot) -> str:
         lines.append(f"Session: {snapshot.session_percent}%")
     if snapshot.opus_percent is not None:
         lines.append(f"Opus: {snapshot.opus_percent}%")
+    if lines and snapshot.stale_reason:
+        lines.append(f"Stale: {snapshot.stale_reason}")
+    if lines and snapshot.missing_fields:
+        lines.append(f"Missing: {', '.join(snapshot.missing_fields)}")
 
     return "\n".join(lines) if lines else "No usage data available"
 
@@ -155,4 +206,129 @@ def format_json(snapshot: UsageSnapshot) -> dict:
         "account_email": snapshot.account_email,
         "account_tier": snapshot.account_tier,
         "error": snapshot.error,
+        "stale_reason": snapshot.stale_reason,
+        "missing_fields": snapshot.missing_fields,
+        "sparkline": snapshot.sparkline,
+        "weekly_change": snapshot.weekly_change,
+        "trend_hours": snapshot.trend_hours,
     }
+
+
+def _bar_text_and_color(snapshot: UsageSnapshot) -> tuple[str, str]:
+    """Primary text and color shared by the status bar formats."""
+    waybar = format_waybar(snapshot)
+    css_class = waybar["class"][0] if isinstance(waybar["class"], list) else waybar["class"]
+    if css_class == "error":
+        css_class = "critical"
+    return waybar["text"], _COLORS.get(css_class, _COLORS["unknown"])
+
+
+def format_i3bar(snapshot: UsageSnapshot) -> dict:
+    """
+    Format snapshot as an i3bar/swaybar status block.
+
+    Returns:
+        Dict with keys: name, full_text, short_text, color
+    """
+    text, color = _bar_text_and_color(snapshot)
+    return {
+        "name": "claude_usage",
+        "full_text": f"Claude {text}",
+        "short_text": text,
+        "color": color,
+    }
+
+
+def format_polybar(snapshot: UsageSnapshot) -> str:
+    """Format snapshot as a polybar line with %{F} color tags."""
+    text, color = _bar_text_and_color(snapshot)
+    return f"%{{F{color}}}{text}%{{F-}}"
+
+
+def format_tmux(snapshot: UsageSnapshot) -> str:
+    """Format snapshot as a tmux status segment with #[fg] style tags."""
+    text, color = _bar_text_and_color(snapshot)
+    return f"#[fg={color}]{text}#[default]"
+
+
+# i3bar/swaybar protocol header, sent once before the infinite block array
+I3BAR_HEADER = {"version": 1}
+
+# Output formats understood by render()
+FORMATS = ("waybar", "json", "plain", "i3bar", "polybar", "tmux")
+
+
+def render_cache_entries() -> int:
+    """Entries currently held by the render caches (for memory diagnostics)."""
+    return sum(
+        cached.cache_info().currsize
+        for cached in (_format_reset, _colored_percent, _build_tooltip)
+    )
+
+
+def render(snapshot: UsageSnapshot, fmt: str) -> str:
+    """
+    Render a snapshot as the exact text written for the given format.
+
+    Args:
+        snapshot: Snapshot to render
+        fmt: One of FORMATS
+
+    Returns:
+        Output text without trailing newline
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt == "waybar":
+        return json.dumps(format_waybar(snapshot))
+    if fmt == "json":
+        return json.dumps(format_json(snapshot), indent=2)
+    if fmt == "plain":
+        return format_plain(snapshot)
+    if fmt == "i3bar":
+        # One status line of the protocol's infinite array
+        return json.dumps([format_i3bar(snapshot)])
+    if fmt == "polybar":
+        return format_polybar(snapshot)
+    if fmt == "tmux":
+        return format_tmux(snapshot)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+class ChangeSuppressor:
+    """
+    Render snapshots, but only hand back output that differs from last time.
+
+    Long-running modes call render_if_changed() on every refresh and skip
+    the write entirely when it returns None. Outputs are tracked per key,
+    so several formats or destinations can share one suppressor.
+    """
+
+    def __init__(self) -> None:
+        self._last: dict[str, str] = {}
+
+    def render_if_changed(
+        self, snapshot: UsageSnapshot, fmt: str, key: str | None = None
+    ) -> str | None:
+        """
+        Render snapshot in fmt, returning None if identical to the previous output.
+
+        Args:
+            snapshot: Snapshot to render
+            fmt: One of FORMATS
+            key: Identifies the consumer; defaults to the format name
+
+        Returns:
+            The rendered text, or None if it is byte-identical to the last one
+        """
+        output = render(snapshot, fmt)
+        key = key or fmt
+        if self._last.get(key) == output:
+            return None
+        self._last[key] = output
+        return output
+
+    def reset(self) -> None:
+        """Forget previous outputs so the next render is always emitted."""
+        self._last.clear()
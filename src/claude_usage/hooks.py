@@ -0,0 +1,258 @@
+"""Threshold hooks: run a command or notify when a limit crosses a level, runs out or resets."""
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+from .models import UsageSnapshot
+from .state import load_json, save_json
+
+HOOK_STATE_FILE = "hook-state.json"
+
+LIMITS = ("session", "weekly", "opus")
+
+# A crossed threshold re-arms only once the limit is this many points above it again
+HYSTERESIS = 5
+
+# Percent remaining rising by at least this much means the limit was reset
+RESET_RISE = 10
+
+# Default minimum seconds between two runs of the same hook
+DEFAULT_MIN_INTERVAL = 300
+
+# Hooks still running are killed after this many seconds
+HOOK_TIMEOUT = 60
+
+# Hooks running at once in one process; further firings are dropped
+MAX_RUNNING = 4
+
+# Command that sends a desktop notification instead of running a shell command
+NOTIFY = "notify"
+
+_TRIGGER_PATTERN = re.compile(r"^(session|weekly|opus)-(below-(\d{1,3})|empty|reset)$")
+
+
+@dataclass(frozen=True)
+class Hook:
+    """What to run when one limit does one thing."""
+
+    limit: str  # one of LIMITS
+    event: str  # "below", "empty" or "reset"
+    command: str  # shell command, or NOTIFY
+    threshold: int | None = None  # percent remaining, for "below"
+
+    @property
+    def key(self) -> str:
+        """Identifies this hook's persisted state."""
+        return f"{self.trigger}:{self.command}"
+
+    @property
+    def trigger(self) -> str:
+        event = f"below-{self.threshold}" if self.event == "below" else self.event
+        return f"{self.limit}-{event}"
+
+
+def parse_hook_spec(spec: str) -> Hook:
+    """
+    Parse a hook spec of the form "trigger:command".
+
+    The trigger is LIMIT-below-N (percent remaining drops under N),
+    LIMIT-empty (nothing left) or LIMIT-reset (the limit was reset), with
+    LIMIT one of session, weekly, opus. The command is run by the shell,
+    or is "notify" for a desktop notification.
+
+    Raises:
+        ValueError: If the trigger is unknown or the command is empty
+    """
+    trigger, _, command = spec.partition(":")
+    match = _TRIGGER_PATTERN.match(trigger)
+    if not match:
+        raise ValueError(
+            f"unknown trigger '{trigger}' (expected LIMIT-below-N, LIMIT-empty or LIMIT-reset, "
+            f"LIMIT one of {', '.join(LIMITS)})"
+        )
+    if not command.strip():
+        raise ValueError(f"missing command in '{spec}'")
+    limit, event, threshold = match.group(1), match.group(2), match.group(3)
+    if threshold is not None:
+        if not 0 < int(threshold) <= 100:
+            raise ValueError(f"threshold out of range in '{spec}'")
+        return Hook(limit, "below", command, int(threshold))
+    return Hook(limit, event, command)
+
+
+def _crossing_level(hook: Hook) -> int:
+    """Percent remaining below which a below/empty hook fires."""
+    return 1 if hook.event == "empty" else hook.threshold
+
+
+def transition(hook: Hook, previous: int | None, current: int, armed: bool) -> tuple[bool, bool]:
+    """
+    Decide whether one hook fires on a change of its limit.
+
+    A below/empty hook fires once when the limit drops under its level and
+    re-arms only after it has climbed HYSTERESIS points above it, so a value
+    hovering around the level fires once. A reset hook fires when percent
+    remaining rises by RESET_RISE or more.
+
+    Args:
+        hook: The hook
+        previous: Percent remaining at the last snapshot (None for the first)
+        current: Percent remaining now
+        armed: Whether the hook may fire
+
+    Returns:
+        (fire, armed afterwards)
+    """
+    if hook.event == "reset":
+        return previous is not None and current - previous >= RESET_RISE, True
+    level = _crossing_level(hook)
+    if previous is None:
+        # Only a crossing fires; a first value already under the level does not
+        return False, current >= level
+    if current >= level + HYSTERESIS:
+        return False, True
+    if current < level and armed:
+        return True, False
+    return False, armed
+
+
+def _environment(hook: Hook, snapshot: UsageSnapshot, percent: int) -> dict[str, str]:
+    return {
+        **os.environ,
+        "CLAUDE_USAGE_TRIGGER": hook.trigger,
+        "CLAUDE_USAGE_LIMIT": hook.limit,
+        "CLAUDE_USAGE_EVENT": hook.event,
+        "CLAUDE_USAGE_PERCENT": str(percent),
+        "CLAUDE_USAGE_THRESHOLD": str(hook.threshold or ""),
+        "CLAUDE_USAGE_RESET": getattr(snapshot, f"{hook.limit}_reset", None) or "",
+    }
+
+
+def _notification(hook: Hook, percent: int) -> list[str]:
+    titles = {"below": "running low", "empty": "used up", "reset": "reset"}
+    return [
+        "notify-send",
+        "--app-name=claudebar",
+        f"Claude {hook.limit} limit {titles[hook.event]}",
+        f"{percent}% left",
+    ]
+
+
+class HookRunner:
+    """
+    Evaluates hooks against each new snapshot and runs the ones that fire.
+
+    Hooks run in the background: the command is started and left to a
+    watcher thread, so a slow hook never delays the caller. Each hook runs
+    at most once per min_interval seconds, and at most MAX_RUNNING run at
+    once in this process (across runners). Per-hook state is persisted, so
+    one-shot runs see transitions too.
+    """
+
+    _running = 0
+    _lock = threading.Lock()
+
+    def __init__(self, hooks: list[Hook], min_interval: float = DEFAULT_MIN_INTERVAL) -> None:
+        self.hooks = hooks
+        self.min_interval = min_interval
+
+    def observe(self, snapshot: UsageSnapshot, now: float | None = None) -> list[Hook]:
+        """
+        Compare snapshot with the last one observed and run the hooks that fire.
+
+        Returns:
+            The hooks started
+        """
+        if not self.hooks or snapshot.error:
+            return []
+        now = time.time() if now is None else now
+        data = load_json(HOOK_STATE_FILE)
+        previous = data.get("percents", {})
+        hooks_state = data.get("hooks", {})
+
+        started = []
+        percents = {}
+        for limit in LIMITS:
+            current = getattr(snapshot, f"{limit}_percent")
+            if current is None:
+                continue
+            percents[limit] = current
+            for hook in (h for h in self.hooks if h.limit == limit):
+                # A hook added since the last run starts from this value, like a first run
+                last = previous.get(limit) if hook.key in hooks_state else None
+                state = hooks_state.setdefault(hook.key, {"armed": True, "fired_at": 0})
+                fire, state["armed"] = transition(hook, last, current, state["armed"])
+                if fire and now - state["fired_at"] >= self.min_interval and self._run(
+                    hook, snapshot, current
+                ):
+                    state["fired_at"] = now
+                    started.append(hook)
+
+        known = {hook.key for hook in self.hooks}
+        save_json(
+            HOOK_STATE_FILE,
+            {
+                "percents": {**previous, **percents},
+                "hooks": {key: value for key, value in hooks_state.items() if key in known},
+            },
+        )
+        return started
+
+    def _run(self, hook: Hook, snapshot: UsageSnapshot, percent: int) -> bool:
+        """Start a hook without waiting for it; returns False if it could not start."""
+        with HookRunner._lock:
+            if HookRunner._running >= MAX_RUNNING:
+                print(f"Warning: hook {hook.trigger} skipped, {MAX_RUNNING} still running", file=sys.stderr)
+                return False
+            HookRunner._running += 1
+        if hook.command == NOTIFY:
+            if shutil.which("notify-send") is None:
+                print("Warning: notify hook needs notify-send", file=sys.stderr)
+                self._finished()
+                return False
+            command, shell = _notification(hook, percent), False
+        else:
+            command, shell = hook.command, True
+        try:
+            process = subprocess.Popen(
+                command,
+                shell=shell,
+                env=_environment(hook, snapshot, percent),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as e:
+            print(f"Warning: hook {hook.trigger} failed to start: {e}", file=sys.stderr)
+            self._finished()
+            return False
+        threading.Thread(target=self._reap, args=(process,), daemon=True).start()
+        return True
+
+    def _reap(self, process: subprocess.Popen) -> None:
+        """Wait for a hook (killing it after HOOK_TIMEOUT) so it never lingers as a zombie."""
+        try:
+            process.wait(HOOK_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        finally:
+            self._finished()
+
+    @staticmethod
+    def _finished() -> None:
+        with HookRunner._lock:
+            HookRunner._running -= 1
+
+    @staticmethod
+    def running() -> int:
+        """Hooks of this process still running."""
+        with HookRunner._lock:
+            return HookRunner._running
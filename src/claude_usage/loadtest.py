@@ -0,0 +1,271 @@
+"""Load-test harness: many concurrent probes against the fake claude, with leak accounting."""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+import warnings
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from . import fakeclaude
+from .parser import parse_usage
+from .phases import percentile
+from .probe import PROBE_PROFILES, STATUS_SOURCES, ProbeOptions, probe_usage
+
+# Every fake a run starts carries this in its environment, so survivors can be found
+RUN_TAG_VARIABLE = "CLAUDEBAR_LOADTEST_RUN"
+
+
+@dataclass
+class ProbeOutcome:
+    """One probe of a load test."""
+
+    seconds: float
+    error: str | None = None
+    parsed: bool = False  # the session percentage was read
+    partial: bool = False  # some views were not captured
+    output_bytes: int = 0
+    escape_sequences: int = 0
+
+
+@dataclass
+class LoadReport:
+    """What a load test measured."""
+
+    probes: int
+    concurrency: int
+    wall_seconds: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    throughput: float  # probes per second
+    parsed: int
+    partial: int
+    output_bytes_mean: float = 0.0  # per successful probe
+    escape_sequences_mean: float = 0.0
+    errors: dict[str, int] = field(default_factory=dict)
+    leaked_fds: int = 0
+    leftover_processes: int = 0
+    zombies: int = 0
+
+    @property
+    def clean(self) -> bool:
+        """No descriptors, processes or zombies were left behind."""
+        return not (self.leaked_fds or self.leftover_processes or self.zombies)
+
+
+def _open_fds() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+def _process_stat(pid: str) -> tuple[str, int] | None:
+    """State letter and parent pid of a process, or None if it is gone."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # The command name is parenthesized and may itself contain spaces or ")"
+    state, ppid = stat[stat.rindex(")") + 2 :].split()[:2]
+    return state, int(ppid)
+
+
+def _pids() -> list[str]:
+    return [entry for entry in os.listdir("/proc") if entry.isdigit()]
+
+
+def tagged_processes(tag: str) -> list[int]:
+    """Live (non-zombie) processes started with RUN_TAG_VARIABLE=tag."""
+    marker = f"{RUN_TAG_VARIABLE}={tag}".encode()
+    found = []
+    for pid in _pids():
+        try:
+            environ = Path(f"/proc/{pid}/environ").read_bytes()
+        except OSError:
+            continue
+        stat = _process_stat(pid)
+        if marker in environ.split(b"\0") and stat is not None and stat[0] != "Z":
+            found.append(int(pid))
+    return found
+
+
+def zombie_children() -> list[int]:
+    """Children of this process that exited but were never reaped."""
+    me = os.getpid()
+    return [
+        int(pid)
+        for pid in _pids()
+        if (stat := _process_stat(pid)) is not None and stat == ("Z", me)
+    ]
+
+
+def _probe_once(options: ProbeOptions) -> ProbeOutcome:
+    started = time.monotonic()
+    try:
+        result = probe_usage(options)
+    except (FileNotFoundError, RuntimeError) as e:
+        return ProbeOutcome(time.monotonic() - started, error=f"{type(e).__name__}: {e}")
+    snapshot = parse_usage(result.output, result.status_output)
+    return ProbeOutcome(
+        time.monotonic() - started,
+        parsed=snapshot.session_percent is not None,
+        partial=bool(result.missing_views),
+        output_bytes=result.diagnostics.get("output_bytes", 0),
+        escape_sequences=result.diagnostics.get("escape_sequences", 0),
+    )
+
+
+def run_load(
+    probes: int,
+    concurrency: int,
+    fake_args: list[str] | None = None,
+    options: ProbeOptions | None = None,
+    settle: float = 2.0,
+) -> LoadReport:
+    """
+    Run probes against a fake claude, concurrency at a time, and measure the damage.
+
+    PATH and the cache dir are pointed at a temporary directory for the
+    duration, so neither the real claude nor the real probe statistics are
+    touched.
+
+    Args:
+        probes: Total number of probes
+        concurrency: Probes in flight at once
+        fake_args: Options for the fake session (see fakeclaude)
+        options: Probe settings (default: ProbeOptions())
+        settle: Seconds to let stragglers exit before counting leftovers
+
+    Returns:
+        LoadReport with latency percentiles, throughput, errors and leaks
+    """
+    options = options or ProbeOptions()
+    tag = uuid.uuid4().hex
+    touched = ("PATH", "CLAUDEBAR_CACHE_DIR", RUN_TAG_VARIABLE)
+    saved_env = {name: os.environ.get(name) for name in touched}
+    with tempfile.TemporaryDirectory(prefix="claudebar-load-") as directory:
+        fakeclaude.install(Path(directory), fake_args)
+        os.environ["PATH"] = f"{directory}{os.pathsep}{os.environ.get('PATH', '')}"
+        os.environ["CLAUDEBAR_CACHE_DIR"] = str(Path(directory) / "cache")
+        os.environ[RUN_TAG_VARIABLE] = tag
+        try:
+            fds_before = _open_fds()
+            zombies_before = set(zombie_children())
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(lambda _: _probe_once(options), range(probes)))
+            wall = time.monotonic() - started
+
+            time.sleep(settle)
+            gc.collect()
+            leaked_fds = _open_fds() - fds_before
+            leftovers = tagged_processes(tag)
+            zombies = set(zombie_children()) - zombies_before
+        finally:
+            for name, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    latencies = [outcome.seconds for outcome in outcomes]
+    succeeded = [outcome for outcome in outcomes if outcome.error is None] or [ProbeOutcome(0.0)]
+    return LoadReport(
+        probes=probes,
+        concurrency=concurrency,
+        wall_seconds=round(wall, 3),
+        latency_p50=round(percentile(latencies, 50), 3),
+        latency_p95=round(percentile(latencies, 95), 3),
+        latency_p99=round(percentile(latencies, 99), 3),
+        throughput=round(probes / wall, 3) if wall > 0 else 0.0,
+        parsed=sum(outcome.parsed for outcome in outcomes),
+        partial=sum(outcome.partial for outcome in outcomes),
+        output_bytes_mean=round(sum(o.output_bytes for o in succeeded) / len(succeeded), 1),
+        escape_sequences_mean=round(sum(o.escape_sequences for o in succeeded) / len(succeeded), 1),
+        errors=dict(Counter(outcome.error for outcome in outcomes if outcome.error)),
+        leaked_fds=max(0, leaked_fds),
+        leftover_processes=len(leftovers),
+        zombies=len(zombies),
+    )
+
+
+def format_report(report: LoadReport) -> str:
+    """Human-readable summary of a load test."""
+    lines = [
+        f"Probes:      {report.probes} ({report.concurrency} concurrent) in {report.wall_seconds}s",
+        f"Latency:     p50 {report.latency_p50}s  p95 {report.latency_p95}s  p99 {report.latency_p99}s",
+        f"Throughput:  {report.throughput} probes/s",
+        f"Parsed:      {report.parsed}/{report.probes} ({report.partial} partial)",
+        f"Output:      {report.output_bytes_mean:g} bytes, "
+        f"{report.escape_sequences_mean:g} escape sequences per probe",
+    ]
+    for error, count in sorted(report.errors.items(), key=lambda item: -item[1]):
+        lines.append(f"Error x{count}: {error}")
+    lines.append(
+        f"Leaks:       {report.leaked_fds} fds, {report.leftover_processes} processes, "
+        f"{report.zombies} zombies"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command line entry point; options after "--" go to the fake claude.
+
+    Returns:
+        0 if nothing leaked, 1 otherwise
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    fake_args = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, fake_args = argv[:split], argv[split + 1 :]
+
+    parser = argparse.ArgumentParser(
+        description="Run concurrent probes against a fake claude and report latency and leaks",
+        epilog="Example: python -m claude_usage.loadtest --probes 200 -c 16 -- --frames 500 --hang exit",
+    )
+    parser.add_argument("--probes", "-n", type=int, default=50, help="Total probes (default: 50)")
+    parser.add_argument(
+        "--concurrency", "-c", type=int, default=8, help="Probes at once (default: 8)"
+    )
+    parser.add_argument("--timeout", type=int, default=15, help="Per-phase timeout (default: 15)")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS", help="Overall probe deadline")
+    parser.add_argument("--status", choices=STATUS_SOURCES, default="tab")
+    parser.add_argument("--profile", choices=PROBE_PROFILES, default="default")
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="Wait before counting leftover processes (default: 2)",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    # Probes run on worker threads; forking from them is the point of the exercise
+    warnings.filterwarnings("ignore", message=".*use of forkpty\\(\\) may lead to deadlocks")
+    report = run_load(
+        args.probes,
+        args.concurrency,
+        fake_args,
+        ProbeOptions(
+            timeout=args.timeout, deadline=args.deadline, status=args.status, profile=args.profile
+        ),
+        settle=args.settle,
+    )
+    if args.json:
+        print(json.dumps({**asdict(report), "clean": report.clean}, indent=2))
+    else:
+        print(format_report(report))
+    return 0 if report.clean else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Memory budget for resident modes: raw capture retention and memory diagnostics."""
+
+import gc
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+from . import formatters
+from .models import UsageSnapshot
+
+# Values for --keep-raw: drop every raw capture, keep the last N, or keep
+# the last N of those that failed to parse
+RAW_POLICIES = ("none", "last", "failed")
+
+# RSS samples kept; when full, every other one is dropped and sampling halves
+HISTORY_SAMPLES = 256
+
+# Frames recorded per allocation when tracing
+_TRACE_FRAMES = 1
+
+
+def _failed(snapshot: UsageSnapshot) -> bool:
+    """Whether a snapshot's raw capture is worth keeping for debugging."""
+    return bool(
+        snapshot.error
+        or snapshot.missing_fields
+        or (snapshot.session_percent is None and snapshot.weekly_percent is None)
+    )
+
+
+class RawRetention:
+    """
+    Decides which snapshots keep their raw CLI capture.
+
+    Snapshots that lose it have raw_text emptied in place, so the capture
+    is freed even where the snapshot itself is still referenced (e.g. as
+    the daemon's latest).
+    """
+
+    def __init__(self, policy: str = "last", keep: int = 1) -> None:
+        if policy not in RAW_POLICIES:
+            raise ValueError(f"unknown raw retention policy '{policy}'")
+        if keep < 0:
+            raise ValueError(f"raw retention count must be 0 or more, got {keep}")
+        self.policy = policy
+        self.keep = keep
+        self._kept: deque[UsageSnapshot] = deque()
+
+    def retain(self, snapshot: UsageSnapshot) -> UsageSnapshot:
+        """Apply the policy to a new snapshot; returns it for chaining."""
+        if self.policy == "none" or (self.policy == "failed" and not _failed(snapshot)):
+            snapshot.raw_text = ""
+            return snapshot
+        if snapshot.raw_text:
+            self._kept.append(snapshot)
+            while len(self._kept) > self.keep:
+                self._kept.popleft().raw_text = ""
+        return snapshot
+
+    def retained(self) -> list[UsageSnapshot]:
+        """Snapshots still holding their raw capture, oldest first."""
+        return [snapshot for snapshot in self._kept if snapshot.raw_text]
+
+    def retained_chars(self) -> int:
+        return sum(len(snapshot.raw_text) for snapshot in self._kept)
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryMonitor:
+    """
+    Watches a resident process's memory: applies raw retention to every
+    snapshot, samples RSS over the process's whole lifetime in bounded
+    space, and optionally traces allocations with tracemalloc.
+    """
+
+    def __init__(self, retention: RawRetention | None = None, trace: bool = False) -> None:
+        self.retention = retention or RawRetention()
+        self.started_at = time.time()
+        self._history: list[tuple[int, int]] = []
+        self._stride = 1
+        self._observed = 0
+        self._last_capture_chars = 0
+        self._lock = threading.Lock()
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start(_TRACE_FRAMES)
+
+    def sample(self) -> None:
+        """Record the current RSS (every stride-th call once history has filled up)."""
+        with self._lock:
+            self._observed += 1
+            if (self._observed - 1) % self._stride:
+                return
+            self._history.append((int(time.time()), current_rss()))
+            if len(self._history) >= HISTORY_SAMPLES:
+                # Halve the resolution instead of forgetting the start
+                self._history = self._history[::2]
+                self._stride *= 2
+
+    def observe(self, snapshot: UsageSnapshot) -> UsageSnapshot:
+        """Note a fresh snapshot: retention, capture size and an RSS sample; returns it."""
+        self._last_capture_chars = len(snapshot.raw_text)
+        self.retention.retain(snapshot)
+        self.sample()
+        return snapshot
+
+    def report(self, top: int = 10) -> dict:
+        """
+        Current memory state as JSON-serializable data.
+
+        Args:
+            top: Number of allocation sites to list when tracing
+        """
+        with self._lock:
+            history = list(self._history)
+        rss = current_rss()
+        report = {
+            "uptime_seconds": round(time.time() - self.started_at),
+            "rss_bytes": rss,
+            "peak_rss_bytes": peak_rss(),
+            "rss_history": [*history, (int(time.time()), rss)],
+            "buffers": {
+                "raw_policy": self.retention.policy,
+                "raw_retained_snapshots": len(self.retention.retained()),
+                "raw_retained_chars": self.retention.retained_chars(),
+                "last_capture_chars": self._last_capture_chars,
+                "render_cache_entries": formatters.render_cache_entries(),
+            },
+            "gc_objects": len(gc.get_objects()),
+            "threads": threading.active_count(),
+            "tracemalloc": None,
+        }
+        if tracemalloc.is_tracing():
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            statistics = tracemalloc.take_snapshot().statistics("lineno")[:top]
+            report["tracemalloc"] = {
+                "traced_bytes": traced,
+                "traced_peak_bytes": traced_peak,
+                "top": [
+                    {"site": str(stat.traceback), "bytes": stat.size, "blocks": stat.count}
+                    for stat in statistics
+                ],
+            }
+        return report
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+
+def format_memory_report(report: dict) -> str:
+    """Human-readable version of MemoryMonitor.report()."""
+    history = report["rss_history"]
+    rss_values = [rss for _, rss in history]
+    buffers = report["buffers"]
+    hours = report["uptime_seconds"] / 3600
+    lines = [
+        f"Uptime:   {hours:.1f}h, {report['threads']} threads, {report['gc_objects']} objects",
+        f"RSS:      {_megabytes(report['rss_bytes'])} (peak {_megabytes(report['peak_rss_bytes'])})",
+        f"History:  {len(history)} samples, first {_megabytes(rss_values[0])}, "
+        f"min {_megabytes(min(rss_values))}, max {_megabytes(max(rss_values))}",
+        f"Raw:      policy {buffers['raw_policy']}, {buffers['raw_retained_snapshots']} kept "
+        f"({buffers['raw_retained_chars']} chars), last capture {buffers['last_capture_chars']} chars",
+        f"Caches:   {buffers['render_cache_entries']} render cache entries",
+    ]
+    traced = report["tracemalloc"]
+    if traced is None:
+        lines.append("Tracing:  off (start the daemon with --trace-memory)")
+    else:
+        lines.append(
+            f"Tracing:  {_megabytes(traced['traced_bytes'])} traced "
+            f"(peak {_megabytes(traced['traced_peak_bytes'])})"
+        )
+        for stat in traced["top"]:
+            lines.append(f"  {stat['bytes']:>10}  {stat['blocks']:>6}  {stat['site']}")
+    return "\n".join(lines)
@@ -0,0 +1,232 @@
+"""Prometheus and OpenMetrics exposition of usage gauges and probe counters."""
+
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .models import CompactSnapshot
+from .sinks import write_atomic
+from .state import load_json, load_latest, save_json
+
+PROBE_STATS_FILE = "probe-stats.json"
+
+# Prometheus text format 0.0.4 is the default; OpenMetrics only when a scraper asks for it
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Serialize read-modify-write of the stats file within one process
+_stats_lock = threading.Lock()
+
+
+@dataclass
+class ProbeStats:
+    """Cumulative probe counters, persisted across runs."""
+
+    probes_total: int = 0
+    failures_total: int = 0
+    duration_seconds_sum: float = 0.0
+    last_duration_seconds: float = 0.0
+    last_probe_timestamp: float = 0.0
+    child_cpu_seconds_sum: float = 0.0
+    last_child_peak_rss_bytes: int | None = None
+    output_bytes_sum: int = 0
+
+    @classmethod
+    def load(cls) -> "ProbeStats":
+        """Load persisted counters (zeros if none)."""
+        data = load_json(PROBE_STATS_FILE)
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def save(self) -> None:
+        """Persist counters."""
+        save_json(PROBE_STATS_FILE, asdict(self))
+
+
+def record_probe(duration: float, ok: bool, diagnostics: dict | None = None) -> ProbeStats:
+    """
+    Add one probe to the persisted counters.
+
+    Args:
+        duration: Wall time of the probe in seconds
+        ok: Whether the probe produced a snapshot without error
+        diagnostics: Probe measurements (child CPU time, peak RSS, output bytes), if any
+
+    Returns:
+        The updated counters
+    """
+    with _stats_lock:
+        stats = ProbeStats.load()
+        stats.probes_total += 1
+        if not ok:
+            stats.failures_total += 1
+        stats.duration_seconds_sum += duration
+        stats.last_duration_seconds = duration
+        stats.last_probe_timestamp = time.time()
+        if diagnostics:
+            stats.child_cpu_seconds_sum += diagnostics.get("child_cpu_user_seconds", 0.0)
+            stats.child_cpu_seconds_sum += diagnostics.get("child_cpu_system_seconds", 0.0)
+            if "child_peak_rss_kb" in diagnostics:
+                stats.last_child_peak_rss_bytes = diagnostics["child_peak_rss_kb"] * 1024
+            stats.output_bytes_sum += diagnostics.get("output_bytes", 0)
+        stats.save()
+        return stats
+
+
+def _family(
+    lines: list[str],
+    name: str,
+    metric_type: str,
+    help_text: str,
+    value,
+    unit: str = "",
+    openmetrics: bool = False,
+) -> None:
+    """
+    Append one single-sample metric family (skipped if value is None).
+
+    Counter samples get the _total suffix in both formats; the 0.0.4 format
+    names the family after the sample and has no UNIT line.
+    """
+    if value is None:
+        return
+    sample = f"{name}_total" if metric_type == "counter" else name
+    if openmetrics:
+        lines.append(f"# TYPE {name} {metric_type}")
+        if unit:
+            lines.append(f"# UNIT {name} {unit}")
+        lines.append(f"# HELP {name} {help_text}")
+    else:
+        lines.append(f"# HELP {sample} {help_text}")
+        lines.append(f"# TYPE {sample} {metric_type}")
+    lines.append(f"{sample} {value}")
+
+
+def format_metrics(
+    snapshot: CompactSnapshot | None,
+    stats: ProbeStats,
+    now: float | None = None,
+    openmetrics: bool = False,
+) -> str:
+    """
+    Render usage gauges and probe counters.
+
+    Args:
+        snapshot: Latest good snapshot, or None if there is none yet
+        stats: Probe counters
+        now: Reference time for seconds-to-reset (default: current time)
+        openmetrics: OpenMetrics text format instead of Prometheus 0.0.4
+
+    Returns:
+        Exposition text (terminated by "# EOF" for OpenMetrics)
+    """
+    now = time.time() if now is None else now
+    lines: list[str] = []
+
+    def family(name: str, metric_type: str, help_text: str, value, unit: str = "") -> None:
+        _family(lines, name, metric_type, help_text, value, unit, openmetrics)
+
+    if snapshot is not None:
+        family("claude_usage_session_percent", "gauge",
+               "Current session limit remaining.", snapshot.session_percent, "percent")
+        family("claude_usage_weekly_percent", "gauge",
+               "Weekly limit remaining.", snapshot.weekly_percent, "percent")
+        family("claude_usage_opus_percent", "gauge",
+               "Opus weekly limit remaining.", snapshot.opus_percent, "percent")
+        if snapshot.session_reset_at is not None:
+            family("claude_usage_session_reset_seconds", "gauge",
+                   "Seconds until the session limit resets.",
+                   max(0, round(snapshot.session_reset_at - now)), "seconds")
+        if snapshot.weekly_reset_at is not None:
+            family("claude_usage_weekly_reset_seconds", "gauge",
+                   "Seconds until the weekly limit resets.",
+                   max(0, round(snapshot.weekly_reset_at - now)), "seconds")
+        family("claude_usage_snapshot_timestamp_seconds", "gauge",
+               "When the latest good snapshot was captured.", snapshot.captured_at, "seconds")
+        if snapshot.account_tier:
+            # An info metric in OpenMetrics; 0.0.4 has no info type, so a gauge of 1
+            if openmetrics:
+                lines.append("# TYPE claude_usage_account info")
+                lines.append("# HELP claude_usage_account Account of the latest snapshot.")
+            else:
+                lines.append("# HELP claude_usage_account_info Account of the latest snapshot.")
+                lines.append("# TYPE claude_usage_account_info gauge")
+            lines.append(f'claude_usage_account_info{{tier="{snapshot.account_tier}"}} 1')
+
+    family("claude_usage_probes", "counter",
+           "Probes of the Claude CLI.", stats.probes_total)
+    family("claude_usage_probe_failures", "counter",
+           "Probes that failed to produce usage data.", stats.failures_total)
+    family("claude_usage_probe_duration_seconds", "counter",
+           "Total time spent probing.", round(stats.duration_seconds_sum, 3), "seconds")
+    family("claude_usage_last_probe_duration_seconds", "gauge",
+           "Duration of the most recent probe.", round(stats.last_duration_seconds, 3), "seconds")
+    family("claude_usage_probe_child_cpu_seconds", "counter",
+           "CPU time used by probed claude processes.", round(stats.child_cpu_seconds_sum, 3), "seconds")
+    family("claude_usage_last_probe_child_peak_rss_bytes", "gauge",
+           "Peak resident memory of the most recent claude process.",
+           stats.last_child_peak_rss_bytes, "bytes")
+    family("claude_usage_probe_output_bytes", "counter",
+           "Terminal output read from probed claude processes.", stats.output_bytes_sum, "bytes")
+
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def format_openmetrics(
+    snapshot: CompactSnapshot | None,
+    stats: ProbeStats,
+    now: float | None = None,
+) -> str:
+    """format_metrics() in OpenMetrics text format, terminated by "# EOF"."""
+    return format_metrics(snapshot, stats, now, openmetrics=True)
+
+
+def current_metrics(openmetrics: bool = False) -> str:
+    """Render metrics from persisted state only; never probes."""
+    return format_metrics(load_latest(), ProbeStats.load(), openmetrics=openmetrics)
+
+
+def write_textfile(path: str) -> None:
+    """Atomically write current metrics (Prometheus 0.0.4) for the node-exporter textfile collector."""
+    write_atomic(path, current_metrics())
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves /metrics from the cached snapshot, as OpenMetrics if the scraper accepts it."""
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = current_metrics(openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE
+        )
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Scrapes are frequent; keep stderr quiet
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 9808) -> ThreadingHTTPServer:
+    """Create (but do not start) the metrics HTTP server."""
+    return ThreadingHTTPServer((host, port), _MetricsHandler)
+
+
+def parse_listen_address(value: str) -> tuple[str, int]:
+    """
+    Parse "[HOST:]PORT", defaulting to localhost.
+
+    Raises:
+        ValueError: If the port is not a number
+    """
+    host, sep, port = value.rpartition(":")
+    return (host if sep and host else "127.0.0.1"), int(port)
@@ -1,6 +1,6 @@
 """Data models for Claude usage data."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -16,3 +16,35 @@ class UsageSnapshot:
     account_tier: str | None = None  # e.g., "Pro", "Max"
     raw_text: str = ""
     error: str | None = None
+    stale_reason: str | None = None  # set when serving an old snapshot instead of probing
+    missing_fields: list[str] = field(default_factory=list)  # not captured, probe was cut short
+    captured_at: int | None = None  # epoch seconds, when the data is older than now (e.g. stale)
+    # Recent history for the tooltip, attached at output time
+    sparkline: str | None = None  # session percent over the last trend_hours
+    weekly_change: int | None = None  # weekly percent change over the last trend_hours
+    trend_hours: float | None = None
+    diagnostics: dict = field(default_factory=dict, compare=False)  # probe measurements
+
+
+@dataclass(frozen=True, slots=True)
+class CompactSnapshot:
+    """
+    Immutable, slotted snapshot for history storage and IPC.
+
+    Resets are absolute epoch seconds instead of display strings, and the
+    raw CLI capture is only referenced (e.g., a dump file path), never held.
+    """
+
+    session_percent: int | None = None
+    weekly_percent: int | None = None
+    opus_percent: int | None = None
+    session_reset_at: int | None = None  # epoch seconds
+    weekly_reset_at: int | None = None  # epoch seconds
+    reset_timezone: str | None = None  # e.g., "Europe/Tallinn"
+    account_email: str | None = None
+    account_tier: str | None = None
+    error: str | None = None
+    captured_at: int = 0  # epoch seconds
+    raw_ref: str | None = None
+    stale: bool = False  # served in place of a failed probe
+    partial: bool = False  # the probe did not capture every field
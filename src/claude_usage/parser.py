@@ -1,12 +1,21 @@
 """Parse raw Claude CLI output into structured data."""
 
 import re
+from collections.abc import Callable
+from datetime import datetime, timedelta, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
 from .models import UsageSnapshot
 
 
 # ANSI escape sequence pattern - matches various escape sequences
 ANSI_PATTERN = re.compile(r"\x1b\[[0-9;]*[a-zA-Z]|\x1b\].*?\x07|\x1b\[\?[0-9]+[hl]")
 
+# Begin/end of a synchronized update (DEC private mode 2026); Claude CLI
+# brackets every redraw with them. Matched without the leading ESC, which
+# is faster to scan for and also finds markers in captures that lost it.
+FRAME_BOUNDARY_PATTERN = re.compile(r"\[\?2026([hl])")
+
 # Pattern to match email addresses
 EMAIL_PATTERN = re.compile(
     r"(?:Account|Email|Logged in as)[:\s]+(\S+@\S+)", re.IGNORECASE
@@ -92,45 +101,184 @@ def extract_account_tier(text: str) -> str | None:
     return None
 
 
-def parse_usage(raw_text: str) -> UsageSnapshot:
+def split_frames(raw_text: str) -> list[str]:
+    """
+    Split a capture into the TUI's redraw frames, newest first.
+
+    Claude CLI wraps each redraw in a synchronized update. A frame still
+    open when the capture ended may be half-rendered, so it comes last.
+
+    Args:
+        raw_text: Raw output from Claude CLI (with escape sequences)
+
+    Returns:
+        Text of each frame; the whole capture if it has no frame markers
+    """
+    # [text, marker, text, marker, ..., text]; drop each marker's ESC
+    parts = FRAME_BOUNDARY_PATTERN.split(raw_text)
+    frames = [parts[i].removesuffix("\x1b") for i in range(len(parts) - 3, -1, -2)]
+    if len(parts) > 1 and parts[-2] == "h":
+        # Trailing frame never closed
+        frames.append(parts[-1])
+    else:
+        frames.insert(0, parts[-1])
+    return frames
+
+
+def _extract_latest(
+    frames: list[str], extractors: dict[str, Callable[[str], object]], anchor: str | None = None
+) -> dict:
+    """
+    Take each field from the first (newest) frame that has it.
+
+    Stops scanning older frames as soon as every field is found, or after
+    the newest frame showing the anchor field: that frame is a complete
+    view, so fields it lacks (e.g. no Opus limit) are absent.
+    """
+    found: dict = {}
+    for frame in frames:
+        frame = strip_ansi(frame)
+        for name, extract in extractors.items():
+            if name not in found:
+                value = extract(frame)
+                if value is not None:
+                    found[name] = value
+        if len(found) == len(extractors) or anchor in found:
+            break
+    return found
+
+
+def _remaining(used: int | None) -> int | None:
+    """Percent remaining from percent used."""
+    return None if used is None else 100 - used
+
+
+# Fields of the Usage view and the Status view, and how to find them in a frame
+_USAGE_FIELDS: dict[str, Callable[[str], object]] = {
+    "session_percent": lambda text: extract_section_percent(text, "Current session"),
+    "session_reset": lambda text: extract_section_reset(text, "Current session"),
+    "weekly_percent": lambda text: extract_section_percent(text, "Current week"),
+    "weekly_reset": lambda text: extract_section_reset(text, "Current week"),
+    "opus_percent": lambda text: extract_section_percent(text, "Opus"),
+}
+_ACCOUNT_FIELDS: dict[str, Callable[[str], object]] = {
+    "account_email": extract_email,
+    "account_tier": extract_account_tier,
+}
+
+
+def parse_usage(raw_text: str, status_text: str | None = None) -> UsageSnapshot:
     """
     Parse raw CLI output into a UsageSnapshot.
 
     Args:
         raw_text: Raw output from Claude CLI
+        status_text: Status view captured separately (e.g. by a parallel
+            session); account fields missing from it are taken from raw_text
+
+    Each field is taken from the newest redraw frame that shows it, so
+    stale or half-rendered earlier frames don't win.
 
     Returns:
         Parsed UsageSnapshot
     """
-    # Strip ANSI codes for easier parsing
-    clean_text = strip_ansi(raw_text)
-
-    # Extract session data (labeled "Current session")
-    session_percent = extract_section_percent(clean_text, "Current session")
-    session_reset = extract_section_reset(clean_text, "Current session")
+    # Newest frame first; a separately captured Status view takes precedence
+    frames = split_frames(raw_text)
+    status_frames = split_frames(status_text) if status_text else []
 
-    # Extract weekly data (labeled "Current week")
-    weekly_percent = extract_section_percent(clean_text, "Current week")
-    weekly_reset = extract_section_reset(clean_text, "Current week")
-
-    # Extract Opus data if present
-    opus_percent = extract_section_percent(clean_text, "Opus")
+    fields = _extract_latest(frames, _USAGE_FIELDS, anchor="session_percent")
+    fields.update(_extract_latest(status_frames + frames, _ACCOUNT_FIELDS))
 
     # Convert "used" to "remaining" - the usage shows X% used, we want remaining
-    if session_percent is not None:
-        session_percent = 100 - session_percent
-    if weekly_percent is not None:
-        weekly_percent = 100 - weekly_percent
-    if opus_percent is not None:
-        opus_percent = 100 - opus_percent
+    session_percent = _remaining(fields.get("session_percent"))
+    weekly_percent = _remaining(fields.get("weekly_percent"))
+    opus_percent = _remaining(fields.get("opus_percent"))
 
     return UsageSnapshot(
         session_percent=session_percent,
         weekly_percent=weekly_percent,
         opus_percent=opus_percent,
-        session_reset=session_reset,
-        weekly_reset=weekly_reset,
-        account_email=extract_email(clean_text),
-        account_tier=extract_account_tier(clean_text),
-        raw_text=raw_text,
+        session_reset=fields.get("session_reset"),
+        weekly_reset=fields.get("weekly_reset"),
+        account_email=fields.get("account_email"),
+        account_tier=fields.get("account_tier"),
+        raw_text=raw_text if status_text is None else raw_text + "\n" + status_text,
+    )
+
+
+# Reset time like "Jan 1, 2026, 10:59am (Europe/Tallinn)", "4pm (Europe/Tallinn)" or "Jan 5, 2026"
+RESET_TIME_PATTERN = re.compile(
+    r"^\s*(?:(?P<month>[A-Za-z]{3})[a-z]*\s+(?P<day>\d{1,2})(?:,\s*(?P<year>\d{4}))?)?"
+    r"[,\s]*(?:at\s+)?(?:(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<period>am|pm))?"
+    r"\s*(?:\((?P<tz>[^)]+)\))?\s*$",
+    re.IGNORECASE,
+)
+
+_MONTHS = {
+    name: number
+    for number, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"],
+        start=1,
     )
+}
+
+
+def _reset_timezone(name: str | None, now: datetime) -> tzinfo:
+    """Resolve an IANA zone name from a reset string, falling back to now's zone."""
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return now.tzinfo or now.astimezone().tzinfo
+
+
+def parse_reset_time(reset_time: str, now: datetime | None = None) -> datetime | None:
+    """
+    Resolve a reset string to an absolute, timezone-aware datetime.
+
+    Claude CLI formats:
+      4pm (Europe/Tallinn)                     -> next 16:00 in that zone
+      Jan 1, 2026, 10:59am (Europe/Tallinn)    -> that exact time
+      Jan 5, 2026                              -> midnight local time
+
+    Args:
+        reset_time: Reset string as extracted by extract_section_reset
+        now: Reference time for strings without a date (default: current time)
+
+    Returns:
+        Aware datetime, or None if the string is not recognized
+    """
+    match = RESET_TIME_PATTERN.match(reset_time)
+    if not match or not (match.group("month") or match.group("hour")):
+        return None
+
+    now = now or datetime.now().astimezone()
+    tz = _reset_timezone(match.group("tz"), now)
+    local_now = now.astimezone(tz)
+
+    hour = minute = 0
+    if match.group("hour"):
+        hour = int(match.group("hour")) % 12
+        minute = int(match.group("minute") or 0)
+        if match.group("period").lower() == "pm":
+            hour += 12
+
+    try:
+        if match.group("month"):
+            month = _MONTHS.get(match.group("month").lower())
+            if month is None:
+                return None
+            year = int(match.group("year") or local_now.year)
+            resolved = datetime(year, month, int(match.group("day")), hour, minute, tzinfo=tz)
+            if not match.group("year") and resolved < local_now:
+                resolved = resolved.replace(year=year + 1)
+            return resolved
+
+        # Time only: the next occurrence of that time of day
+        resolved = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if resolved < local_now:
+            resolved += timedelta(days=1)
+        return resolved
+    except ValueError:
+        return None
@@ -0,0 +1,132 @@
+"""Per-phase probe latency statistics and the deadlines learned from them."""
+
+import math
+import os
+import socket
+import time
+from dataclasses import dataclass, field
+
+from .state import load_json, save_json
+
+PHASE_STATS_FILE = "phase-stats.json"
+
+# Steps of one claude session, in order
+PHASES = ("startup", "usage", "status", "exit")
+
+# Weight of the newest sample in the moving average
+EWMA_ALPHA = 0.2
+
+# Recent samples kept per phase for the percentile
+SAMPLES_KEPT = 50
+
+# Samples needed before a learned deadline replaces the configured one
+MIN_SAMPLES = 5
+
+# A phase may take this many times its p99 before it counts as stuck
+DEADLINE_FACTOR = 2.0
+
+# Learned deadlines never go below this many seconds
+MIN_DEADLINE = 1.0
+
+# Machine/CLI combinations remembered (older ones are dropped)
+_KEYS_KEPT = 4
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0-100) of a non-empty list."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def environment_key(claude_path: str) -> str:
+    """
+    Identify this machine and claude installation.
+
+    The resolved binary's mtime changes with every CLI upgrade, so a new
+    version starts learning afresh without having to run claude --version.
+    """
+    real_path = os.path.realpath(claude_path)
+    try:
+        mtime = int(os.stat(real_path).st_mtime)
+    except OSError:
+        mtime = 0
+    return f"{socket.gethostname()}:{real_path}@{mtime}"
+
+
+@dataclass
+class PhaseStat:
+    """Latency history of one phase."""
+
+    ewma: float | None = None
+    samples: list[float] = field(default_factory=list)
+
+    def record(self, seconds: float) -> None:
+        self.ewma = seconds if self.ewma is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ewma
+        self.samples = [*self.samples, seconds][-SAMPLES_KEPT:]
+
+    @property
+    def p99(self) -> float | None:
+        return percentile(self.samples, 99) if self.samples else None
+
+    def deadline(self, ceiling: float) -> float:
+        """p99 x DEADLINE_FACTOR once enough samples exist, never above ceiling."""
+        if len(self.samples) < MIN_SAMPLES:
+            return ceiling
+        return min(ceiling, max(MIN_DEADLINE, self.p99 * DEADLINE_FACTOR))
+
+
+class PhaseStats:
+    """Phase latency statistics for one machine and CLI version, persisted in the cache dir."""
+
+    def __init__(self, key: str, phases: dict[str, PhaseStat] | None = None) -> None:
+        self.key = key
+        self.phases = phases or {}
+
+    @classmethod
+    def load(cls, key: str) -> "PhaseStats":
+        """Load the statistics for key (empty if none)."""
+        entry = load_json(PHASE_STATS_FILE).get(key, {})
+        phases = {}
+        for name, data in entry.get("phases", {}).items():
+            try:
+                phases[name] = PhaseStat(ewma=data.get("ewma"), samples=list(data.get("samples", [])))
+            except (AttributeError, TypeError):
+                continue
+        return cls(key, phases)
+
+    def save(self) -> None:
+        """Persist, keeping only the most recently used keys."""
+        data = load_json(PHASE_STATS_FILE)
+        data[self.key] = {
+            "used_at": time.time(),
+            "phases": {
+                name: {"ewma": stat.ewma, "samples": stat.samples}
+                for name, stat in self.phases.items()
+            },
+        }
+        recent = sorted(data, key=lambda key: data[key].get("used_at", 0), reverse=True)
+        save_json(PHASE_STATS_FILE, {key: data[key] for key in recent[:_KEYS_KEPT]})
+
+    def record(self, durations: dict[str, float]) -> None:
+        """Add one observed duration per phase."""
+        for name, seconds in durations.items():
+            self.phases.setdefault(name, PhaseStat()).record(seconds)
+
+    def deadlines(self, ceilings: dict[str, float]) -> dict[str, float]:
+        """Learned deadline for each phase in ceilings."""
+        return {
+            name: self.phases.get(name, PhaseStat()).deadline(ceiling)
+            for name, ceiling in ceilings.items()
+        }
+
+    def summary(self) -> dict[str, dict]:
+        """Statistics per phase, for diagnostics."""
+        return {
+            name: {
+                "ewma": round(stat.ewma, 3) if stat.ewma is not None else None,
+                "p99": round(stat.p99, 3) if stat.p99 is not None else None,
+                "samples": len(stat.samples),
+            }
+            for name, stat in self.phases.items()
+        }
@@ -1,8 +1,356 @@
 """PTY interaction with Claude CLI to fetch usage data."""
 
+import ctypes
+import io
 import os
+import platform
+import re
+import resource
 import shutil
+import signal
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
 import pexpect
+import ptyprocess
+
+from .phases import PHASES, PhaseStats, environment_key
+
+# ioprio_set(2) syscall numbers; there is no libc wrapper
+_IOPRIO_SET_SYSCALLS = {"x86_64": 251, "i386": 289, "i686": 289, "aarch64": 30, "armv7l": 314}
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_CLASS_BEST_EFFORT = 2
+_IOPRIO_CLASS_IDLE = 3
+
+
+# Matching only ever looks at the newest output: one read (at most
+# READ_CHUNK characters) plus an overlap for a match straddling two reads.
+# Without a window, pexpect rescans the whole, ever-growing buffer of a
+# redraw-heavy TUI after every read.
+READ_CHUNK = 4096
+SEARCH_OVERLAP = 256
+SEARCH_WINDOW = READ_CHUNK + SEARCH_OVERLAP
+
+# Characters of output kept per view. The parser only needs the newest
+# frames, and a redraw loop must not grow the capture without bound.
+MAX_CAPTURE = 256 * 1024
+
+READY_PATTERNS = [
+    re.compile(r"\? for shortcuts"),  # Help hint at bottom of welcome screen
+    re.compile(r"(?:^|[\r\n│])\s*[>›][ \u00a0]", re.MULTILINE),  # Prompt at line start or box edge
+    re.compile(r"trust this"),  # Folder trust prompt
+    re.compile(r"Do you want"),  # Various prompts
+    pexpect.TIMEOUT,
+    pexpect.EOF,
+]
+
+# Only a percentage means the view rendered: the help hint drawn with the
+# prompt is usually still unread when /usage is sent
+USAGE_PATTERNS = [
+    re.compile(r"\d{1,3}\s*%\s*(?:used|remaining|left)", re.IGNORECASE),  # "26% used"
+    pexpect.TIMEOUT,
+    pexpect.EOF,
+]
+
+STATUS_PATTERNS = [
+    re.compile(r"Login method:"),
+    re.compile(r"Version:\s"),
+    pexpect.TIMEOUT,
+]
+
+# Start of a synchronized update: the TUI wraps every redraw in one
+_SYNC_START = b"\x1b[?2026h"
+
+
+@dataclass
+class ProbeProfile:
+    """The terminal claude is given: PTY size and environment on top of TERM=dumb."""
+
+    dimensions: tuple[int, int]  # rows, columns
+    env: dict[str, str] = field(default_factory=dict)
+
+
+PROBE_PROFILES = {
+    # pexpect's default terminal
+    "default": ProbeProfile(dimensions=(24, 80)),
+    # Narrower, so every horizontal rule in every redraw is shorter, but tall
+    # enough that the Usage view never overflows into full-screen redraws; no
+    # colour, terminal title or update notice
+    "quiet": ProbeProfile(
+        dimensions=(30, 64),
+        env={
+            "NO_COLOR": "1",
+            "FORCE_COLOR": "0",
+            "CLAUDE_CODE_DISABLE_TERMINAL_TITLE": "1",
+            "DISABLE_AUTOUPDATER": "1",
+        },
+    ),
+}
+
+
+@dataclass
+class ProbeOptions:
+    """How to run the claude child process."""
+
+    timeout: int = 15
+    # Low-impact mode: CPU niceness increment and I/O priority for the child
+    low_impact: bool = False
+    nice: int = 10
+    io_idle: bool = False  # idle I/O class instead of lowest best-effort
+    # Optional hard limits for the child (None = inherit)
+    max_address_space: int | None = None  # bytes (RLIMIT_AS)
+    max_cpu_seconds: int | None = None  # RLIMIT_CPU
+    max_open_files: int | None = None  # RLIMIT_NOFILE
+    # Where account info comes from: "tab" (same session, after Usage),
+    # "parallel" (second session at the same time) or "cached" (skipped)
+    status: str = "tab"
+    # Derive each phase's deadline from its observed latency on this machine
+    adaptive_timeouts: bool = False
+    # Seconds for the whole probe, shared by all phases (None = per-phase timeouts only)
+    deadline: float | None = None
+    # Key of PROBE_PROFILES: terminal size and environment for the child
+    profile: str = "default"
+
+
+# Values for ProbeOptions.status
+STATUS_SOURCES = ("tab", "parallel", "cached")
+
+# Fixed waits for the phases --timeout does not cover
+STATUS_TIMEOUT = 3
+EXIT_TIMEOUT = 5
+
+
+class DeadlineExceeded(RuntimeError):
+    """The overall probe deadline ran out before the Usage view rendered."""
+
+
+class _PhaseTiming:
+    """
+    Deadline per phase of one claude session, and how long each phase took.
+
+    With expires_at (a time.monotonic() value), no phase waits past it.
+    """
+
+    def __init__(self, deadlines: dict[str, float], expires_at: float | None = None) -> None:
+        self.deadlines = deadlines
+        self.expires_at = expires_at
+        self.durations: dict[str, float] = {}
+
+    def remaining(self) -> float | None:
+        """Seconds left of the overall deadline, or None without one."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, phase: str, limit: float | None = None) -> float:
+        """How long phase (or a pause capped at limit) may wait right now."""
+        seconds = self.deadlines[phase] if limit is None else limit
+        remaining = self.remaining()
+        return seconds if remaining is None else min(seconds, remaining)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0
+
+    def done(self, phase: str, started: float) -> None:
+        """Record that phase completed (it is only recorded when it did)."""
+        self.durations[phase] = round(time.monotonic() - started, 3)
+
+
+@dataclass
+class ProbeResult:
+    """Raw CLI output plus measurements of the probe itself."""
+
+    output: str
+    diagnostics: dict = field(default_factory=dict)
+    # Status view output, if it was captured
+    status_output: str | None = None
+    # Views that were not captured because the probe was cut short
+    missing_views: list[str] = field(default_factory=list)
+
+    @property
+    def raw_text(self) -> str:
+        """Usage and Status output as one text, as --dump-raw shows it."""
+        if self.status_output is None:
+            return self.output
+        return self.output + "\n" + self.status_output
+
+
+def _ioprio_call(io_class: int, level: int) -> Callable[[], None] | None:
+    """
+    Prepare setting the calling process's I/O scheduling priority (Linux only).
+
+    libc is resolved here, in the parent: dlopen() in a forked child can
+    deadlock on a loader lock another thread held at fork time, so the
+    returned function only makes the syscall.
+
+    Returns:
+        The call, or None where ioprio_set(2) is not available
+    """
+    number = _IOPRIO_SET_SYSCALLS.get(platform.machine())
+    if number is None:
+        return None
+    try:
+        syscall = ctypes.CDLL(None, use_errno=True).syscall
+    except (OSError, AttributeError):
+        return None
+    priority = (io_class << _IOPRIO_CLASS_SHIFT) | level
+
+    def call() -> None:
+        syscall(number, _IOPRIO_WHO_PROCESS, 0, priority)
+
+    return call
+
+
+def _child_setup(options: ProbeOptions):
+    """
+    Build the preexec_fn that applies priorities and limits in the child.
+
+    Every step is best effort: a refused limit must not prevent the probe.
+    """
+    set_ioprio = None
+    if options.low_impact:
+        if options.io_idle:
+            set_ioprio = _ioprio_call(_IOPRIO_CLASS_IDLE, 0)
+        else:
+            set_ioprio = _ioprio_call(_IOPRIO_CLASS_BEST_EFFORT, 7)
+    limits = [
+        (resource.RLIMIT_AS, options.max_address_space),
+        (resource.RLIMIT_CPU, options.max_cpu_seconds),
+        (resource.RLIMIT_NOFILE, options.max_open_files),
+    ]
+
+    def setup() -> None:
+        if options.low_impact:
+            try:
+                os.nice(options.nice)
+            except OSError:
+                pass
+            if set_ioprio is not None:
+                set_ioprio()
+        for limit, value in limits:
+            if value is None:
+                continue
+            try:
+                _, hard = resource.getrlimit(limit)
+                if hard != resource.RLIM_INFINITY:
+                    value = min(value, hard)
+                resource.setrlimit(limit, (value, hard))
+            except (OSError, ValueError):
+                pass
+
+    return setup
+
+
+class _AccountedPtyProcess(ptyprocess.PtyProcess):
+    """PtyProcess that reaps the child with wait4() to keep its resource usage."""
+
+    rusage: resource.struct_rusage | None = None
+
+    def isalive(self) -> bool:
+        if self.terminated:
+            return False
+        # Like PtyProcess: after EOF, block to collect the defunct child
+        options = 0 if self.flag_eof else os.WNOHANG
+        pid, status, usage = os.wait4(self.pid, options)
+        if pid == 0:
+            return True
+        if os.WIFEXITED(status):
+            self.exitstatus, self.signalstatus = os.WEXITSTATUS(status), None
+        elif os.WIFSIGNALED(status):
+            self.exitstatus, self.signalstatus = None, os.WTERMSIG(status)
+        else:
+            # Stopped, not gone
+            return True
+        self.status = status
+        self.rusage = usage
+        self.terminated = True
+        return False
+
+
+class _TailBuffer(io.StringIO):
+    """StringIO that only keeps about the last MAX_CAPTURE characters written."""
+
+    def write(self, text: str) -> int:
+        written = super().write(text)
+        # Trim at twice the limit so the copy happens rarely
+        if self.tell() > 2 * MAX_CAPTURE:
+            tail = self.getvalue()[-MAX_CAPTURE:]
+            self.seek(0)
+            self.truncate()
+            super().write(tail)
+        return written
+
+
+class _CountingDecoder:
+    """Wraps pexpect's incremental decoder to count what the child wrote, before decoding."""
+
+    def __init__(self, decoder) -> None:
+        self._decoder = decoder
+        self.bytes = 0
+        self.escapes = 0
+        self.frames = 0
+        self._tail = b""  # end of the previous read, for a marker split across two
+
+    def decode(self, data: bytes, final: bool = False):
+        self.bytes += len(data)
+        self.escapes += data.count(b"\x1b")
+        window = self._tail + data
+        self.frames += window.count(_SYNC_START)
+        self._tail = window[-(len(_SYNC_START) - 1) :]
+        return self._decoder.decode(data, final)
+
+    def counts(self) -> dict[str, int]:
+        return {"output_bytes": self.bytes, "escape_sequences": self.escapes, "redraw_frames": self.frames}
+
+
+def _add_counts(first: dict[str, int], second: dict[str, int] | None) -> dict[str, int]:
+    """Output counters of two children, summed."""
+    return {name: value + (second or {}).get(name, 0) for name, value in first.items()}
+
+
+class _AccountedSpawn(pexpect.spawn):
+    """
+    pexpect.spawn whose child's rusage is available after it exits, and
+    which counts the bytes, escape sequences and redraw frames it read.
+
+    In text mode, the untrimmed output pexpect accumulates until the next
+    match (which becomes child.before) is capped at MAX_CAPTURE.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._decoder = _CountingDecoder(self._decoder)
+        if self.encoding is not None:
+            self.buffer_type = _TailBuffer
+            self._before = _TailBuffer()
+
+    def output_counts(self) -> dict[str, int]:
+        return self._decoder.counts()
+
+    def _spawnpty(self, args, **kwargs):
+        return _AccountedPtyProcess.spawn(args, **kwargs)
+
+
+def _usage_diagnostics(
+    usage: resource.struct_rusage | None, before: resource.struct_rusage
+) -> dict:
+    """Peak RSS and CPU time of the child, from wait4() or RUSAGE_CHILDREN deltas."""
+    if usage is not None:
+        return {
+            "child_peak_rss_kb": usage.ru_maxrss,
+            "child_cpu_user_seconds": round(usage.ru_utime, 3),
+            "child_cpu_system_seconds": round(usage.ru_stime, 3),
+        }
+    # Fallback: the child was not reaped by us, so only CPU time deltas are exact
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "child_cpu_user_seconds": round(after.ru_utime - before.ru_utime, 3),
+        "child_cpu_system_seconds": round(after.ru_stime - before.ru_stime, 3),
+    }
 
 
 def fetch_usage_raw(timeout: int = 15) -> str:
@@ -19,118 +367,347 @@ def fetch_usage_raw(timeout: int = 15) -> str:
         FileNotFoundError: If claude binary is not found
         RuntimeError: If interaction fails
     """
-    # Check if claude is installed
-    claude_path = shutil.which("claude")
-    if not claude_path:
-        raise FileNotFoundError(
-            "Claude CLI not found. Install it with: npm install -g @anthropic-ai/claude-code"
+    return probe_usage(ProbeOptions(timeout=timeout)).raw_text
+
+
+def _spawn(claude_path: str, options: ProbeOptions, timing: _PhaseTiming) -> _AccountedSpawn:
+    """Start claude in a PTY and wait until it accepts input."""
+    timeout = timing.timeout("startup")
+    started = time.monotonic()
+
+    # Build environment - inherit current env but set TERM to reduce ANSI
+    profile = PROBE_PROFILES[options.profile]
+    env = os.environ.copy()
+    env["TERM"] = "dumb"
+    env.update(profile.env)
+
+    # Spawn claude in a PTY using full path
+    child = _AccountedSpawn(
+        claude_path,
+        encoding="utf-8",
+        timeout=timeout,
+        env=env,
+        dimensions=profile.dimensions,
+        preexec_fn=_child_setup(options),
+        maxread=READ_CHUNK,
+        searchwindowsize=SEARCH_WINDOW,
+    )
+
+    # Wait for Claude to be ready - look for the prompt character or help hint
+    index = child.expect(READY_PATTERNS, timeout=timeout)
+
+    if index == 2 or index == 3:
+        # Handle trust prompt - send 'y' to accept
+        child.sendline("y")
+        index = child.expect(READY_PATTERNS, timeout=timing.timeout("startup"))
+    if index == 4:
+        _close(child, timing)
+        if timing.expired:
+            raise DeadlineExceeded(
+                f"Deadline of {options.deadline:g}s reached before Claude CLI started"
+            )
+        raise RuntimeError(
+            f"Timeout waiting for Claude CLI to start (waited {timeout:g}s)"
         )
+    elif index == 5:
+        _close(child, timing)
+        raise RuntimeError("Claude CLI exited unexpectedly")
+    timing.done("startup", started)
+
+    # Small delay to ensure prompt is fully rendered
+    time.sleep(timing.timeout("startup", 0.3))
+    return child
+
+
+def _send_command(child: pexpect.spawn, command: str, timing: _PhaseTiming, phase: str) -> None:
+    """Type a slash command and press Enter twice."""
+    # First Enter might just confirm autocomplete, second executes
+    child.send(f"{command}\r")
+    time.sleep(timing.timeout(phase, 0.3))
+    child.send("\r")  # Confirm the selection
+
+
+def _close(child: pexpect.spawn, timing: _PhaseTiming, force: bool = True) -> None:
+    """
+    Close the child's terminal and reap it.
+
+    Past the deadline it is killed outright: close() would first sleep
+    through its grace delays, up to half a second for a child ignoring
+    polite signals.
+    """
+    if timing.expired:
+        child.ptyproc.delayafterclose = child.ptyproc.delayafterterminate = 0
+        if child.isalive():
+            child.kill(signal.SIGKILL)
+            # SIGKILL cannot be ignored: block until it is reaped instead of polling
+            child.ptyproc.flag_eof = True
+        force = True
+    child.close(force=force)
 
+
+def _drain(child: pexpect.spawn, timeout: float = 0.5) -> None:
+    """Read any remaining output into child.before."""
     try:
-        # Build environment - inherit current env but set TERM to reduce ANSI
-        env = os.environ.copy()
-        env["TERM"] = "dumb"
-
-        # Spawn claude in a PTY using full path
-        child = pexpect.spawn(
-            claude_path,
-            encoding="utf-8",
-            timeout=timeout,
-            env=env,
-        )
+        child.expect(pexpect.TIMEOUT, timeout=timeout)
+    except pexpect.ExceptionPexpect:
+        pass
 
-        # Wait for Claude to be ready - look for the prompt character or help hint
-        ready_patterns = [
-            r"\? for shortcuts",  # Help hint at bottom of welcome screen
-            r"[>›]",  # Prompt character
-            r"trust this",  # Folder trust prompt
-            r"Do you want",  # Various prompts
-            pexpect.TIMEOUT,
-            pexpect.EOF,
-        ]
-
-        index = child.expect(ready_patterns)
-
-        if index == 2 or index == 3:
-            # Handle trust prompt - send 'y' to accept
-            child.sendline("y")
-            child.expect(ready_patterns)
-        elif index == 4:
-            raise RuntimeError(
-                f"Timeout waiting for Claude CLI to start (waited {timeout}s)"
-            )
-        elif index == 5:
-            raise RuntimeError("Claude CLI exited unexpectedly")
 
-        # Small delay to ensure prompt is fully rendered
-        import time
+def _capture_usage(child: pexpect.spawn, timing: _PhaseTiming) -> str:
+    """Open the Usage tab and return its output."""
+    started = time.monotonic()
+    _send_command(child, "/usage", timing, "usage")
 
-        time.sleep(0.3)
+    # Wait for usage output - look for percentage patterns
+    rendered = ""
+    if child.expect(USAGE_PATTERNS, timeout=timing.timeout("usage")) == 0:
+        # Keep the frame up to and including the match, not just what follows
+        rendered = child.before + child.after
+        timing.done("usage", started)
 
-        # Type /usage and press Enter twice
-        # First Enter might just confirm autocomplete, second executes
-        child.send("/usage\r")
-        time.sleep(0.3)
-        child.send("\r")  # Confirm the selection
+    # Wait a bit more for full output
+    time.sleep(timing.timeout("usage", 1.0))
+    _drain(child, timing.timeout("usage", 0.5))
+    return (rendered + (child.before or ""))[-MAX_CAPTURE:]
 
-        # Wait for usage output - look for percentage patterns
-        usage_patterns = [
-            r"\d+\s*%",  # Percentage in output
-            r"remaining",  # "X% remaining"
-            r"used",  # "X% used"
-            r"\? for shortcuts",  # Back to prompt
-            pexpect.TIMEOUT,
-            pexpect.EOF,
-        ]
 
-        child.expect(usage_patterns, timeout=timeout)
+def _wait_for_status(child: pexpect.spawn, timing: _PhaseTiming, started: float) -> str:
+    """Return the Status tab output once it has rendered."""
+    # Keep the matched marker: it is part of the "Login method: ..." line
+    rendered = ""
+    try:
+        if child.expect(STATUS_PATTERNS, timeout=timing.timeout("status")) < 2:
+            rendered = child.before + child.after
+            timing.done("status", started)
+    except pexpect.ExceptionPexpect:
+        pass
+    _drain(child, timing.timeout("status", 0.5))
+    return (rendered + (child.before or ""))[-MAX_CAPTURE:]
 
-        # Wait a bit more for full output
-        time.sleep(1.0)
 
-        # Read any remaining output
-        try:
-            child.expect(pexpect.TIMEOUT, timeout=0.5)
-        except pexpect.ExceptionPexpect:
-            pass
+def _exit(child: pexpect.spawn, timing: _PhaseTiming) -> None:
+    """Close any menu, /exit, and reap the child."""
+    started = time.monotonic()
+    # Clean exit - send Escape first to close any menu, then /exit
+    child.send("\x1b")  # Escape
+    time.sleep(timing.timeout("exit", 0.1))
+    child.send("/exit\r")
+    time.sleep(timing.timeout("exit", 0.1))
+    child.send("\r")  # Confirm exit
+    try:
+        child.expect(pexpect.EOF, timeout=timing.timeout("exit"))
+        timing.done("exit", started)
+    except pexpect.ExceptionPexpect:
+        pass
+    _close(child, timing, force=False)
 
-        # Capture Usage tab output
-        usage_output = child.before or ""
 
-        # Press Tab to switch to Status tab for account tier info
-        child.send("\t")
-        time.sleep(0.5)
+class _StatusCapture(threading.Thread):
+    """Captures the Status view from a second claude session, alongside the main probe."""
 
-        # Wait for Status tab content
-        try:
-            child.expect([r"Login method", r"Version", pexpect.TIMEOUT], timeout=3)
-        except pexpect.ExceptionPexpect:
-            pass
+    def __init__(self, claude_path: str, options: ProbeOptions, timing: _PhaseTiming) -> None:
+        super().__init__(name="claude-status", daemon=True)
+        self.claude_path = claude_path
+        self.options = options
+        self.timing = timing
+        self.output: str | None = None
+        self.error: str | None = None
+        self.rusage: resource.struct_rusage | None = None
+        self.counts: dict[str, int] | None = None
 
-        # Read Status tab output
+    def run(self) -> None:
+        child = None
         try:
-            child.expect(pexpect.TIMEOUT, timeout=0.5)
-        except pexpect.ExceptionPexpect:
-            pass
+            child = _spawn(self.claude_path, self.options, self.timing)
+            started = time.monotonic()
+            _send_command(child, "/status", self.timing, "status")
+            self.output = _wait_for_status(child, self.timing, started)
+            _exit(child, self.timing)
+        except (pexpect.ExceptionPexpect, RuntimeError, OSError) as e:
+            self.error = str(e)
+            if child is not None and child.isalive():
+                _close(child, self.timing)
+        if child is not None:
+            self.rusage = child.ptyproc.rusage
+            self.counts = child.output_counts()
 
-        status_output = child.before or ""
 
-        # Combine both outputs
-        output = usage_output + "\n" + status_output
+def _add_rusage(
+    first: resource.struct_rusage | None, second: resource.struct_rusage | None
+) -> resource.struct_rusage | None:
+    """Combined usage of two children: summed CPU time, the larger peak RSS."""
+    if first is None or second is None:
+        return first or second
+    fields = list(first)
+    fields[0] = first.ru_utime + second.ru_utime
+    fields[1] = first.ru_stime + second.ru_stime
+    fields[2] = max(first.ru_maxrss, second.ru_maxrss)
+    return resource.struct_rusage(fields)
 
-        # Clean exit - send Escape first to close any menu, then /exit
-        child.send("\x1b")  # Escape
-        time.sleep(0.1)
-        child.send("/exit\r")
-        time.sleep(0.1)
-        child.send("\r")  # Confirm exit
-        try:
-            child.expect(pexpect.EOF, timeout=5)
-        except pexpect.ExceptionPexpect:
-            pass
-        child.close()
 
-        return output
+def _only(durations: dict[str, float], phase: str) -> dict[str, float]:
+    """durations restricted to one phase."""
+    return {phase: durations[phase]} if phase in durations else {}
+
+
+def _save_quietly(stats: PhaseStats) -> None:
+    """Persist phase statistics; an unwritable cache must not fail the probe."""
+    try:
+        stats.save()
+    except OSError:
+        pass
+
+
+def _phase_diagnostics(
+    durations: dict[str, float], deadlines: dict[str, float], stats: PhaseStats
+) -> dict[str, dict]:
+    """Per phase: this probe's time and deadline, and the learned statistics."""
+    summary = stats.summary()
+    return {
+        phase: {
+            "seconds": durations.get(phase),
+            "deadline": round(deadlines[phase], 3),
+            **summary.get(phase, {}),
+        }
+        for phase in PHASES
+    }
+
+
+def probe_usage(options: ProbeOptions | None = None) -> ProbeResult:
+    """
+    Spawn Claude CLI, send /usage command, and capture output and diagnostics.
+
+    With options.status "tab", the Status view is read afterwards in the same
+    session. With "parallel", a second session runs /status concurrently, so
+    the probe takes as long as the slower of the two rather than their sum;
+    if only that side fails, the usage output is still returned. With
+    "cached", the Status view is skipped.
+
+    The child runs in the terminal of options.profile; the bytes, escape
+    sequences and redraw frames it wrote are counted in the diagnostics, so
+    profiles can be compared.
+
+    Phase latencies are recorded per machine and CLI version; with
+    options.adaptive_timeouts each phase's deadline is derived from them.
+
+    With options.deadline, all phases share one budget. Once the Usage view
+    has rendered, running out of it (or any later failure) no longer fails
+    the probe: the views captured so far are returned and the rest listed
+    in ProbeResult.missing_views.
+
+    Args:
+        options: How to run the child (default: ProbeOptions())
+
+    Returns:
+        ProbeResult with the raw CLI output and the child's resource usage
+
+    Raises:
+        FileNotFoundError: If claude binary is not found
+        DeadlineExceeded: If options.deadline ran out before the Usage view rendered,
+            including while claude was still starting
+        RuntimeError: If interaction fails before the Usage view rendered
+    """
+    options = options or ProbeOptions()
+
+    # Check if claude is installed
+    claude_path = shutil.which("claude")
+    if not claude_path:
+        raise FileNotFoundError(
+            "Claude CLI not found. Install it with: npm install -g @anthropic-ai/claude-code"
+        )
+
+    stats = PhaseStats.load(environment_key(claude_path))
+    ceilings = {
+        "startup": options.timeout,
+        "usage": options.timeout,
+        "status": STATUS_TIMEOUT,
+        "exit": EXIT_TIMEOUT,
+    }
+    deadlines = stats.deadlines(ceilings) if options.adaptive_timeouts else ceilings
+
+    started = time.monotonic()
+    expires_at = started + options.deadline if options.deadline is not None else None
+    timing = _PhaseTiming(deadlines, expires_at)
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    status_capture = None
+    if options.status == "parallel":
+        status_capture = _StatusCapture(claude_path, options, _PhaseTiming(deadlines, expires_at))
+        status_capture.start()
+
+    diagnostics = {}
+    child = None
+    usage_output = ""
+    status_output = None
+    try:
+        child = _spawn(claude_path, options, timing)
+        usage_output = _capture_usage(child, timing)
+        if "usage" not in timing.durations and timing.expired:
+            raise DeadlineExceeded(
+                f"Deadline of {options.deadline:g}s reached before the Usage view rendered"
+            )
+
+        if options.status == "tab":
+            # Press Tab to switch to Status tab for account tier info
+            status_started = time.monotonic()
+            child.send("\t")
+            time.sleep(timing.timeout("status", 0.5))
+            status_output = _wait_for_status(child, timing, status_started)
+
+        _exit(child, timing)
+    except (pexpect.ExceptionPexpect, OSError) as e:
+        if child is not None and child.isalive():
+            _close(child, timing)
+        if "usage" not in timing.durations:
+            raise RuntimeError(f"Failed to interact with Claude CLI: {e}")
+        # Usage is already in hand: keep it rather than fail the whole probe
+        diagnostics["partial_error"] = str(e)
+    except RuntimeError:
+        if child is not None and child.isalive():
+            _close(child, timing)
+        raise
+    finally:
+        if status_capture is not None:
+            status_capture.join(timing.remaining())
+        # Whatever phases completed are still worth learning from
+        stats.record(timing.durations)
+        if status_capture is not None and not status_capture.is_alive():
+            stats.record(status_capture.timing.durations)
+        _save_quietly(stats)
+
+    rusage = child.ptyproc.rusage
+    counts = child.output_counts()
+    durations = timing.durations
+    if status_capture is not None and status_capture.is_alive():
+        # Still tearing down its session after the deadline; it will not be waited for
+        diagnostics["status_error"] = "deadline reached"
+    elif status_capture is not None:
+        status_output = status_capture.output
+        rusage = _add_rusage(rusage, status_capture.rusage)
+        counts = _add_counts(counts, status_capture.counts)
+        durations = {**durations, **_only(status_capture.timing.durations, "status")}
+        if status_capture.error:
+            diagnostics["status_error"] = status_capture.error
+
+    missing_views = [] if "usage" in durations else ["usage"]
+    if options.status != "cached" and "status" not in durations:
+        missing_views.append("status")
+    if timing.expired:
+        diagnostics["deadline_reached"] = True
 
-    except pexpect.ExceptionPexpect as e:
-        raise RuntimeError(f"Failed to interact with Claude CLI: {e}")
+    diagnostics = {
+        "duration_seconds": round(time.monotonic() - started, 3),
+        "low_impact": options.low_impact,
+        "status": options.status,
+        "profile": options.profile,
+        "output_chars": len(usage_output) + len(status_output or ""),
+        **counts,
+        **_usage_diagnostics(rusage, usage_before),
+        **diagnostics,
+        "phases": _phase_diagnostics(durations, deadlines, stats),
+    }
+    return ProbeResult(
+        output=usage_output,
+        status_output=status_output,
+        diagnostics=diagnostics,
+        missing_views=missing_views,
+    )
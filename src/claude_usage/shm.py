@@ -0,0 +1,171 @@
+"""Latest snapshot in a memory-mapped file, for readers that must not talk to the daemon."""
+
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+
+from .codec import compact, pack, unpack
+from .models import CompactSnapshot, UsageSnapshot
+from .state import runtime_dir
+
+SHM_NAME = "snapshot.shm"
+
+MAGIC = b"CUSM"
+SHM_VERSION = 2
+
+# magic, version, pad, sequence counter, payload length, pad, last read (epoch seconds)
+HEADER = struct.Struct("<4sBxxxQIxxxxQ")
+_SEQUENCE = struct.Struct("<Q")
+_SEQUENCE_OFFSET = 8
+_LENGTH = struct.Struct("<I")
+_LENGTH_OFFSET = 16
+_ACCESSED = struct.Struct("<Q")
+_ACCESSED_OFFSET = 24
+
+# One page: header plus a packed snapshot (record and its strings)
+SHM_SIZE = 4096
+CAPACITY = SHM_SIZE - HEADER.size
+
+# Reads attempted while the writer keeps updating before giving up
+_READ_ATTEMPTS = 1000
+
+
+def shm_path() -> Path:
+    """Default shared snapshot file ($XDG_RUNTIME_DIR/claudebar/snapshot.shm)."""
+    return runtime_dir() / SHM_NAME
+
+
+class SharedSnapshotWriter:
+    """
+    Publishes snapshots into a fixed-layout mapped file (single writer).
+
+    The sequence counter in the header is odd while a write is in
+    progress and is bumped to the next even value once the payload is
+    complete, so readers can detect and retry torn reads (a seqlock).
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = Path(path or shm_path())
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            os.ftruncate(fd, SHM_SIZE)
+            self._map = mmap.mmap(fd, SHM_SIZE)
+        finally:
+            os.close(fd)
+        magic, version, sequence, _, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != SHM_VERSION:
+            HEADER.pack_into(self._map, 0, MAGIC, SHM_VERSION, 0, 0, 0)
+            sequence = 0
+        elif sequence & 1:
+            # A previous writer died mid-write: its payload is unusable
+            HEADER.pack_into(self._map, 0, MAGIC, SHM_VERSION, 0, 0, 0)
+            sequence += 1
+        # Keep counting from a previous writer so readers never see a sequence repeat
+        self._sequence = sequence
+
+    def publish(self, snapshot: CompactSnapshot) -> None:
+        """
+        Make snapshot the one readers see.
+
+        Raises:
+            ValueError: If the packed snapshot does not fit CAPACITY
+        """
+        payload = pack(snapshot)
+        if len(payload) > CAPACITY:
+            raise ValueError(f"Snapshot needs {len(payload)} bytes, shared file holds {CAPACITY}")
+        _SEQUENCE.pack_into(self._map, _SEQUENCE_OFFSET, self._sequence + 1)
+        self._map[HEADER.size : HEADER.size + len(payload)] = payload
+        _LENGTH.pack_into(self._map, _LENGTH_OFFSET, len(payload))
+        self._sequence += 2
+        _SEQUENCE.pack_into(self._map, _SEQUENCE_OFFSET, self._sequence)
+
+    def publish_snapshot(self, snapshot: UsageSnapshot) -> UsageSnapshot:
+        """
+        Publish a full snapshot; returns it for chaining.
+
+        A stale snapshot keeps its original capture time and, like a partial
+        one, stays marked for readers.
+        """
+        self.publish(compact(snapshot))
+        return snapshot
+
+    def last_read(self) -> float | None:
+        """When a reader last read the file (epoch seconds), or None if none has."""
+        (accessed,) = _ACCESSED.unpack_from(self._map, _ACCESSED_OFFSET)
+        return accessed or None
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class SharedSnapshotReader:
+    """
+    Maps a shared snapshot file.
+
+    Once mapped, read() makes no system calls. Each read stamps the header
+    with the time, so the daemon sees readers as activity; a reader
+    without write access to the file reads without stamping.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        """
+        Raises:
+            OSError: If the file does not exist
+            ValueError: If it is not a shared snapshot file
+        """
+        self.path = Path(path or shm_path())
+        try:
+            with open(self.path, "r+b") as f:
+                self._map = mmap.mmap(f.fileno(), 0)
+            self._stamps = True
+        except PermissionError:
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._stamps = False
+        if len(self._map) < SHM_SIZE or HEADER.unpack_from(self._map)[:2] != (MAGIC, SHM_VERSION):
+            self._map.close()
+            raise ValueError(f"{self.path} is not a shared snapshot file")
+
+    def read(self) -> CompactSnapshot | None:
+        """
+        Return the latest published snapshot, or None if none was published yet.
+
+        Raises:
+            ValueError: If no consistent copy could be read
+        """
+        if self._stamps:
+            _ACCESSED.pack_into(self._map, _ACCESSED_OFFSET, int(time.time()))
+        for _ in range(_READ_ATTEMPTS):
+            (sequence,) = _SEQUENCE.unpack_from(self._map, _SEQUENCE_OFFSET)
+            if sequence & 1:
+                continue
+            if sequence == 0:
+                return None
+            (length,) = _LENGTH.unpack_from(self._map, _LENGTH_OFFSET)
+            payload = self._map[HEADER.size : HEADER.size + min(length, CAPACITY)]
+            if _SEQUENCE.unpack_from(self._map, _SEQUENCE_OFFSET)[0] == sequence:
+                try:
+                    return unpack(payload)
+                except (IndexError, struct.error) as e:
+                    raise ValueError(f"Corrupt shared snapshot: {e}") from e
+        raise ValueError("Shared snapshot kept changing while being read")
+
+    def close(self) -> None:
+        self._map.close()
+
+
+def read_shared(path: Path | None = None) -> CompactSnapshot | None:
+    """
+    Read the latest shared snapshot once.
+
+    Raises:
+        OSError: If there is no shared snapshot file
+        ValueError: If the file is not a valid shared snapshot
+    """
+    reader = SharedSnapshotReader(path)
+    try:
+        return reader.read()
+    finally:
+        reader.close()
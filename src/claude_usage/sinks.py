@@ -0,0 +1,135 @@
+"""Output destinations for rendered snapshots."""
+
+import errno
+import os
+import stat
+import tempfile
+from dataclasses import dataclass
+
+from .formatters import FORMATS, render
+from .models import UsageSnapshot
+
+# Destination names that mean standard output
+STDOUT_NAMES = ("-", "stdout")
+
+# Formats that only make sense from a resident process, as one stream on stdout
+STREAMING_FORMATS = ("i3bar",)
+
+
+def write_atomic(path: str, text: str | bytes) -> None:
+    """
+    Replace a file's contents atomically.
+
+    Writes to a temporary file in the same directory and renames it over
+    the target, so readers never see a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".claude-usage-")
+    try:
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_fifo(path: str, text: str) -> bool:
+    """
+    Write to a named pipe without blocking.
+
+    Returns:
+        True if written, False if nobody has the FIFO open for reading
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+    except OSError as e:
+        if e.errno == errno.ENXIO:
+            return False
+        raise
+    try:
+        os.write(fd, text.encode("utf-8"))
+    finally:
+        os.close(fd)
+    return True
+
+
+@dataclass
+class Sink:
+    """A format and the destination its rendered output goes to."""
+
+    fmt: str
+    destination: str = "-"
+
+    @property
+    def key(self) -> str:
+        """Identifies this sink, e.g. for change suppression."""
+        return f"{self.fmt}:{self.destination}"
+
+    def write(self, text: str) -> None:
+        """Write one rendered output (without trailing newline) to the destination."""
+        if self.destination in STDOUT_NAMES:
+            print(text, flush=True)
+            return
+
+        path = self.destination
+        try:
+            is_fifo = stat.S_ISFIFO(os.stat(path).st_mode)
+        except FileNotFoundError:
+            is_fifo = False
+
+        if is_fifo:
+            write_fifo(path, text + "\n")
+        else:
+            write_atomic(path, text + "\n")
+
+
+def parse_output_spec(spec: str) -> Sink:
+    """
+    Parse an output spec of the form "format[:destination]".
+
+    The destination is "-"/"stdout", a regular file (replaced atomically)
+    or an existing FIFO. Without a destination, output goes to stdout.
+
+    Streaming formats (i3bar) only go to stdout: their framing is one
+    endless document, which a rewritten file or a FIFO whose reader comes
+    and goes would cut short.
+
+    Raises:
+        ValueError: If the format is unknown, the destination is empty, or
+            a streaming format is sent anywhere but stdout
+    """
+    fmt, sep, destination = spec.partition(":")
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format '{fmt}' (choose from {', '.join(FORMATS)})")
+    if sep and not destination:
+        raise ValueError(f"missing destination in '{spec}'")
+    if fmt in STREAMING_FORMATS and destination and destination not in STDOUT_NAMES:
+        raise ValueError(f"{fmt} output can only go to stdout, not '{destination}'")
+    return Sink(fmt=fmt, destination=destination or "-")
+
+
+def emit(snapshot: UsageSnapshot, sinks: list[Sink]) -> list[Exception]:
+    """
+    Render a snapshot once per format and write it to every sink.
+
+    A failing destination does not prevent writes to the others.
+
+    Returns:
+        Errors raised by individual sinks (empty if all succeeded)
+    """
+    rendered: dict[str, str] = {}
+    errors = []
+    for sink in sinks:
+        if sink.fmt not in rendered:
+            rendered[sink.fmt] = render(snapshot, sink.fmt)
+        try:
+            sink.write(rendered[sink.fmt])
+        except OSError as e:
+            errors.append(e)
+    return errors
@@ -0,0 +1,90 @@
+"""On-disk state shared between claude-usage runs."""
+
+import json
+import os
+import stat
+import struct
+import tempfile
+from pathlib import Path
+
+from .codec import pack, unpack
+from .models import CompactSnapshot
+from .sinks import write_atomic
+
+LATEST_SNAPSHOT_FILE = "latest.bin"
+
+
+def cache_dir() -> Path:
+    """
+    Directory for persisted state ($CLAUDEBAR_CACHE_DIR, else $XDG_CACHE_HOME/claudebar).
+
+    Created on first use.
+    """
+    override = os.environ.get("CLAUDEBAR_CACHE_DIR")
+    if override:
+        path = Path(override)
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        path = Path(base) / "claudebar"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def save_latest(snapshot: CompactSnapshot) -> None:
+    """Persist the latest successfully parsed snapshot."""
+    write_atomic(str(cache_dir() / LATEST_SNAPSHOT_FILE), pack(snapshot))
+
+
+def load_latest() -> CompactSnapshot | None:
+    """Load the latest persisted snapshot, or None if there is none (or it is unreadable)."""
+    try:
+        return unpack((cache_dir() / LATEST_SNAPSHOT_FILE).read_bytes())
+    except (OSError, ValueError, IndexError, struct.error):
+        return None
+
+
+def load_json(name: str) -> dict:
+    """Load a JSON state file from the cache dir, or {} if missing or corrupt."""
+    try:
+        with open(cache_dir() / name, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_json(name: str, data: dict) -> None:
+    """Atomically write a JSON state file to the cache dir."""
+    write_atomic(str(cache_dir() / name), json.dumps(data))
+
+
+def runtime_dir() -> Path:
+    """
+    Per-user directory for sockets and shared memory ($XDG_RUNTIME_DIR/claudebar).
+
+    Falls back to a private directory under the system temp dir. Created on first use.
+
+    Raises:
+        PermissionError: If the fallback exists but is not a directory private
+            to this user (another user could have created it first)
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base:
+        path = Path(base) / "claudebar"
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        return path
+
+    path = Path(tempfile.gettempdir()) / f"claudebar-{os.getuid()}"
+    try:
+        path.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    # The temp dir is shared: trust the directory only if it is ours alone
+    info = path.lstat()
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+    ):
+        raise PermissionError(f"{path} is not a private directory owned by this user")
+    return path
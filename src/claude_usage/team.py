@@ -0,0 +1,299 @@
+"""Team view: hosts append snapshots to a shared directory, an aggregator merges them."""
+
+import heapq
+import json
+import os
+import re
+import socket
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from .formatters import get_css_class
+from .models import CompactSnapshot
+from .state import load_json, save_json
+
+TEAM_INDEX_FILE = "team-index.json"
+
+# A host starts a new segment once its current one reaches this size
+SEGMENT_BYTES = 256 * 1024
+
+# Segments kept per host; the writer deletes older ones
+SEGMENTS_KEPT = 4
+
+# Account key for snapshots without an email (e.g. --status cached before the first Status view)
+UNKNOWN_ACCOUNT = "unknown"
+
+# Characters allowed in a host directory name
+_UNSAFE_HOST = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def default_host() -> str:
+    return socket.gethostname()
+
+
+def _host_dir(directory: Path, host: str) -> Path:
+    return directory / (_UNSAFE_HOST.sub("_", host) or "host")
+
+
+def record_of(snapshot: CompactSnapshot, host: str) -> dict:
+    """The NDJSON record for one snapshot (raw_ref is host-local and left out)."""
+    record = asdict(snapshot)
+    del record["raw_ref"]
+    return {"host": host, **record}
+
+
+def _valid(record) -> bool:
+    """Whether a decoded line is a record the aggregator can use."""
+    return (
+        isinstance(record, dict)
+        and isinstance(record.get("host"), str)
+        and isinstance(record.get("captured_at"), int)
+    )
+
+
+def _account(record: dict) -> str:
+    return record.get("account_email") or UNKNOWN_ACCOUNT
+
+
+class TeamLog:
+    """
+    One host's append-only snapshot stream in the shared directory.
+
+    Records go to <directory>/<host>/<first captured_at>.ndjson, one JSON
+    line each, written with a single O_APPEND write. Segment names sort in
+    time order; a new one is started every SEGMENT_BYTES so the aggregator
+    can stop looking at old ones. Only one process per host may write.
+    """
+
+    def __init__(self, directory: str | Path, host: str | None = None) -> None:
+        self.host = host or default_host()
+        self.path = _host_dir(Path(directory), self.host)
+
+    def segments(self) -> list[Path]:
+        """This host's segments, oldest first."""
+        return sorted(self.path.glob("*.ndjson"))
+
+    def append(self, snapshot: CompactSnapshot) -> Path:
+        """
+        Append one snapshot.
+
+        Returns:
+            The segment written to
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        segments = self.segments()
+        if not segments or segments[-1].stat().st_size >= SEGMENT_BYTES:
+            segments.append(self.path / f"{snapshot.captured_at:012d}.ndjson")
+            for old in segments[:-SEGMENTS_KEPT]:
+                old.unlink(missing_ok=True)
+        line = json.dumps(record_of(snapshot, self.host), separators=(",", ":")) + "\n"
+        fd = os.open(segments[-1], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+        return segments[-1]
+
+
+def _read_new_records(path: Path, entry: dict | None) -> tuple[list[dict], dict]:
+    """
+    Records appended to a segment since entry was taken.
+
+    A trailing line without newline is still being written and is left for
+    the next refresh. Lines that are not valid records are skipped.
+
+    Returns:
+        The new records and the segment's updated entry
+    """
+    stat = path.stat()
+    offset = 0
+    if entry and entry["inode"] == stat.st_ino and entry["offset"] <= stat.st_size:
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return [], entry
+        offset = entry["offset"]
+
+    records = []
+    if stat.st_size > offset:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(stat.st_size - offset)
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if _valid(record):
+                records.append(record)
+        offset += complete
+
+    return records, {
+        "offset": offset,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "inode": stat.st_ino,
+        "sealed": False,
+    }
+
+
+class TeamIndex:
+    """
+    Incremental aggregate over every host's stream, persisted in the cache dir.
+
+    Remembers each segment's byte offset, so a refresh reads only lines
+    appended since the last one. A segment that is fully read and no longer
+    its host's newest is sealed and never looked at again, so the cost of a
+    refresh grows with the number of hosts and new records, not with the
+    history. The latest record per host and account is kept; streams are
+    merged by capture time so that order is global, not per host.
+    """
+
+    def __init__(self, directory: str | Path, data: dict | None = None) -> None:
+        self.directory = Path(directory)
+        data = data or {}
+        self.files: dict[str, dict] = data.get("files", {})
+        self.latest: dict[tuple[str, str], dict] = {
+            (record["host"], _account(record)): record
+            for record in data.get("latest", [])
+            if _valid(record)
+        }
+
+    @classmethod
+    def load(cls, directory: str | Path) -> "TeamIndex":
+        """Load the persisted index for directory (empty if none)."""
+        key = str(Path(directory).resolve())
+        return cls(directory, load_json(TEAM_INDEX_FILE).get(key))
+
+    def save(self) -> None:
+        """Persist the index, alongside those of other directories."""
+        data = load_json(TEAM_INDEX_FILE)
+        data[str(self.directory.resolve())] = {
+            "files": self.files,
+            "latest": list(self.latest.values()),
+        }
+        save_json(TEAM_INDEX_FILE, data)
+
+    def refresh(self) -> list[dict]:
+        """
+        Read newly appended records from every host.
+
+        Returns:
+            The new records, merged across hosts in capture-time order
+        """
+        streams = []
+        seen = set()
+        try:
+            host_dirs = sorted(p for p in self.directory.iterdir() if p.is_dir())
+        except OSError:
+            host_dirs = []
+        for host_dir in host_dirs:
+            segments = sorted(host_dir.glob("*.ndjson"))
+            for position, path in enumerate(segments):
+                key = str(path)
+                seen.add(key)
+                entry = self.files.get(key)
+                if entry and entry.get("sealed"):
+                    continue
+                try:
+                    records, entry = _read_new_records(path, entry)
+                except OSError:
+                    continue
+                # Older segments are never appended to again once read to the end
+                entry["sealed"] = position < len(segments) - 1 and entry["offset"] == entry["size"]
+                self.files[key] = entry
+                if records:
+                    streams.append(records)
+
+        # Forget segments the writers deleted
+        for key in set(self.files) - seen:
+            del self.files[key]
+
+        # Each host writes in capture order, so a k-way merge orders them all
+        merged = list(heapq.merge(*streams, key=lambda record: record["captured_at"]))
+        for record in merged:
+            key = (record["host"], _account(record))
+            current = self.latest.get(key)
+            if current is None or record["captured_at"] >= current["captured_at"]:
+                self.latest[key] = record
+        return merged
+
+    def accounts(self) -> list[dict]:
+        """
+        The combined view: the freshest record per account across hosts.
+
+        Records with an error are only used when an account has nothing else.
+        Each row gets the hosts reporting the account; rows are ordered by
+        session percent remaining, lowest first.
+        """
+        rows: dict[str, dict] = {}
+        hosts: dict[str, set[str]] = {}
+        for (host, account), record in self.latest.items():
+            hosts.setdefault(account, set()).add(host)
+            best = rows.get(account)
+            if best is None or (
+                (record.get("error") is None, record["captured_at"])
+                > (best.get("error") is None, best["captured_at"])
+            ):
+                rows[account] = record
+        return sorted(
+            ({**record, "hosts": sorted(hosts[account])} for account, record in rows.items()),
+            key=lambda row: (_remaining(row) is None, _remaining(row) or 0, _account(row)),
+        )
+
+
+def _remaining(row: dict) -> int | None:
+    """Headline percent of a row: session, else weekly."""
+    session = row.get("session_percent")
+    return session if session is not None else row.get("weekly_percent")
+
+
+def _age(captured_at: int, now: float) -> str:
+    minutes = max(0, int(now - captured_at) // 60)
+    if minutes < 60:
+        return f"{minutes}m ago"
+    return f"{minutes // 60}h ago"
+
+
+def _row_line(row: dict, now: float) -> str:
+    parts = [_account(row)]
+    if row.get("account_tier"):
+        parts[0] += f" ({row['account_tier']})"
+    if row.get("error"):
+        parts.append(f"error: {row['error']}")
+    for label, key in (("session", "session_percent"), ("weekly", "weekly_percent")):
+        if row.get(key) is not None:
+            parts.append(f"{label} {row[key]}%")
+    parts.append(f"{row['host']}, {_age(row['captured_at'], now)}")
+    return " · ".join(parts)
+
+
+def format_team(rows: list[dict], fmt: str, now: float | None = None) -> str:
+    """
+    Render the combined view.
+
+    Args:
+        rows: TeamIndex.accounts()
+        fmt: "waybar" (headline is the account with the least left), "plain" or "json"
+        now: Reference time for ages (default: now)
+    """
+    now = time.time() if now is None else now
+    if fmt == "json":
+        return json.dumps({"accounts": rows}, indent=2)
+
+    lines = [_row_line(row, now) for row in rows]
+    if fmt == "plain":
+        return "\n".join(lines) if lines else "No team snapshots yet"
+
+    if fmt != "waybar":
+        raise ValueError(f"unsupported team format '{fmt}'")
+    headline = _remaining(rows[0]) if rows else None
+    return json.dumps(
+        {
+            "text": f"{headline}%" if headline is not None else "?",
+            "tooltip": "\n".join(lines) if lines else "No team snapshots yet",
+            "percentage": headline or 0,
+            "class": get_css_class(headline),
+        },
+        separators=(",", ":"),
+    )
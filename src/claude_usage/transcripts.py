@@ -0,0 +1,292 @@
+"""Estimate usage from Claude Code's local JSONL transcripts, without spawning claude."""
+
+import json
+import mmap
+import os
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from .codec import expand
+from .models import CompactSnapshot, UsageSnapshot
+from .state import load_json, save_json
+
+TRANSCRIPT_INDEX_FILE = "transcript-index.json"
+CALIBRATION_FILE = "transcript-calibration.json"
+
+# Token totals are kept in buckets of this many seconds
+BUCKET_SECONDS = 300
+
+# Limit windows used by Claude subscriptions
+SESSION_WINDOW = 5 * 3600
+WEEKLY_WINDOW = 7 * 86400
+
+# Buckets older than this can no longer fall into any window
+_RETENTION = WEEKLY_WINDOW + 86400
+
+# New data above this size is scanned through mmap instead of read()
+MMAP_THRESHOLD = 1 << 20
+
+# Message ids remembered to drop duplicate transcript entries for one response
+_RECENT_IDS = 4096
+
+
+def projects_dir() -> Path:
+    """Directory holding per-project transcripts ($CLAUDE_CONFIG_DIR or ~/.claude)."""
+    base = os.environ.get("CLAUDE_CONFIG_DIR") or os.path.expanduser("~/.claude")
+    return Path(base) / "projects"
+
+
+def _usage_weight(usage: dict) -> int:
+    """
+    Tokens that count towards limits for one response.
+
+    Cache reads are much cheaper than fresh input, so they are left out.
+    """
+    return (
+        int(usage.get("input_tokens") or 0)
+        + int(usage.get("output_tokens") or 0)
+        + int(usage.get("cache_creation_input_tokens") or 0)
+    )
+
+
+def _parse_timestamp(value: str) -> float | None:
+    """Parse a transcript ISO timestamp ('2026-01-01T10:00:00.000Z') to epoch seconds."""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+class TranscriptIndex:
+    """
+    Incremental token index over transcript files.
+
+    Remembers each file's byte offset, size, mtime and inode, so a refresh
+    only reads lines appended since the last one. Token totals are kept in
+    BUCKET_SECONDS buckets for the last week; the transcripts themselves are
+    never re-read.
+    """
+
+    def __init__(self, root: Path | None = None, data: dict | None = None) -> None:
+        self.root = root or projects_dir()
+        data = data or {}
+        self.files: dict[str, dict] = data.get("files", {})
+        self.buckets: dict[int, int] = {int(k): v for k, v in data.get("buckets", {}).items()}
+        self._recent_ids: deque[str] = deque(data.get("recent_ids", []), maxlen=_RECENT_IDS)
+        self._recent_set = set(self._recent_ids)
+
+    @classmethod
+    def load(cls, root: Path | None = None) -> "TranscriptIndex":
+        """Load the persisted index (empty if none)."""
+        return cls(root, load_json(TRANSCRIPT_INDEX_FILE))
+
+    def save(self) -> None:
+        """Persist the index."""
+        save_json(
+            TRANSCRIPT_INDEX_FILE,
+            {
+                "files": self.files,
+                "buckets": {str(k): v for k, v in self.buckets.items()},
+                "recent_ids": list(self._recent_ids),
+            },
+        )
+
+    def refresh(self, now: float | None = None) -> int:
+        """
+        Read newly appended transcript lines into the index.
+
+        Returns:
+            Number of bytes read
+        """
+        now = time.time() if now is None else now
+        total = 0
+        seen = set()
+        for path in self.root.glob("*/*.jsonl"):
+            key = str(path)
+            seen.add(key)
+            try:
+                total += self._refresh_file(path, key)
+            except OSError:
+                continue
+
+        # Forget files that were deleted
+        for key in set(self.files) - seen:
+            del self.files[key]
+
+        cutoff = now - _RETENTION
+        self.buckets = {k: v for k, v in self.buckets.items() if k >= cutoff}
+        return total
+
+    def _refresh_file(self, path: Path, key: str) -> int:
+        """Index one file's new complete lines; returns bytes consumed."""
+        stat = path.stat()
+        entry = self.files.get(key)
+        if entry and entry["inode"] == stat.st_ino and entry["size"] <= stat.st_size:
+            if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                return 0
+            offset = entry["offset"]
+        else:
+            # New, replaced or truncated file: start over
+            offset = 0
+
+        consumed = 0
+        if stat.st_size > offset:
+            with open(path, "rb") as f:
+                if stat.st_size - offset >= MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), stat.st_size, access=mmap.ACCESS_READ) as mapped:
+                        consumed = self._consume(mapped, offset, stat.st_size)
+                else:
+                    f.seek(offset)
+                    consumed = self._consume(f.read(stat.st_size - offset), 0, stat.st_size - offset)
+
+        self.files[key] = {
+            "offset": offset + consumed,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "inode": stat.st_ino,
+        }
+        return consumed
+
+    def _consume(self, data: bytes | mmap.mmap, start: int, end: int) -> int:
+        """
+        Add complete lines in data[start:end] to the buckets.
+
+        A trailing line without newline is still being written and is left
+        for the next refresh.
+
+        Returns:
+            Bytes consumed (up to and including the last newline)
+        """
+        last_newline = data.rfind(b"\n", start, end)
+        if last_newline < 0:
+            return 0
+        position = start
+        while position <= last_newline:
+            newline = data.find(b"\n", position, last_newline + 1)
+            self._add_line(data[position:newline])
+            position = newline + 1
+        return last_newline + 1 - start
+
+    def _add_line(self, line: bytes) -> None:
+        """Count the usage of one transcript entry."""
+        # Cheap pre-filter: only assistant responses carry usage
+        if b'"usage"' not in line:
+            return
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return
+        message = entry.get("message")
+        if entry.get("type") != "assistant" or not isinstance(message, dict):
+            return
+        usage = message.get("usage")
+        timestamp = _parse_timestamp(entry.get("timestamp"))
+        if not isinstance(usage, dict) or timestamp is None:
+            return
+
+        # One response can be logged as several entries (one per content block);
+        # entries without a message id cannot be matched up, so each counts
+        if message.get("id") is not None:
+            message_id = f"{message['id']}:{entry.get('requestId')}"
+            if message_id in self._recent_set:
+                return
+            if len(self._recent_ids) == self._recent_ids.maxlen:
+                self._recent_set.discard(self._recent_ids[0])
+            self._recent_ids.append(message_id)
+            self._recent_set.add(message_id)
+
+        bucket = int(timestamp // BUCKET_SECONDS * BUCKET_SECONDS)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + _usage_weight(usage)
+
+    def tokens_between(self, start: float, end: float) -> int:
+        """Tokens in buckets starting within [start, end)."""
+        first = start // BUCKET_SECONDS * BUCKET_SECONDS
+        return sum(v for k, v in self.buckets.items() if first <= k < end)
+
+
+def _window_start(reset_at: int | None, length: int, now: float) -> float:
+    """Start of the limit window: from the known reset time, else a rolling window."""
+    if reset_at is not None and now < reset_at:
+        return reset_at - length
+    return now - length
+
+
+def calibrate(index: TranscriptIndex, snapshot: CompactSnapshot) -> dict:
+    """
+    Relate transcript tokens to the official percentages of a fresh probe.
+
+    A window is only (re)calibrated when some of it has been used, since
+    0% used says nothing about tokens per percent.
+
+    Returns:
+        The stored calibration
+    """
+    calibration = load_json(CALIBRATION_FILE)
+    now = snapshot.captured_at
+    for name, remaining, reset_at, length in (
+        ("session", snapshot.session_percent, snapshot.session_reset_at, SESSION_WINDOW),
+        ("weekly", snapshot.weekly_percent, snapshot.weekly_reset_at, WEEKLY_WINDOW),
+    ):
+        if remaining is None or remaining >= 100:
+            continue
+        tokens = index.tokens_between(_window_start(reset_at, length, now), now + 1)
+        if tokens:
+            calibration[name] = {"tokens_per_percent": tokens / (100 - remaining)}
+    calibration["snapshot"] = {
+        "captured_at": snapshot.captured_at,
+        "session_reset_at": snapshot.session_reset_at,
+        "weekly_reset_at": snapshot.weekly_reset_at,
+        "reset_timezone": snapshot.reset_timezone,
+        "account_tier": snapshot.account_tier,
+        "account_email": snapshot.account_email,
+    }
+    save_json(CALIBRATION_FILE, calibration)
+    return calibration
+
+
+def estimate(index: TranscriptIndex, now: float | None = None) -> UsageSnapshot | None:
+    """
+    Estimate remaining percentages from transcript tokens.
+
+    Returns:
+        An estimated snapshot, or None if there is no calibration yet
+    """
+    now = time.time() if now is None else now
+    calibration = load_json(CALIBRATION_FILE)
+    reference = calibration.get("snapshot")
+    if not reference or not ("session" in calibration or "weekly" in calibration):
+        return None
+
+    percents = {}
+    for name, reset_key, length in (
+        ("session", "session_reset_at", SESSION_WINDOW),
+        ("weekly", "weekly_reset_at", WEEKLY_WINDOW),
+    ):
+        rate = calibration.get(name, {}).get("tokens_per_percent")
+        if not rate:
+            continue
+        tokens = index.tokens_between(_window_start(reference.get(reset_key), length, now), now + 1)
+        percents[name] = max(0, min(100, round(100 - tokens / rate)))
+
+    def upcoming(reset_at: int | None) -> int | None:
+        return reset_at if reset_at is not None and reset_at > now else None
+
+    snapshot = expand(
+        CompactSnapshot(
+            session_percent=percents.get("session"),
+            weekly_percent=percents.get("weekly"),
+            session_reset_at=upcoming(reference.get("session_reset_at")),
+            weekly_reset_at=upcoming(reference.get("weekly_reset_at")),
+            reset_timezone=reference.get("reset_timezone"),
+            account_email=reference.get("account_email"),
+            account_tier=reference.get("account_tier"),
+            captured_at=int(now),
+        )
+    )
+    snapshot.diagnostics = {
+        "source": "transcripts",
+        "calibrated_at": reference.get("captured_at"),
+    }
+    return snapshot
@@ -0,0 +1,155 @@
+"""Usage trend for the tooltip: fixed-size, incrementally updated aggregates and a sparkline."""
+
+import time
+from dataclasses import dataclass, field
+
+from .models import UsageSnapshot
+from .state import load_json, save_json
+
+TREND_FILE = "trend.json"
+
+# Block characters from lowest to highest
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+# Characters in the sparkline (one bucket each)
+SPARKLINE_WIDTH = 24
+
+DEFAULT_HOURS = 12.0
+
+
+def _empty(width: int) -> list:
+    return [0] * width
+
+
+@dataclass
+class TrendBuckets:
+    """
+    Per-bucket sums and counts of session and weekly percent, in a ring.
+
+    Bucket n covers seconds [n * bucket_seconds, (n + 1) * bucket_seconds)
+    of the epoch and lives at index n % width. Adding a sample touches one
+    bucket (plus clearing any skipped since the last one), and rendering
+    reads each bucket once, so neither depends on how many probes ran.
+    """
+
+    bucket_seconds: int
+    width: int = SPARKLINE_WIDTH
+    newest: int | None = None  # bucket number of the newest sample
+    session_sum: list[int] = field(default_factory=list)
+    session_count: list[int] = field(default_factory=list)
+    weekly_sum: list[int] = field(default_factory=list)
+    weekly_count: list[int] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        for name in ("session_sum", "session_count", "weekly_sum", "weekly_count"):
+            if len(getattr(self, name)) != self.width:
+                setattr(self, name, _empty(self.width))
+
+    @classmethod
+    def for_hours(cls, hours: float, width: int = SPARKLINE_WIDTH) -> "TrendBuckets":
+        return cls(bucket_seconds=max(1, round(hours * 3600 / width)), width=width)
+
+    def add(self, session: int | None, weekly: int | None, at: float) -> None:
+        """Add one sample taken at epoch seconds at."""
+        bucket = int(at // self.bucket_seconds)
+        if self.newest is not None and bucket <= self.newest - self.width:
+            return  # older than the window
+        if self.newest is None or bucket > self.newest:
+            # Clear the buckets skipped since the newest sample, at most the whole ring
+            first = bucket - self.width + 1
+            if self.newest is not None:
+                first = max(first, self.newest + 1)
+            for skipped in range(first, bucket + 1):
+                index = skipped % self.width
+                self.session_sum[index] = self.session_count[index] = 0
+                self.weekly_sum[index] = self.weekly_count[index] = 0
+            self.newest = bucket
+        index = bucket % self.width
+        if session is not None:
+            self.session_sum[index] += session
+            self.session_count[index] += 1
+        if weekly is not None:
+            self.weekly_sum[index] += weekly
+            self.weekly_count[index] += 1
+
+    def _means(self, sums: list[int], counts: list[int], now: float) -> list[float | None]:
+        """Mean per bucket of the window ending now, oldest first (None where empty)."""
+        current = int(now // self.bucket_seconds)
+        means = []
+        for bucket in range(current - self.width + 1, current + 1):
+            index = bucket % self.width
+            stored = self.newest is not None and self.newest - self.width < bucket <= self.newest
+            means.append(sums[index] / counts[index] if stored and counts[index] else None)
+        return means
+
+    def sparkline(self, now: float) -> str | None:
+        """Session percent over the window as block characters, or None without data."""
+        means = self._means(self.session_sum, self.session_count, now)
+        if all(mean is None for mean in means):
+            return None
+        top = len(SPARK_CHARS) - 1
+        return "".join(
+            " " if mean is None else SPARK_CHARS[min(top, int(mean * len(SPARK_CHARS) / 100))]
+            for mean in means
+        )
+
+    def weekly_change(self, now: float) -> int | None:
+        """Change in weekly percent from the oldest to the newest bucket with data."""
+        means = [m for m in self._means(self.weekly_sum, self.weekly_count, now) if m is not None]
+        if len(means) < 2:
+            return None
+        return round(means[-1] - means[0])
+
+    @property
+    def hours(self) -> float:
+        return self.bucket_seconds * self.width / 3600
+
+    @classmethod
+    def load(cls, hours: float = DEFAULT_HOURS) -> "TrendBuckets":
+        """Load the persisted buckets; a different window size starts afresh."""
+        wanted = cls.for_hours(hours)
+        data = load_json(TREND_FILE)
+        if data.get("bucket_seconds") != wanted.bucket_seconds or data.get("width") != wanted.width:
+            return wanted
+        try:
+            return cls(**data)
+        except TypeError:
+            return wanted
+
+    def save(self) -> None:
+        save_json(
+            TREND_FILE,
+            {
+                "bucket_seconds": self.bucket_seconds,
+                "width": self.width,
+                "newest": self.newest,
+                "session_sum": self.session_sum,
+                "session_count": self.session_count,
+                "weekly_sum": self.weekly_sum,
+                "weekly_count": self.weekly_count,
+            },
+        )
+
+
+def record_trend(
+    snapshot: UsageSnapshot, hours: float = DEFAULT_HOURS, at: float | None = None
+) -> None:
+    """Add a freshly probed snapshot to the persisted trend."""
+    buckets = TrendBuckets.load(hours)
+    at = time.time() if at is None else at
+    buckets.add(snapshot.session_percent, snapshot.weekly_percent, at)
+    buckets.save()
+
+
+def with_trend(
+    snapshot: UsageSnapshot, hours: float = DEFAULT_HOURS, now: float | None = None
+) -> UsageSnapshot:
+    """Attach the sparkline and weekly change to snapshot; returns it for chaining."""
+    if snapshot.error:
+        return snapshot
+    buckets = TrendBuckets.load(hours)
+    now = time.time() if now is None else now
+    snapshot.sparkline = buckets.sparkline(now)
+    snapshot.weekly_change = buckets.weekly_change(now)
+    snapshot.trend_hours = buckets.hours
+    return snapshot
@@ -0,0 +1,82 @@
+"""Resident mode: probe periodically and write outputs only when they change."""
+
+import json
+import sys
+import threading
+from collections.abc import Callable
+
+from .formatters import I3BAR_HEADER, ChangeSuppressor
+from .models import UsageSnapshot
+from .sinks import STDOUT_NAMES, STREAMING_FORMATS, Sink
+
+
+class StreamFraming:
+    """
+    Adds the i3bar/swaybar protocol framing to a sink's output.
+
+    Until a write to an i3bar sink has succeeded, its output is prefixed
+    with the protocol header and the opening bracket of the infinite
+    array; later status lines are prefixed with a comma. Other formats
+    pass through unchanged.
+    """
+
+    def __init__(self) -> None:
+        self._started: set[str] = set()
+
+    def frame(self, sink: Sink, text: str) -> str:
+        """Return text as it must be written to sink."""
+        if sink.fmt != "i3bar":
+            return text
+        if sink.key in self._started:
+            return f",{text}"
+        return f"{json.dumps(I3BAR_HEADER)}\n[\n{text}"
+
+    def written(self, sink: Sink) -> None:
+        """Record that framed output reached sink, so its header is sent."""
+        self._started.add(sink.key)
+
+
+def run_watch(
+    fetch: Callable[[], UsageSnapshot],
+    sinks: list[Sink],
+    interval: float,
+    stop: threading.Event | None = None,
+    wait: Callable[[threading.Event], None] | None = None,
+) -> None:
+    """
+    Fetch a snapshot every interval seconds and write changed outputs.
+
+    Each sink only receives output when its rendering differs from what it
+    was last sent, so bars redraw (and files are rewritten) only on change.
+
+    Args:
+        fetch: Returns a fresh snapshot; failures should be error snapshots
+        sinks: Where to write each format
+        interval: Seconds between fetches
+        stop: Set to end the loop (default: run until interrupted)
+        wait: Blocks until the next fetch is due (default: sleep interval seconds)
+    """
+    stop = stop or threading.Event()
+    suppressor = ChangeSuppressor()
+    framing = StreamFraming()
+
+    while not stop.is_set():
+        snapshot = fetch()
+        for sink in sinks:
+            text = suppressor.render_if_changed(snapshot, sink.fmt, key=sink.key)
+            if text is None:
+                continue
+            try:
+                sink.write(framing.frame(sink, text))
+                framing.written(sink)
+            except BrokenPipeError:
+                if sink.destination in STDOUT_NAMES:
+                    # The bar went away; nobody is listening anymore
+                    return
+                print(f"Error: could not write {sink.key}: broken pipe", file=sys.stderr)
+            except OSError as e:
+                print(f"Error: could not write {sink.key}: {e}", file=sys.stderr)
+        if wait is not None:
+            wait(stop)
+        else:
+            stop.wait(interval)
@@ -11,6 +11,14 @@ def pytest_configure(config):
     )
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep persisted state (latest snapshot, counters) out of the real cache dir."""
+    cache = tmp_path / "cache"
+    monkeypatch.setenv("CLAUDEBAR_CACHE_DIR", str(cache))
+    return cache
+
+
 # Sample raw output from Claude CLI (captured from real usage)
 SAMPLE_RAW_OUTPUT = """
 [?2026l[?25l[?2004h[?1004h[?2026h[2K[1A[2K[1A[2K[1A[2K[1A[2K[1A[2K[G
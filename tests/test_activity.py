@@ -0,0 +1,142 @@
+"""Tests for activity.py - activity-driven probe scheduling."""
+
+import threading
+import time
+
+import pytest
+
+from claude_usage.activity import ActivityTrigger, InotifyWatcher, PollingWatcher, _next_reset
+from claude_usage.models import UsageSnapshot
+
+
+class _ScriptedWatcher:
+    """Watcher reporting activity for the first `active` seconds."""
+
+    def __init__(self, active: float = 0.0) -> None:
+        self.until = time.monotonic() + active
+        self.drained = 0
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(min(timeout, 0.01))
+        return time.monotonic() < self.until
+
+    def drain(self) -> bool:
+        self.drained += 1
+        return False
+
+
+class TestInotifyWatcher:
+    """Tests for InotifyWatcher."""
+
+    @pytest.fixture
+    def watcher(self, tmp_path):
+        (tmp_path / "projects" / "-home-user-a").mkdir(parents=True)
+        watcher = InotifyWatcher(tmp_path)
+        yield watcher
+        watcher.close()
+
+    def test_transcript_append_is_activity(self, watcher, tmp_path):
+        assert not watcher.wait(0)
+
+        (tmp_path / "projects" / "-home-user-a" / "s.jsonl").write_text("{}\n")
+
+        assert watcher.wait(1)
+        assert not watcher.wait(0)
+
+    def test_follows_new_project_directories(self, watcher, tmp_path):
+        project = tmp_path / "projects" / "-home-user-b"
+        project.mkdir()
+        watcher.drain()
+
+        (project / "s.jsonl").write_text("{}\n")
+
+        assert watcher.wait(1)
+
+    def test_follows_projects_created_later(self, tmp_path):
+        watcher = InotifyWatcher(tmp_path)
+        try:
+            (tmp_path / "projects").mkdir()
+            watcher.drain()
+            (tmp_path / "projects" / "-home-user-a").mkdir()
+            watcher.drain()
+
+            (tmp_path / "projects" / "-home-user-a" / "s.jsonl").write_text("{}\n")
+
+            assert watcher.wait(1)
+        finally:
+            watcher.close()
+
+
+class TestPollingWatcher:
+    """Tests for PollingWatcher."""
+
+    def test_detects_changed_file(self, tmp_path):
+        watcher = PollingWatcher(tmp_path, poll_interval=0)
+        assert not watcher.wait(0)
+
+        (tmp_path / "history.jsonl").write_text("{}\n")
+
+        assert watcher.wait(0)
+
+
+class TestActivityTrigger:
+    """Tests for ActivityTrigger."""
+
+    def test_idle_waits_for_idle_interval(self):
+        trigger = ActivityTrigger(_ScriptedWatcher(), debounce=0.05, idle_interval=0.1)
+        started = time.monotonic()
+
+        trigger.wait(threading.Event())
+
+        assert time.monotonic() - started >= 0.1
+        assert trigger.last_reason == "idle"
+
+    def test_probes_after_activity_settles(self):
+        trigger = ActivityTrigger(_ScriptedWatcher(active=0.05), debounce=0.05, idle_interval=60)
+        started = time.monotonic()
+
+        trigger.wait(threading.Event())
+
+        assert time.monotonic() - started < 1
+        assert trigger.last_reason == "activity"
+
+    def test_continuous_activity_is_bounded(self):
+        trigger = ActivityTrigger(
+            _ScriptedWatcher(active=60), debounce=0.05, busy_interval=0.1, idle_interval=60
+        )
+        started = time.monotonic()
+
+        trigger.wait(threading.Event())
+
+        assert time.monotonic() - started < 1
+        assert trigger.last_reason == "activity"
+
+    def test_stop_ends_wait(self):
+        stop = threading.Event()
+        stop.set()
+
+        ActivityTrigger(_ScriptedWatcher(), idle_interval=60).wait(stop)
+
+    def test_observe_discards_own_events_and_tags_trigger(self):
+        watcher = _ScriptedWatcher()
+        trigger = ActivityTrigger(watcher)
+
+        snapshot = trigger.observe(UsageSnapshot(session_percent=10))
+
+        assert watcher.drained == 1
+        assert snapshot.diagnostics["trigger"] == "start"
+
+
+class TestNextReset:
+    """Tests for _next_reset."""
+
+    def test_earliest_upcoming_reset(self):
+        now = time.time()
+        snapshot = UsageSnapshot(session_reset="Jan 1, 2999", weekly_reset="Jan 1, 2000")
+
+        reset = _next_reset(snapshot, now)
+
+        assert reset is not None and reset > now
+
+    def test_no_snapshot(self):
+        assert _next_reset(None, time.time()) is None
@@ -0,0 +1,109 @@
+"""Tests for admission.py - host-wide probe slots."""
+
+import os
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+from claude_usage.admission import ProbeSlots, jitter_delay
+
+HOLD_SLOT = """
+import fcntl, os, sys, time
+fd = os.open(sys.argv[1], os.O_RDONLY | os.O_CREAT, 0o644)
+fcntl.flock(fd, fcntl.LOCK_EX)
+print("held", flush=True)
+time.sleep(30)
+"""
+
+
+class TestProbeSlots:
+    """Tests for ProbeSlots."""
+
+    def test_slots_are_exclusive_up_to_limit(self, tmp_path):
+        slots = ProbeSlots(2, tmp_path)
+
+        first = slots.try_acquire()
+        second = slots.try_acquire()
+
+        assert first is not None and second is not None
+        assert {first[0], second[0]} == {0, 1}
+        assert slots.try_acquire() is None
+
+        slots.release(first[1])
+        assert slots.try_acquire() is not None
+
+    def test_acquire_times_out_when_busy(self, tmp_path):
+        slots = ProbeSlots(1, tmp_path)
+        held = slots.try_acquire()
+
+        started = time.monotonic()
+        with pytest.raises(TimeoutError, match="1 host-wide probe slots busy"):
+            with slots.acquire(timeout=0.2):
+                pass
+
+        assert time.monotonic() - started >= 0.2
+        slots.release(held[1])
+
+    def test_slot_released_after_block(self, tmp_path):
+        slots = ProbeSlots(1, tmp_path)
+
+        with slots.acquire(timeout=1) as slot:
+            assert slot == 0
+            assert slots.try_acquire() is None
+
+        assert slots.try_acquire() is not None
+
+    def test_lock_held_by_other_process(self, tmp_path):
+        slots = ProbeSlots(1, tmp_path / "shared")
+        slots.directory.mkdir()
+        holder = subprocess.Popen(
+            [sys.executable, "-c", HOLD_SLOT, str(slots.directory / "slot-0.lock")],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert holder.stdout.readline() == "held\n"
+            assert slots.try_acquire() is None
+        finally:
+            holder.kill()
+            holder.wait()
+
+        # The kernel releases the lock of a dead holder
+        assert slots.try_acquire() is not None
+
+    def test_creates_shared_sticky_directory(self, tmp_path):
+        slots = ProbeSlots(1, tmp_path / "shared")
+        slots.try_acquire()
+
+        mode = slots.directory.stat().st_mode
+        assert mode & stat.S_ISVTX
+        assert stat.S_IMODE(mode) & 0o777 == 0o777
+
+    def test_slot_files_readable_by_all_under_restrictive_umask(self, tmp_path):
+        previous = os.umask(0o077)
+        try:
+            slots = ProbeSlots(1, tmp_path / "shared")
+            _, fd = slots.try_acquire()
+            slots.release(fd)
+        finally:
+            os.umask(previous)
+
+        assert stat.S_IMODE((slots.directory / "slot-0.lock").stat().st_mode) == 0o644
+        assert stat.S_IMODE(slots.directory.stat().st_mode) == 0o1777
+
+    def test_rejects_zero_slots(self):
+        with pytest.raises(ValueError):
+            ProbeSlots(0)
+
+
+class TestJitterDelay:
+    """Tests for jitter_delay."""
+
+    def test_no_jitter(self):
+        assert jitter_delay(0) == 0
+
+    def test_bounded(self):
+        assert 0 <= jitter_delay(0.05) <= 0.05
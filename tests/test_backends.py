@@ -0,0 +1,169 @@
+"""Tests for backends.py - snapshot sources and the fallback chain."""
+
+import pytest
+
+from claude_usage import backends
+from claude_usage.backends import (
+    BackendChain,
+    BackendUnavailable,
+    CacheBackend,
+    ChainExhausted,
+    ProbeBackend,
+    ProbeTimedOut,
+    ReplayBackend,
+    _missing_fields,
+    _with_cached_account,
+)
+from claude_usage.backoff import CircuitBreaker
+from claude_usage.codec import compact
+from claude_usage.models import UsageSnapshot
+from claude_usage.probe import ProbeResult
+from claude_usage.state import save_latest
+
+
+class _Fixed:
+    """Backend returning a fixed snapshot, or unavailable if none."""
+
+    def __init__(self, name: str, snapshot: UsageSnapshot | None = None) -> None:
+        self.name = name
+        self.snapshot = snapshot
+        self.calls = 0
+
+    def fetch(self) -> UsageSnapshot:
+        self.calls += 1
+        if self.snapshot is None:
+            raise BackendUnavailable(f"{self.name} is down")
+        return self.snapshot
+
+
+class TestBackendChain:
+    """Tests for BackendChain."""
+
+    def test_first_available_answers(self):
+        first = _Fixed("first")
+        second = _Fixed("second", UsageSnapshot(session_percent=40))
+        third = _Fixed("third", UsageSnapshot(session_percent=10))
+
+        result = BackendChain([first, second, third]).fetch()
+
+        assert result.backend == "second"
+        assert result.snapshot.session_percent == 40
+        assert result.snapshot.diagnostics["backend"] == "second"
+        assert [a.backend for a in result.attempts] == ["first", "second"]
+        assert third.calls == 0
+
+    def test_exhausted_reports_last_error(self):
+        with pytest.raises(ChainExhausted, match="second is down") as excinfo:
+            BackendChain([_Fixed("first"), _Fixed("second")]).fetch()
+
+        assert len(excinfo.value.attempts) == 2
+
+    def test_other_errors_propagate(self):
+        class Broken:
+            name = "broken"
+
+            def fetch(self):
+                raise KeyError("bug")
+
+        with pytest.raises(KeyError):
+            BackendChain([Broken(), _Fixed("next", UsageSnapshot())]).fetch()
+
+
+class TestCacheBackend:
+    """Tests for CacheBackend."""
+
+    def test_serves_fresh_snapshot(self):
+        save_latest(compact(UsageSnapshot(session_percent=55)))
+
+        assert CacheBackend(max_age=60).fetch().session_percent == 55
+
+    def test_missing_or_stale_is_unavailable(self):
+        with pytest.raises(BackendUnavailable):
+            CacheBackend().fetch()
+
+        save_latest(compact(UsageSnapshot(session_percent=55), captured_at=0))
+        with pytest.raises(BackendUnavailable, match="too old"):
+            CacheBackend(max_age=60).fetch()
+
+
+class TestReplayBackend:
+    """Tests for ReplayBackend."""
+
+    def test_parses_capture(self, tmp_path, sample_raw_output):
+        capture = tmp_path / "raw.txt"
+        capture.write_text(sample_raw_output)
+
+        assert ReplayBackend(capture).fetch().session_percent == 26
+
+    def test_missing_file_is_unavailable(self, tmp_path):
+        with pytest.raises(BackendUnavailable):
+            ReplayBackend(tmp_path / "missing.txt").fetch()
+
+
+class TestProbeBackend:
+    """Tests for ProbeBackend."""
+
+    def test_open_breaker_is_unavailable(self):
+        breaker = CircuitBreaker(threshold=1)
+        breaker.record_failure("timeout")
+
+        with pytest.raises(BackendUnavailable, match="backing off"):
+            ProbeBackend(breaker=breaker).fetch()
+
+    def test_usage_view_not_rendered_is_a_timeout(self, monkeypatch):
+        monkeypatch.setattr(
+            backends, "probe_usage", lambda options: ProbeResult(output="", missing_views=["usage"])
+        )
+        recorded = []
+
+        with pytest.raises(ProbeTimedOut):
+            ProbeBackend(after_probe=lambda s, d: recorded.append(s)).fetch()
+        assert recorded[0].error == "Usage view did not render in time"
+
+    def test_late_usage_view_that_parses_is_kept(self, monkeypatch, sample_raw_output):
+        monkeypatch.setattr(
+            backends,
+            "probe_usage",
+            lambda options: ProbeResult(output=sample_raw_output, missing_views=["usage"]),
+        )
+
+        assert ProbeBackend().fetch().session_percent == 26
+
+    def test_unparsable_output_is_unavailable(self, monkeypatch):
+        monkeypatch.setattr(
+            backends, "probe_usage", lambda options: ProbeResult(output="garbage")
+        )
+        recorded = []
+
+        with pytest.raises(BackendUnavailable, match="Could not parse"):
+            ProbeBackend(after_probe=lambda s, d: recorded.append(s)).fetch()
+        assert recorded[0].error is not None
+
+
+class TestMissingFields:
+    """Tests for _missing_fields."""
+
+    def test_lists_unknown_fields_of_missing_views(self):
+        snapshot = UsageSnapshot(session_percent=20, account_email="a@example.com")
+
+        assert _missing_fields(snapshot, ["status"]) == ["account_tier"]
+        assert _missing_fields(snapshot, []) == []
+
+
+class TestWithCachedAccount:
+    """Tests for _with_cached_account."""
+
+    def test_fills_missing_account_from_last_snapshot(self):
+        save_latest(compact(UsageSnapshot(account_tier="Max", account_email="a@example.com")))
+
+        snapshot = _with_cached_account(UsageSnapshot(session_percent=20))
+
+        assert snapshot.account_tier == "Max"
+        assert snapshot.account_email == "a@example.com"
+
+    def test_keeps_captured_account(self):
+        save_latest(compact(UsageSnapshot(account_tier="Max")))
+
+        snapshot = _with_cached_account(UsageSnapshot(account_tier="Pro", account_email="b@example.com"))
+
+        assert snapshot.account_tier == "Pro"
@@ -0,0 +1,60 @@
+"""Tests for backoff.py - failure backoff and circuit breaker."""
+
+from claude_usage.backoff import CircuitBreaker, FailureState
+
+NOW = 1_000_000.0
+
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+
+    def test_closed_initially(self):
+        assert not CircuitBreaker().is_open(NOW)
+
+    def test_single_failure_below_threshold_stays_closed(self):
+        breaker = CircuitBreaker(threshold=2)
+        breaker.record_failure("timeout", NOW)
+
+        assert not breaker.is_open(NOW)
+
+    def test_opens_at_threshold(self):
+        breaker = CircuitBreaker(threshold=2, base_delay=60)
+        breaker.record_failure("timeout", NOW)
+        breaker.record_failure("timeout", NOW)
+
+        assert breaker.is_open(NOW + 59)
+        assert not breaker.is_open(NOW + 60)
+        assert breaker.retry_in(NOW + 10) == 50
+
+    def test_delay_doubles_and_is_capped(self):
+        breaker = CircuitBreaker(threshold=1, base_delay=60, max_delay=200)
+        delays = []
+        for _ in range(4):
+            breaker.record_failure("timeout", NOW)
+            delays.append(breaker.state.retry_at - NOW)
+
+        assert delays == [60, 120, 200, 200]
+
+    def test_many_failures_do_not_overflow(self):
+        breaker = CircuitBreaker(threshold=2, base_delay=60.0, max_delay=3600)
+        breaker.state = FailureState(consecutive_failures=5000)
+
+        breaker.record_failure("timeout", NOW)
+
+        assert breaker.state.retry_at == NOW + 3600
+
+    def test_success_closes(self):
+        breaker = CircuitBreaker(threshold=1)
+        breaker.record_failure("timeout", NOW)
+        breaker.record_success()
+
+        assert not breaker.is_open(NOW)
+        assert breaker.state.consecutive_failures == 0
+
+    def test_state_is_persisted(self):
+        CircuitBreaker(threshold=1).record_failure("not logged in", NOW)
+        state = FailureState.load()
+
+        assert state.consecutive_failures == 1
+        assert state.last_error == "not logged in"
+        assert CircuitBreaker(threshold=1).is_open(NOW + 1)
@@ -0,0 +1,365 @@
+"""Tests for cli.py - command-line entry point (probe stubbed out)."""
+
+import json
+import sys
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from claude_usage import backends, cli
+from claude_usage.admission import ProbeSlots
+from claude_usage.backoff import FailureState
+from claude_usage.metrics import ProbeStats
+from claude_usage.probe import DeadlineExceeded, ProbeOptions, ProbeResult
+from claude_usage.state import load_latest
+
+
+@pytest.fixture
+def run_cli(monkeypatch, capsys):
+    """Run cli.main() with the given arguments and a canned probe result."""
+
+    calls = []
+
+    def run(
+        *args: str,
+        raw: str | None = None,
+        error: Exception | None = None,
+        missing_views: tuple[str, ...] = (),
+    ):
+        def fake_probe(options: ProbeOptions | None = None) -> ProbeResult:
+            calls.append(options)
+            if error is not None:
+                raise error
+            return ProbeResult(
+                output=raw,
+                diagnostics={"child_peak_rss_kb": 1024},
+                missing_views=list(missing_views),
+            )
+
+        monkeypatch.setattr(cli, "probe_usage", fake_probe)
+        monkeypatch.setattr(backends, "probe_usage", fake_probe)
+        monkeypatch.setattr(sys, "argv", ["claude-usage", *args])
+        code = cli.main()
+        return code, capsys.readouterr()
+
+    run.calls = calls
+    return run
+
+
+class TestMain:
+    """Tests for the one-shot CLI."""
+
+    def test_waybar_output(self, run_cli, sample_raw_output):
+        code, captured = run_cli(raw=sample_raw_output)
+
+        assert code == 0
+        assert json.loads(captured.out)["text"] == "26%"
+
+    def test_error_is_waybar_json(self, run_cli):
+        code, captured = run_cli(error=RuntimeError("Claude CLI exited unexpectedly"))
+
+        assert code == 1
+        assert json.loads(captured.out)["class"] == "error"
+
+    def test_deadline_serves_last_snapshot_as_stale(self, run_cli, sample_raw_output):
+        run_cli(raw=sample_raw_output)
+
+        code, captured = run_cli(
+            "--deadline", "5", error=DeadlineExceeded("Deadline of 5s reached")
+        )
+
+        output = json.loads(captured.out)
+        assert code == 0
+        assert "stale" in output["class"]
+        assert run_cli.calls[-1].deadline == 5
+
+    def test_multiple_outputs(self, run_cli, sample_raw_output, tmp_path):
+        path = tmp_path / "usage.json"
+        code, captured = run_cli(
+            "--output", "plain", "--output", f"json:{path}", raw=sample_raw_output
+        )
+
+        assert code == 0
+        assert "Session: 26%" in captured.out
+        assert json.loads(path.read_text())["weekly_percent"] == 85
+
+    def test_records_probe_and_latest_snapshot(self, run_cli, sample_raw_output):
+        run_cli(raw=sample_raw_output)
+
+        assert ProbeStats.load().probes_total == 1
+        assert load_latest().session_percent == 26
+
+    def test_failure_keeps_last_good_snapshot(self, run_cli, sample_raw_output):
+        run_cli(raw=sample_raw_output)
+        run_cli(error=RuntimeError("boom"))
+
+        assert ProbeStats.load().failures_total == 1
+        assert load_latest().session_percent == 26
+
+    def test_usage_view_not_rendered_serves_stale(self, run_cli, sample_raw_output):
+        run_cli(raw=sample_raw_output)
+        code, captured = run_cli(raw="", missing_views=("usage",))
+
+        output = json.loads(captured.out)
+        assert code == 0
+        assert output["text"] == "26%"
+        assert "stale" in output["class"]
+        assert ProbeStats.load().failures_total == 1
+
+    def test_probe_options_from_flags(self, run_cli, sample_raw_output):
+        run_cli("--low-impact", "--limit-memory", "4096", "--limit-files", "256", raw=sample_raw_output)
+        options = run_cli.calls[-1]
+
+        assert options.low_impact is True
+        assert options.max_address_space == 4096 * 1024 * 1024
+        assert options.max_open_files == 256
+        assert options.max_cpu_seconds is None
+
+    def test_status_source(self, run_cli, sample_raw_output):
+        run_cli("--status", "parallel", raw=sample_raw_output)
+        assert run_cli.calls[-1].status == "parallel"
+
+    def test_dump_parsed_includes_diagnostics(self, run_cli, sample_raw_output):
+        _, captured = run_cli("--dump-parsed", raw=sample_raw_output)
+        diagnostics = json.loads(captured.out)["diagnostics"]
+        assert diagnostics["child_peak_rss_kb"] == 1024
+        assert diagnostics["backend"] == "probe"
+
+    def test_metrics_textfile(self, run_cli, sample_raw_output, tmp_path):
+        path = tmp_path / "claude.prom"
+        run_cli("--metrics-textfile", str(path), raw=sample_raw_output)
+
+        assert "claude_usage_session_percent 26" in path.read_text()
+
+    def test_negative_keep_raw_count_is_rejected(self):
+        parser = cli._build_parser()
+
+        with pytest.raises(SystemExit):
+            parser.parse_args(["--keep-raw-count", "-1"])
+        assert parser.parse_args(["--keep-raw-count", "0"]).keep_raw_count == 0
+
+
+class TestBackoff:
+    """Tests for the circuit breaker integration."""
+
+    def test_open_breaker_serves_stale_snapshot_without_probing(self, run_cli, sample_raw_output):
+        run_cli(raw=sample_raw_output)
+        run_cli(error=RuntimeError("Not logged in"))
+        run_cli(error=RuntimeError("Not logged in"))
+        probes = len(run_cli.calls)
+
+        code, captured = run_cli(raw=sample_raw_output)
+        output = json.loads(captured.out)
+
+        assert len(run_cli.calls) == probes
+        assert code == 0
+        assert output["text"] == "26%"
+        assert output["class"] == ["warning", "stale"]
+        assert "Not logged in" in output["tooltip"]
+
+    def test_open_breaker_without_snapshot_is_error(self, run_cli):
+        run_cli(error=RuntimeError("Not logged in"))
+        run_cli(error=RuntimeError("Not logged in"))
+
+        code, captured = run_cli(raw="unused")
+
+        assert code == 1
+        assert "Not logged in" in json.loads(captured.out)["tooltip"]
+        assert len(run_cli.calls) == 2
+
+    def test_no_backoff_always_probes(self, run_cli, sample_raw_output):
+        run_cli(error=RuntimeError("Not logged in"))
+        run_cli(error=RuntimeError("Not logged in"))
+
+        code, _ = run_cli("--no-backoff", raw=sample_raw_output)
+
+        assert code == 0
+        assert len(run_cli.calls) == 3
+
+    def test_success_resets_failures(self, run_cli, sample_raw_output):
+        run_cli(error=RuntimeError("Not logged in"))
+        run_cli(raw=sample_raw_output)
+
+        assert FailureState.load().consecutive_failures == 0
+
+
+class TestEstimate:
+    """Tests for --estimate."""
+
+    def test_estimates_between_calibration_probes(self, run_cli, sample_raw_output, tmp_path, monkeypatch):
+        monkeypatch.setenv("CLAUDE_CONFIG_DIR", str(tmp_path / "claude"))
+        project = tmp_path / "claude" / "projects" / "-home-user-project"
+        project.mkdir(parents=True)
+        (project / "session.jsonl").write_text(
+            json.dumps(
+                {
+                    "type": "assistant",
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "message": {"id": "msg_1", "usage": {"input_tokens": 500, "output_tokens": 100}},
+                }
+            )
+            + "\n"
+        )
+
+        run_cli("--estimate", raw=sample_raw_output)
+        code, captured = run_cli("--estimate", "--dump-parsed", raw=sample_raw_output)
+
+        assert code == 0
+        assert len(run_cli.calls) == 1
+        assert json.loads(captured.out)["account_tier"] == "Pro"
+
+    def test_probes_when_calibration_is_old(self, run_cli, sample_raw_output, tmp_path, monkeypatch):
+        monkeypatch.setenv("CLAUDE_CONFIG_DIR", str(tmp_path / "claude"))
+
+        run_cli("--estimate", raw=sample_raw_output)
+        run_cli("--estimate", "--recalibrate-after", "0", raw=sample_raw_output)
+
+        assert len(run_cli.calls) == 2
+
+
+class TestBackends:
+    """Tests for --backends, --replay and the daemon fallback."""
+
+    def test_replay_does_not_probe(self, run_cli, sample_raw_output, tmp_path):
+        capture = tmp_path / "raw.txt"
+        capture.write_text(sample_raw_output)
+
+        code, captured = run_cli("--replay", str(capture), raw="unused")
+
+        assert code == 0
+        assert json.loads(captured.out)["text"] == "26%"
+        assert run_cli.calls == []
+
+    def test_cache_answers_after_a_probe(self, run_cli, sample_raw_output):
+        run_cli(raw=sample_raw_output)
+        code, captured = run_cli("--backends", "cache,probe", raw="unused")
+
+        assert code == 0
+        assert json.loads(captured.out)["text"] == "26%"
+        assert len(run_cli.calls) == 1
+
+    def test_falls_back_to_probe_without_daemon(self, run_cli, sample_raw_output, tmp_path):
+        code, captured = run_cli(
+            "--backends", "daemon,probe", "--socket", str(tmp_path / "none.sock"), "--dump-parsed",
+            raw=sample_raw_output,
+        )
+
+        assert code == 0
+        assert json.loads(captured.out)["diagnostics"]["backend"] == "probe"
+        assert len(run_cli.calls) == 1
+
+    def test_daemon_with_serve_metrics_runs_the_daemon(self, run_cli, monkeypatch):
+        daemons = []
+        monkeypatch.setattr(cli, "_run_daemon", lambda args: daemons.append(args) or 0)
+        monkeypatch.setattr(cli, "make_server", lambda *a: pytest.fail("served metrics only"))
+
+        code, _ = run_cli("--daemon", "--serve-metrics", "0")
+
+        assert code == 0
+        assert daemons[0].serve_metrics == ("127.0.0.1", 0)
+
+    def test_spawned_daemon_gets_every_probe_option(self, tmp_path):
+        parser = cli._build_parser()
+        args = parser.parse_args([
+            "--timeout", "20", "--deadline", "9", "--adaptive-timeouts", "--low-impact",
+            "--io-idle", "--limit-memory", "4096", "--limit-cpu", "60", "--limit-files", "256",
+            "--status", "cached", "--profile", "quiet", "--max-concurrent-probes", "2",
+            "--probe-lock-dir", str(tmp_path / "slots"), "--slot-wait", "5", "--probe-jitter", "3",
+            "--max-age", "120", "--socket", str(tmp_path / "d.sock"),
+            "--shm-file", str(tmp_path / "s.shm"), "--sparkline-hours", "6",
+            "--hook", "session-below-20:notify", "--hook", "weekly-reset:true",
+            "--hook-min-interval", "10", "--team-dir", str(tmp_path / "team"),
+            "--host-name", "ws-1", "--keep-raw", "failed", "--keep-raw-count", "3",
+            "--trace-memory", "--estimate", "--recalibrate-after", "600", "--interval", "30",
+            "--on-activity", "--debounce", "5", "--idle-interval", "900", "--no-backoff",
+            "--backoff-threshold", "4", "--backoff-base", "30", "--backoff-max", "600",
+            "--metrics-textfile", str(tmp_path / "claude.prom"),
+            "--backends", "shm,daemon", "--spawn-daemon", "--format", "plain",
+        ])
+
+        command = cli._daemon_command(args)
+        spawned = parser.parse_args(command[3:])
+
+        assert spawned.daemon and spawned.backends is None and not spawned.spawn_daemon
+        for name, value in vars(args).items():
+            if name not in cli._NOT_FOR_DAEMON:
+                assert getattr(spawned, name) == value, name
+
+    def test_unknown_backend_is_rejected(self, run_cli):
+        with pytest.raises(SystemExit):
+            run_cli("--backends", "carrier-pigeon")
+
+
+class TestAdmission:
+    """Tests for --max-concurrent-probes."""
+
+    def test_busy_host_serves_last_snapshot_as_stale(self, run_cli, sample_raw_output, tmp_path):
+        run_cli(raw=sample_raw_output)
+        slots = ProbeSlots(1, tmp_path / "slots")
+        held = slots.try_acquire()
+
+        code, captured = run_cli(
+            "--max-concurrent-probes", "1", "--probe-lock-dir", str(slots.directory),
+            "--slot-wait", "0.1", raw=sample_raw_output,
+        )
+
+        slots.release(held[1])
+        output = json.loads(captured.out)
+        assert code == 0
+        assert "stale" in output["class"]
+        assert "slots busy" in output["tooltip"]
+        assert len(run_cli.calls) == 1
+
+    def test_probes_in_free_slot(self, run_cli, sample_raw_output, tmp_path):
+        code, captured = run_cli(
+            "--max-concurrent-probes", "2", "--probe-lock-dir", str(tmp_path / "slots"),
+            "--dump-parsed", raw=sample_raw_output,
+        )
+
+        assert code == 0
+        assert json.loads(captured.out)["diagnostics"]["slot"] in (0, 1)
+
+
+class TestTeam:
+    """Tests for --team-dir and --aggregate."""
+
+    def test_probes_are_aggregated_across_hosts(self, run_cli, sample_raw_output, tmp_path):
+        shared = tmp_path / "team"
+        run_cli("--team-dir", str(shared), "--host-name", "ws-1", raw=sample_raw_output)
+        run_cli("--team-dir", str(shared), "--host-name", "ci", raw=sample_raw_output)
+
+        code, captured = run_cli("--aggregate", str(shared), "--format", "json", raw="unused")
+
+        (row,) = json.loads(captured.out)["accounts"]
+        assert code == 0
+        assert row["session_percent"] == 26
+        assert row["hosts"] == ["ci", "ws-1"]
+        assert len(run_cli.calls) == 2
+
+    def test_aggregate_rejects_other_formats(self, run_cli, tmp_path):
+        code, _ = run_cli("--aggregate", str(tmp_path), "--format", "i3bar")
+        assert code == 1
+
+
+class TestHooks:
+    """Tests for --hook."""
+
+    def test_hook_fires_on_crossing(self, run_cli, sample_raw_output, sample_raw_output_max, tmp_path):
+        out = tmp_path / "hook.out"
+        hook = f"session-below-50:echo $CLAUDE_USAGE_PERCENT > {out}"
+        run_cli("--hook", hook, raw=sample_raw_output_max)
+        assert not out.exists()
+
+        code, _ = run_cli("--hook", hook, raw=sample_raw_output)
+
+        deadline = time.monotonic() + 5
+        while not out.exists() or not out.read_text():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert code == 0
+        assert out.read_text() == "26\n"
+
+    def test_invalid_hook_is_rejected(self, run_cli):
+        with pytest.raises(SystemExit):
+            run_cli("--hook", "session-sometimes:true")
@@ -0,0 +1,167 @@
+"""Tests for codec.py - compact snapshots and binary encoding."""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from claude_usage.codec import (
+    RECORD,
+    StringTable,
+    compact,
+    decode,
+    encode,
+    expand,
+    pack,
+    unpack,
+)
+from claude_usage.models import CompactSnapshot, UsageSnapshot
+from claude_usage.parser import parse_usage
+
+# 10:00 in Tallinn, two days before the sample's weekly reset
+CAPTURED_AT = int(datetime(2025, 12, 30, 10, 0, tzinfo=ZoneInfo("Europe/Tallinn")).timestamp())
+
+
+class TestStringTable:
+    """Tests for StringTable."""
+
+    def test_none_is_id_zero(self):
+        table = StringTable()
+        assert table.intern(None) == 0
+        assert table.lookup(0) is None
+
+    def test_repeated_strings_share_an_id(self):
+        table = StringTable()
+        assert table.intern("Pro") == table.intern("Pro")
+        assert len(table) == 1
+
+    def test_round_trips_through_bytes(self):
+        table = StringTable(["Pro", "user@example.com", "Europe/Tallinn"])
+        restored = StringTable.from_bytes(table.to_bytes())
+
+        assert [restored.lookup(i) for i in range(1, 4)] == [
+            "Pro",
+            "user@example.com",
+            "Europe/Tallinn",
+        ]
+
+    def test_unknown_id_raises(self):
+        with pytest.raises(ValueError, match="Unknown string id"):
+            StringTable().lookup(3)
+
+
+class TestCompact:
+    """Tests for compact and expand."""
+
+    def test_resolves_resets_to_epoch(self, sample_raw_output):
+        result = compact(parse_usage(sample_raw_output), captured_at=CAPTURED_AT)
+
+        tallinn = ZoneInfo("Europe/Tallinn")
+        assert result.session_reset_at == int(datetime(2025, 12, 30, 16, 0, tzinfo=tallinn).timestamp())
+        assert result.weekly_reset_at == int(datetime(2026, 1, 1, 10, 59, tzinfo=tallinn).timestamp())
+        assert result.reset_timezone == "Europe/Tallinn"
+        assert result.captured_at == CAPTURED_AT
+
+    def test_drops_raw_text(self, sample_raw_output):
+        result = compact(parse_usage(sample_raw_output), raw_ref="/tmp/capture.txt")
+
+        assert result.raw_ref == "/tmp/capture.txt"
+        assert not hasattr(result, "raw_text")
+
+    def test_expand_restores_display_values(self, sample_raw_output):
+        snapshot = parse_usage(sample_raw_output)
+        result = expand(compact(snapshot, captured_at=CAPTURED_AT))
+
+        assert result.session_percent == snapshot.session_percent
+        assert result.weekly_percent == snapshot.weekly_percent
+        assert result.session_reset == "4pm (Europe/Tallinn)"
+        assert result.weekly_reset == "Jan 1, 2026, 10:59am (Europe/Tallinn)"
+        assert result.account_email == snapshot.account_email
+        assert result.account_tier == snapshot.account_tier
+        assert result.raw_text == ""
+
+    def test_stale_and_partial_survive_the_round_trip(self):
+        snapshot = UsageSnapshot(
+            session_percent=50,
+            stale_reason="timed out",
+            missing_fields=["account_tier"],
+            captured_at=CAPTURED_AT,
+        )
+        result = expand(unpack(pack(compact(snapshot))))
+
+        assert result.captured_at == CAPTURED_AT
+        assert result.stale_reason.startswith("last update")
+        assert "account_tier" in result.missing_fields
+
+    def test_unparseable_reset_is_dropped(self):
+        result = compact(UsageSnapshot(session_percent=50, session_reset="soon"))
+        assert result.session_reset_at is None
+
+
+class TestCompactSnapshot:
+    """Tests for the CompactSnapshot model."""
+
+    def test_is_immutable(self):
+        snapshot = CompactSnapshot(session_percent=50)
+        with pytest.raises(AttributeError):
+            snapshot.session_percent = 40
+
+    def test_has_no_instance_dict(self):
+        assert not hasattr(CompactSnapshot(), "__dict__")
+
+
+class TestBinaryEncoding:
+    """Tests for encode/decode and pack/unpack."""
+
+    def test_record_has_fixed_size(self):
+        table = StringTable()
+        full = CompactSnapshot(
+            session_percent=26,
+            weekly_percent=85,
+            opus_percent=5,
+            session_reset_at=CAPTURED_AT + 3600,
+            account_email="user@example.com",
+            account_tier="Max",
+        )
+        assert len(encode(full, table)) == RECORD.size
+        assert len(encode(CompactSnapshot(), table)) == RECORD.size
+
+    def test_round_trip(self, sample_raw_output):
+        snapshot = compact(parse_usage(sample_raw_output), captured_at=CAPTURED_AT)
+        table = StringTable()
+
+        assert decode(encode(snapshot, table), table) == snapshot
+
+    def test_round_trip_preserves_none(self):
+        snapshot = CompactSnapshot(error="Claude CLI not found", captured_at=CAPTURED_AT)
+        table = StringTable()
+
+        assert decode(encode(snapshot, table), table) == snapshot
+
+    def test_shared_table_stores_strings_once(self):
+        table = StringTable()
+        for percent in range(10):
+            encode(CompactSnapshot(session_percent=percent, account_tier="Pro"), table)
+        assert len(table) == 1
+
+    def test_decode_at_offset(self):
+        table = StringTable()
+        first = CompactSnapshot(session_percent=1)
+        second = CompactSnapshot(session_percent=2)
+        data = encode(first, table) + encode(second, table)
+
+        assert decode(data, table, offset=RECORD.size) == second
+
+    def test_pack_is_self_contained(self):
+        snapshot = CompactSnapshot(session_percent=26, account_tier="Pro", captured_at=CAPTURED_AT)
+        assert unpack(pack(snapshot)) == snapshot
+
+    def test_rejects_out_of_range_percent(self):
+        with pytest.raises(ValueError, match="out of range"):
+            encode(CompactSnapshot(session_percent=300), StringTable())
+
+    def test_rejects_unknown_version(self):
+        data = bytearray(pack(CompactSnapshot()))
+        data[0] = 99
+        with pytest.raises(ValueError, match="Unsupported"):
+            unpack(bytes(data))
@@ -0,0 +1,295 @@
+"""Tests for daemon.py - snapshot server on a Unix socket."""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from claude_usage.backends import BackendUnavailable, DaemonBackend
+from claude_usage.daemon import (
+    SnapshotServer,
+    acquire_daemon_lock,
+    activation_socket,
+    daemon_starting,
+    decode_snapshot,
+    encode_snapshot,
+    request_memory_report,
+    request_snapshot,
+    stop_when_idle,
+    subscribe,
+)
+from claude_usage.models import UsageSnapshot
+
+
+@pytest.fixture
+def server():
+    """A SnapshotServer on a short socket path, serving in a thread."""
+    with tempfile.TemporaryDirectory(prefix="cu") as directory:
+        server = SnapshotServer(Path(directory) / "d.sock", first_snapshot_wait=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+
+class TestWireFormat:
+    """Tests for encode_snapshot/decode_snapshot."""
+
+    def test_round_trip(self):
+        snapshot = UsageSnapshot(session_percent=30, session_reset="4pm", account_tier="Max")
+        snapshot.diagnostics = {"backend": "probe"}
+
+        decoded, captured_at = decode_snapshot(encode_snapshot(snapshot, 123.0))
+
+        assert decoded == snapshot
+        assert decoded.diagnostics == {"backend": "probe"}
+        assert captured_at == 123.0
+
+    def test_error_message(self):
+        with pytest.raises(ValueError, match="no snapshot yet"):
+            decode_snapshot(b'{"error": "no snapshot yet"}\n')
+
+
+class TestSnapshotServer:
+    """Tests for SnapshotServer and request_snapshot."""
+
+    def test_memory_report(self, server):
+        with pytest.raises(ValueError, match="unknown command"):
+            request_memory_report(server.path)
+
+        server.memory_report = lambda: {"rss_bytes": 1}
+        assert request_memory_report(server.path) == {"rss_bytes": 1}
+
+    def test_serves_published_snapshot(self, server):
+        server.publish(UsageSnapshot(session_percent=80), captured_at=1000.0)
+
+        snapshot, captured_at = request_snapshot(server.path)
+
+        assert snapshot.session_percent == 80
+        assert captured_at == 1000.0
+
+    def test_nothing_published_yet(self, server):
+        with pytest.raises(ValueError):
+            request_snapshot(server.path)
+
+    def test_first_request_waits_for_first_snapshot(self):
+        with tempfile.TemporaryDirectory(prefix="cu") as directory:
+            server = SnapshotServer(Path(directory) / "d.sock", first_snapshot_wait=5)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            threading.Timer(0.2, server.publish, [UsageSnapshot(session_percent=70)]).start()
+            try:
+                snapshot, _ = request_snapshot(server.path, timeout=5)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        assert snapshot.session_percent == 70
+
+    def test_serves_on_inherited_listener(self):
+        with tempfile.TemporaryDirectory(prefix="cu") as directory:
+            path = Path(directory) / "d.sock"
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(str(path))
+            listener.listen()
+            server = SnapshotServer(path, listener=listener, first_snapshot_wait=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            server.publish(UsageSnapshot(session_percent=12))
+
+            snapshot, _ = request_snapshot(path)
+            server.shutdown()
+            server.server_close()
+
+            assert snapshot.session_percent == 12
+            # The socket belongs to whoever passed it (systemd)
+            assert path.exists()
+
+    def test_idle_server_stops(self, server):
+        stop = threading.Event()
+        stop_when_idle(server, 0.1, stop)
+
+        assert stop.is_set()
+        assert server.idle_seconds() >= 0.1
+
+    def test_reads_elsewhere_are_activity(self, server):
+        server.last_request -= 100
+        server.last_access = lambda: time.time() - 2
+
+        assert 2 <= server.idle_seconds() < 10
+
+    def test_close_removes_socket(self):
+        with tempfile.TemporaryDirectory(prefix="cu") as directory:
+            server = SnapshotServer(Path(directory) / "d.sock")
+            server.server_close()
+
+            assert not server.path.exists()
+
+
+class TestSubscribe:
+    """Tests for SUBSCRIBE and subscribe()."""
+
+    def _wait_for_subscriber(self, server):
+        deadline = time.monotonic() + 5
+        while not server.subscriber_count():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    def test_full_snapshot_then_changed_fields(self, server):
+        server.publish(UsageSnapshot(session_percent=74, weekly_percent=90), captured_at=1.0)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(str(server.path))
+            sock.sendall(b"SUBSCRIBE\n")
+            reader = sock.makefile("rb")
+            first = json.loads(reader.readline())
+            self._wait_for_subscriber(server)
+
+            server.publish(UsageSnapshot(session_percent=71, weekly_percent=90), captured_at=2.0)
+            change = json.loads(reader.readline())
+
+        assert first["snapshot"]["session_percent"] == 74
+        assert change == {"changed": {"session_percent": 71}, "captured_at": 2.0}
+
+    def test_unchanged_snapshot_sends_nothing(self, server):
+        server.publish(UsageSnapshot(session_percent=74))
+        updates = subscribe(server.path, timeout=5)
+        next(updates)
+        self._wait_for_subscriber(server)
+
+        server.publish(UsageSnapshot(session_percent=74))
+        server.publish(UsageSnapshot(session_percent=74, weekly_reset="Jan 5"))
+
+        snapshot, _ = next(updates)
+        assert snapshot == UsageSnapshot(session_percent=74, weekly_reset="Jan 5")
+        updates.close()
+
+    def test_slow_subscriber_gets_coalesced_change(self, server):
+        server.publish(UsageSnapshot(session_percent=80))
+        updates = subscribe(server.path, timeout=5)
+        next(updates)
+        self._wait_for_subscriber(server)
+
+        started = time.monotonic()
+        for percent in range(79, 29, -1):
+            server.publish(UsageSnapshot(session_percent=percent))
+        publishing = time.monotonic() - started
+        time.sleep(0.2)
+
+        snapshot, _ = next(updates)
+        assert publishing < 0.5
+        # Without a backlog, the next change (if any) is already the newest
+        if snapshot.session_percent != 30:
+            assert next(updates)[0].session_percent == 30
+        updates.close()
+
+    def test_hang_up_unregisters(self, server):
+        server.publish(UsageSnapshot(session_percent=80))
+        updates = subscribe(server.path, timeout=5)
+        next(updates)
+        self._wait_for_subscriber(server)
+        assert server.idle_seconds() == 0
+
+        updates.close()
+        deadline = time.monotonic() + 5
+        while server.subscriber_count():
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+    def test_no_snapshot_yet(self, server):
+        with pytest.raises(ValueError, match="no snapshot yet"):
+            next(subscribe(server.path))
+
+
+class TestActivation:
+    """Tests for activation_socket and acquire_daemon_lock."""
+
+    def test_no_activation_for_other_pid(self, monkeypatch):
+        monkeypatch.setenv("LISTEN_PID", "1")
+        monkeypatch.setenv("LISTEN_FDS", "1")
+
+        assert activation_socket() is None
+
+    def test_one_daemon_per_socket(self, tmp_path):
+        path = tmp_path / "d.sock"
+        first = acquire_daemon_lock(path)
+
+        assert first is not None
+        assert acquire_daemon_lock(path) is None
+
+
+    def test_daemon_starting(self, tmp_path):
+        path = tmp_path / "d.sock"
+        assert daemon_starting(path)
+
+        lock = acquire_daemon_lock(path)
+        assert daemon_starting(path, window=60)
+        assert not daemon_starting(path, window=0)
+
+        os.close(lock)
+        Path(f"{path}.lock").write_text("999999999 0\n")
+        assert daemon_starting(path, window=0)
+
+
+class TestDaemonBackend:
+    """Tests for DaemonBackend."""
+
+    def test_fresh_snapshot(self, server):
+        server.publish(UsageSnapshot(session_percent=80))
+
+        assert DaemonBackend(server.path).fetch().session_percent == 80
+
+    def test_stale_or_error_snapshot_is_unavailable(self, server):
+        server.publish(UsageSnapshot(session_percent=80), captured_at=0)
+        with pytest.raises(BackendUnavailable, match="too old"):
+            DaemonBackend(server.path, max_age=60).fetch()
+
+        server.publish(UsageSnapshot(error="Not logged in"))
+        with pytest.raises(BackendUnavailable, match="Not logged in"):
+            DaemonBackend(server.path).fetch()
+
+    def test_stale_snapshot_keeps_its_capture_time(self, server):
+        server.publish(UsageSnapshot(session_percent=80, stale_reason="timed out", captured_at=1000))
+
+        assert request_snapshot(server.path)[1] == 1000
+        with pytest.raises(BackendUnavailable, match="too old"):
+            DaemonBackend(server.path, max_age=60).fetch()
+
+    def test_waits_for_activated_daemon(self):
+        with tempfile.TemporaryDirectory(prefix="cu") as directory:
+            server = SnapshotServer(Path(directory) / "d.sock", first_snapshot_wait=5)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            threading.Timer(0.3, server.publish, [UsageSnapshot(session_percent=70)]).start()
+            try:
+                snapshot = DaemonBackend(server.path, timeout=0.05, spawn_timeout=5).fetch()
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        assert snapshot.session_percent == 70
+
+    def test_no_daemon_is_unavailable(self, tmp_path):
+        with pytest.raises(BackendUnavailable):
+            DaemonBackend(tmp_path / "none.sock").fetch()
+
+    def test_spawns_missing_daemon(self, sample_raw_output, tmp_path):
+        capture = tmp_path / "raw.txt"
+        capture.write_text(sample_raw_output)
+        with tempfile.TemporaryDirectory(prefix="cu") as directory:
+            path = Path(directory) / "d.sock"
+            command = [sys.executable, "-m", "claude_usage.cli", "--daemon", "--idle-exit", "1"]
+            command += ["--backends", "replay", "--replay", str(capture)]
+            command += ["--socket", str(path), "--shm-file", str(tmp_path / "snapshot.shm")]
+
+            snapshot = DaemonBackend(path, spawn=command, spawn_timeout=20).fetch()
+
+            assert snapshot.session_percent == 26
+            # Unused, it goes away again
+            deadline = time.monotonic() + 15
+            while path.exists() and time.monotonic() < deadline:
+                time.sleep(0.1)
+            assert not path.exists()
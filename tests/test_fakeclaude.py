@@ -0,0 +1,39 @@
+"""Tests for fakeclaude.py - the scripted claude stand-in."""
+
+import os
+
+from claude_usage import fakeclaude
+from claude_usage.parser import parse_usage
+from claude_usage.probe import ProbeOptions, probe_usage
+
+
+class TestViews:
+    """Tests for the rendered views."""
+
+    def test_usage_view_parses(self):
+        snapshot = parse_usage(fakeclaude.usage_view(30, 15, opus=40))
+
+        assert snapshot.session_percent == 70
+        assert snapshot.weekly_percent == 85
+        assert snapshot.opus_percent == 60
+        assert snapshot.session_reset == "4pm (Europe/Tallinn)"
+
+    def test_status_view_parses(self):
+        snapshot = parse_usage("", fakeclaude.status_view("Pro", "b@example.com"))
+
+        assert snapshot.account_tier == "Pro"
+        assert snapshot.account_email == "b@example.com"
+
+
+class TestSession:
+    """Tests for a fake session driven by the real probe."""
+
+    def test_trust_prompt_and_redraw_frames(self, tmp_path, monkeypatch):
+        fakeclaude.install(tmp_path, ["--trust-prompt", "--frames", "200", "--session", "55"])
+        monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+        result = probe_usage(ProbeOptions(timeout=5))
+        snapshot = parse_usage(result.output, result.status_output)
+
+        assert snapshot.session_percent == 45
+        assert snapshot.account_tier == "Max"
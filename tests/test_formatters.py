@@ -1,10 +1,19 @@
 """Tests for formatters.py - output formatting."""
 
+import json
+
+import pytest
+
 from claude_usage.formatters import (
+    ChangeSuppressor,
     get_css_class,
     format_waybar,
     format_plain,
     format_json,
+    format_i3bar,
+    format_polybar,
+    format_tmux,
+    render,
 )
 from claude_usage.models import UsageSnapshot
 
@@ -99,6 +108,41 @@ class TestFormatWaybar:
         result = format_waybar(snapshot)
         assert result["class"] == "good"
 
+    def test_stale_snapshot(self):
+        snapshot = UsageSnapshot(session_percent=75, stale_reason="Not logged in")
+        result = format_waybar(snapshot)
+
+        assert result["text"] == "75%"
+        assert result["class"] == ["good", "stale"]
+        assert "Stale: Not logged in" in result["tooltip"]
+
+    def test_trend_in_tooltip(self):
+        snapshot = UsageSnapshot(
+            session_percent=75, sparkline="▁▄█", weekly_change=-8, trend_hours=12
+        )
+        tooltip = format_waybar(snapshot)["tooltip"]
+
+        assert "Last 12h: <tt>▁▄█</tt>" in tooltip
+        assert "Weekly trend: ↘ -8% in 12h" in tooltip
+
+    def test_partial_snapshot(self):
+        snapshot = UsageSnapshot(session_percent=75, missing_fields=["account_tier"])
+        result = format_waybar(snapshot)
+
+        assert result["text"] == "75%"
+        assert result["class"] == ["good", "partial"]
+        assert "Partial: account_tier not captured" in result["tooltip"]
+
+    def test_partial_and_stale_snapshot(self):
+        snapshot = UsageSnapshot(
+            session_percent=75, missing_fields=["account_tier"], stale_reason="timeout"
+        )
+        result = format_waybar(snapshot)
+
+        assert result["class"] == ["good", "partial", "stale"]
+        assert "Partial: account_tier not captured" in result["tooltip"]
+        assert "Stale: timeout" in result["tooltip"]
+
     def test_critical_class_for_low_percentage(self):
         snapshot = UsageSnapshot(session_percent=10)
         result = format_waybar(snapshot)
@@ -136,6 +180,10 @@ class TestFormatPlain:
 
         assert result == "No usage data available"
 
+    def test_stale_snapshot(self):
+        snapshot = UsageSnapshot(session_percent=50, stale_reason="timeout")
+        assert "Stale: timeout" in format_plain(snapshot)
+
     def test_partial_snapshot(self):
         snapshot = UsageSnapshot(session_percent=50)
         result = format_plain(snapshot)
@@ -183,3 +231,120 @@ class TestFormatJson:
             result[key] is None
             for key in ["session_percent", "weekly_percent", "opus_percent", "error"]
         )
+
+
+class TestFormatI3bar:
+    """Tests for format_i3bar function."""
+
+    def test_normal_snapshot(self):
+        result = format_i3bar(UsageSnapshot(session_percent=75))
+
+        assert result["name"] == "claude_usage"
+        assert result["full_text"] == "Claude 75%"
+        assert result["short_text"] == "75%"
+        assert result["color"] == "#a6e3a1"
+
+    def test_error_snapshot_is_critical(self):
+        result = format_i3bar(UsageSnapshot(error="boom"))
+
+        assert result["full_text"] == "Claude ⚠"
+        assert result["color"] == "#f38ba8"
+
+
+class TestFormatPolybar:
+    """Tests for format_polybar function."""
+
+    def test_wraps_text_in_color_tags(self):
+        result = format_polybar(UsageSnapshot(session_percent=30))
+        assert result == "%{F#f9e2af}30%%{F-}"
+
+
+class TestFormatTmux:
+    """Tests for format_tmux function."""
+
+    def test_wraps_text_in_style_tags(self):
+        result = format_tmux(UsageSnapshot(session_percent=10))
+        assert result == "#[fg=#f38ba8]10%#[default]"
+
+    def test_unknown_is_gray(self):
+        result = format_tmux(UsageSnapshot())
+        assert result == "#[fg=#6c7086]?#[default]"
+
+
+class TestRender:
+    """Tests for render function."""
+
+    def test_waybar_is_compact_json(self):
+        snapshot = UsageSnapshot(session_percent=45)
+        result = render(snapshot, "waybar")
+
+        assert "\n" not in result
+        assert json.loads(result) == format_waybar(snapshot)
+
+    def test_json_is_indented(self):
+        snapshot = UsageSnapshot(session_percent=45)
+        result = render(snapshot, "json")
+
+        assert json.loads(result) == format_json(snapshot)
+        assert "\n" in result
+
+    def test_plain(self):
+        snapshot = UsageSnapshot(session_percent=45)
+        assert render(snapshot, "plain") == format_plain(snapshot)
+
+    def test_i3bar_is_one_status_line(self):
+        result = json.loads(render(UsageSnapshot(session_percent=45), "i3bar"))
+        assert result == [format_i3bar(UsageSnapshot(session_percent=45))]
+
+    def test_unknown_format_raises(self):
+        with pytest.raises(ValueError, match="Unknown format"):
+            render(UsageSnapshot(), "xml")
+
+    def test_repeated_render_is_stable(self):
+        snapshot = UsageSnapshot(
+            session_percent=50, session_reset="4pm (Europe/Tallinn)"
+        )
+        assert render(snapshot, "waybar") == render(snapshot, "waybar")
+
+
+class TestChangeSuppressor:
+    """Tests for ChangeSuppressor."""
+
+    def test_first_render_is_emitted(self):
+        suppressor = ChangeSuppressor()
+        result = suppressor.render_if_changed(UsageSnapshot(session_percent=50), "plain")
+        assert result == "Session: 50%"
+
+    def test_identical_output_is_suppressed(self):
+        suppressor = ChangeSuppressor()
+        suppressor.render_if_changed(UsageSnapshot(session_percent=50), "plain")
+        result = suppressor.render_if_changed(UsageSnapshot(session_percent=50), "plain")
+        assert result is None
+
+    def test_changed_output_is_emitted(self):
+        suppressor = ChangeSuppressor()
+        suppressor.render_if_changed(UsageSnapshot(session_percent=50), "plain")
+        result = suppressor.render_if_changed(UsageSnapshot(session_percent=40), "plain")
+        assert result == "Session: 40%"
+
+    def test_raw_text_does_not_count_as_change(self):
+        suppressor = ChangeSuppressor()
+        suppressor.render_if_changed(UsageSnapshot(session_percent=50, raw_text="a"), "waybar")
+        result = suppressor.render_if_changed(
+            UsageSnapshot(session_percent=50, raw_text="b"), "waybar"
+        )
+        assert result is None
+
+    def test_keys_are_tracked_independently(self):
+        suppressor = ChangeSuppressor()
+        snapshot = UsageSnapshot(session_percent=50)
+        assert suppressor.render_if_changed(snapshot, "plain", key="a") is not None
+        assert suppressor.render_if_changed(snapshot, "plain", key="b") is not None
+        assert suppressor.render_if_changed(snapshot, "plain", key="a") is None
+
+    def test_reset_forces_next_render(self):
+        suppressor = ChangeSuppressor()
+        snapshot = UsageSnapshot(session_percent=50)
+        suppressor.render_if_changed(snapshot, "plain")
+        suppressor.reset()
+        assert suppressor.render_if_changed(snapshot, "plain") is not None
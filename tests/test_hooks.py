@@ -0,0 +1,132 @@
+"""Tests for hooks.py - edge-triggered threshold hooks."""
+
+import time
+
+import pytest
+
+from claude_usage import hooks
+from claude_usage.hooks import Hook, HookRunner, parse_hook_spec, transition
+from claude_usage.models import UsageSnapshot
+
+
+class TestParseHookSpec:
+    """Tests for parse_hook_spec()."""
+
+    def test_below(self):
+        hook = parse_hook_spec("session-below-20:echo low: $CLAUDE_USAGE_PERCENT")
+
+        assert hook == Hook("session", "below", "echo low: $CLAUDE_USAGE_PERCENT", 20)
+        assert hook.trigger == "session-below-20"
+
+    def test_empty_and_reset(self):
+        assert parse_hook_spec("weekly-empty:notify") == Hook("weekly", "empty", "notify")
+        assert parse_hook_spec("opus-reset:true").event == "reset"
+
+    @pytest.mark.parametrize(
+        "spec", ["hourly-empty:true", "session-below:true", "session-below-0:true", "session-empty:"]
+    )
+    def test_invalid(self, spec):
+        with pytest.raises(ValueError):
+            parse_hook_spec(spec)
+
+
+class TestTransition:
+    """Tests for transition()."""
+
+    BELOW_20 = Hook("session", "below", "true", 20)
+
+    def _fires(self, hook, values):
+        fired, armed, previous = [], True, None
+        for value in values:
+            fire, armed = transition(hook, previous, value, armed)
+            fired.append(fire)
+            previous = value
+        return fired
+
+    def test_fires_once_on_crossing(self):
+        assert self._fires(self.BELOW_20, [30, 25, 19, 15, 10]) == [False, False, True, False, False]
+
+    def test_oscillation_fires_once(self):
+        assert self._fires(self.BELOW_20, [21, 19, 21, 19, 22, 18]) == [False, True] + [False] * 4
+
+    def test_rearms_above_hysteresis(self):
+        assert self._fires(self.BELOW_20, [21, 19, 25, 19]) == [False, True, False, True]
+
+    def test_first_value_under_level_does_not_fire(self):
+        assert self._fires(self.BELOW_20, [10, 5]) == [False, False]
+
+    def test_empty(self):
+        assert self._fires(Hook("session", "empty", "true"), [3, 0, 0, 2, 0]) == [
+            False, True, False, False, False
+        ]
+
+    def test_reset(self):
+        assert self._fires(Hook("session", "reset", "true"), [40, 10, 15, 100, 95]) == [
+            False, False, False, True, False
+        ]
+
+
+class TestHookRunner:
+    """Tests for HookRunner."""
+
+    def _wait_for(self, path):
+        deadline = time.monotonic() + 5
+        while not path.exists() or not path.read_text():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        return path.read_text()
+
+    def test_runs_command_with_environment(self, tmp_path):
+        out = tmp_path / "out"
+        hook = parse_hook_spec(f'session-below-20:echo "$CLAUDE_USAGE_TRIGGER $CLAUDE_USAGE_PERCENT" > {out}')
+        runner = HookRunner([hook], min_interval=0)
+
+        runner.observe(UsageSnapshot(session_percent=30))
+        started = runner.observe(UsageSnapshot(session_percent=12))
+
+        assert started == [hook]
+        assert self._wait_for(out) == "session-below-20 12\n"
+
+    def test_state_persists_across_runners(self):
+        hook = Hook("session", "below", "true", 20)
+
+        assert HookRunner([hook]).observe(UsageSnapshot(session_percent=30)) == []
+        assert HookRunner([hook]).observe(UsageSnapshot(session_percent=10)) == [hook]
+        assert HookRunner([hook]).observe(UsageSnapshot(session_percent=8)) == []
+
+    def test_rate_limited(self):
+        hook = Hook("session", "reset", "true")
+        runner = HookRunner([hook], min_interval=300)
+
+        runner.observe(UsageSnapshot(session_percent=10), now=1000)
+        assert runner.observe(UsageSnapshot(session_percent=90), now=1010) == [hook]
+        runner.observe(UsageSnapshot(session_percent=10), now=1020)
+        assert runner.observe(UsageSnapshot(session_percent=90), now=1030) == []
+
+    def test_slow_hook_does_not_block(self):
+        hook = Hook("session", "reset", "sleep 2")
+        runner = HookRunner([hook], min_interval=0)
+        runner.observe(UsageSnapshot(session_percent=10))
+
+        started = time.monotonic()
+        runner.observe(UsageSnapshot(session_percent=90))
+
+        assert time.monotonic() - started < 1
+        assert HookRunner.running() >= 1
+
+    def test_concurrency_cap(self, monkeypatch):
+        monkeypatch.setattr(hooks, "MAX_RUNNING", 0)
+        hook = Hook("session", "reset", "true")
+        runner = HookRunner([hook], min_interval=0)
+        runner.observe(UsageSnapshot(session_percent=10))
+
+        assert runner.observe(UsageSnapshot(session_percent=90)) == []
+
+    def test_error_snapshot_is_ignored(self):
+        hook = Hook("session", "below", "true", 20)
+        runner = HookRunner([hook])
+        runner.observe(UsageSnapshot(session_percent=30))
+
+        runner.observe(UsageSnapshot(error="boom"))
+
+        assert runner.observe(UsageSnapshot(session_percent=10)) == [hook]
@@ -0,0 +1,56 @@
+"""Tests for loadtest.py - the concurrent probe harness."""
+
+import os
+
+from claude_usage.loadtest import LoadReport, format_report, run_load, tagged_processes
+from claude_usage.probe import ProbeOptions
+
+
+class TestRunLoad:
+    """Tests for run_load against the fake claude."""
+
+    def test_healthy_fake(self):
+        options = ProbeOptions(timeout=5, status="cached")
+        report = run_load(4, 2, ["--frames", "20"], options, settle=0.5)
+
+        assert report.parsed == 4
+        assert report.errors == {}
+        assert report.output_bytes_mean > report.escape_sequences_mean > 0
+        assert report.latency_p50 <= report.latency_p99
+        assert report.clean
+
+    def test_hung_fake_is_killed(self):
+        report = run_load(
+            2, 2, ["--hang", "startup"], ProbeOptions(timeout=2, status="cached"), settle=0.5
+        )
+
+        assert report.parsed == 0
+        assert sum(report.errors.values()) == 2
+        assert report.leftover_processes == 0
+        assert report.clean
+
+    def test_restores_environment(self):
+        path = os.environ["PATH"]
+
+        run_load(1, 1, [], ProbeOptions(timeout=5, status="cached"), settle=0)
+
+        assert os.environ["PATH"] == path
+
+
+class TestAccounting:
+    """Tests for the leak accounting helpers."""
+
+    def test_untagged_run_finds_nothing(self):
+        assert tagged_processes("no-such-run") == []
+
+    def test_report_mentions_errors_and_leaks(self):
+        report = LoadReport(
+            probes=2, concurrency=1, wall_seconds=1.0, latency_p50=0.5, latency_p95=0.5,
+            latency_p99=0.5, throughput=2.0, parsed=1, partial=0,
+            errors={"RuntimeError: boom": 1}, zombies=1,
+        )
+
+        text = format_report(report)
+        assert "Error x1: RuntimeError: boom" in text
+        assert "1 zombies" in text
+        assert not report.clean
@@ -0,0 +1,91 @@
+"""Tests for memory.py - raw retention and memory diagnostics."""
+
+import tracemalloc
+
+import pytest
+
+from claude_usage.memory import (
+    HISTORY_SAMPLES,
+    MemoryMonitor,
+    RawRetention,
+    current_rss,
+    format_memory_report,
+)
+from claude_usage.models import UsageSnapshot
+
+
+def _snapshot(raw: str, percent: int | None = 50) -> UsageSnapshot:
+    return UsageSnapshot(session_percent=percent, raw_text=raw)
+
+
+class TestRawRetention:
+    """Tests for the --keep-raw policies."""
+
+    def test_none_drops_everything(self):
+        retention = RawRetention("none")
+
+        assert retention.retain(_snapshot("raw")).raw_text == ""
+        assert retention.retained() == []
+
+    def test_last_keeps_newest(self):
+        retention = RawRetention("last", keep=2)
+        snapshots = [retention.retain(_snapshot(f"raw {n}")) for n in range(3)]
+
+        assert [s.raw_text for s in snapshots] == ["", "raw 1", "raw 2"]
+        assert retention.retained_chars() == 10
+
+    def test_failed_keeps_parse_failures_only(self):
+        retention = RawRetention("failed", keep=1)
+
+        parsed = retention.retain(_snapshot("good"))
+        failed = retention.retain(_snapshot("bad", percent=None))
+
+        assert parsed.raw_text == ""
+        assert failed.raw_text == "bad"
+        assert retention.retained() == [failed]
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            RawRetention("all")
+
+    def test_negative_count(self):
+        with pytest.raises(ValueError):
+            RawRetention("last", keep=-1)
+
+
+class TestMemoryMonitor:
+    """Tests for MemoryMonitor."""
+
+    def test_history_stays_bounded_and_spans_lifetime(self):
+        monitor = MemoryMonitor()
+        for _ in range(HISTORY_SAMPLES * 4):
+            monitor.sample()
+
+        report = monitor.report()
+        assert len(report["rss_history"]) <= HISTORY_SAMPLES + 1
+        assert report["rss_history"][0][1] > 0
+
+    def test_observe_applies_retention(self):
+        monitor = MemoryMonitor(RawRetention("none"))
+
+        snapshot = monitor.observe(_snapshot("x" * 100))
+
+        assert snapshot.raw_text == ""
+        assert monitor.report()["buffers"]["last_capture_chars"] == 100
+
+    def test_report_with_tracing(self):
+        monitor = MemoryMonitor(trace=True)
+        try:
+            report = monitor.report(top=3)
+        finally:
+            tracemalloc.stop()
+
+        assert len(report["tracemalloc"]["top"]) <= 3
+        assert "Tracing:" in format_memory_report(report)
+
+    def test_format_without_tracing(self):
+        text = format_memory_report(MemoryMonitor().report())
+
+        assert "RSS:" in text
+        assert "--trace-memory" in text
+        assert current_rss() > 0
@@ -0,0 +1,184 @@
+"""Tests for metrics.py - Prometheus and OpenMetrics exporter."""
+
+import threading
+import urllib.request
+
+import pytest
+
+from claude_usage.metrics import (
+    OPENMETRICS_CONTENT_TYPE,
+    PROMETHEUS_CONTENT_TYPE,
+    ProbeStats,
+    format_metrics,
+    format_openmetrics,
+    make_server,
+    parse_listen_address,
+    record_probe,
+    write_textfile,
+)
+from claude_usage.models import CompactSnapshot
+from claude_usage.state import save_latest
+
+NOW = 1_767_088_800
+
+
+def _samples(text: str) -> dict[str, str]:
+    """Map sample names (with labels) to values, ignoring comments."""
+    return dict(
+        line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#")
+    )
+
+
+class TestFormatOpenmetrics:
+    """Tests for format_openmetrics function."""
+
+    def test_usage_gauges(self):
+        snapshot = CompactSnapshot(
+            session_percent=26,
+            weekly_percent=85,
+            opus_percent=5,
+            session_reset_at=NOW + 3600,
+            weekly_reset_at=NOW + 86400,
+            account_tier="Pro",
+            captured_at=NOW - 60,
+        )
+        samples = _samples(format_openmetrics(snapshot, ProbeStats(), now=NOW))
+
+        assert samples["claude_usage_session_percent"] == "26"
+        assert samples["claude_usage_weekly_percent"] == "85"
+        assert samples["claude_usage_opus_percent"] == "5"
+        assert samples["claude_usage_session_reset_seconds"] == "3600"
+        assert samples["claude_usage_weekly_reset_seconds"] == "86400"
+        assert samples["claude_usage_snapshot_timestamp_seconds"] == str(NOW - 60)
+        assert samples['claude_usage_account_info{tier="Pro"}'] == "1"
+
+    def test_counters_use_total_suffix(self):
+        stats = ProbeStats(probes_total=7, failures_total=2, duration_seconds_sum=30.5)
+        text = format_openmetrics(None, stats, now=NOW)
+        samples = _samples(text)
+
+        assert "# TYPE claude_usage_probes counter" in text
+        assert samples["claude_usage_probes_total"] == "7"
+        assert samples["claude_usage_probe_failures_total"] == "2"
+        assert samples["claude_usage_probe_duration_seconds_total"] == "30.5"
+
+    def test_missing_values_are_omitted(self):
+        samples = _samples(format_openmetrics(CompactSnapshot(session_percent=50), ProbeStats()))
+
+        assert "claude_usage_session_percent" in samples
+        assert "claude_usage_weekly_percent" not in samples
+        assert "claude_usage_session_reset_seconds" not in samples
+
+    def test_passed_reset_clamps_to_zero(self):
+        snapshot = CompactSnapshot(session_reset_at=NOW - 10)
+        samples = _samples(format_openmetrics(snapshot, ProbeStats(), now=NOW))
+        assert samples["claude_usage_session_reset_seconds"] == "0"
+
+    def test_ends_with_eof(self):
+        assert format_openmetrics(None, ProbeStats()).endswith("# EOF\n")
+
+
+class TestFormatMetrics:
+    """Tests for format_metrics in Prometheus text format 0.0.4."""
+
+    def test_exact_layout(self):
+        snapshot = CompactSnapshot(session_percent=26, account_tier="Pro", captured_at=NOW)
+        stats = ProbeStats(probes_total=7)
+
+        assert format_metrics(snapshot, stats, now=NOW).splitlines()[:8] == [
+            "# HELP claude_usage_session_percent Current session limit remaining.",
+            "# TYPE claude_usage_session_percent gauge",
+            "claude_usage_session_percent 26",
+            "# HELP claude_usage_snapshot_timestamp_seconds When the latest good snapshot was captured.",
+            "# TYPE claude_usage_snapshot_timestamp_seconds gauge",
+            f"claude_usage_snapshot_timestamp_seconds {NOW}",
+            "# HELP claude_usage_account_info Account of the latest snapshot.",
+            "# TYPE claude_usage_account_info gauge",
+        ]
+
+    def test_counters_are_typed_by_sample_name(self):
+        text = format_metrics(None, ProbeStats(probes_total=7))
+
+        assert "# TYPE claude_usage_probes_total counter\nclaude_usage_probes_total 7\n" in text
+
+    def test_has_only_help_and_type_comments(self):
+        text = format_metrics(CompactSnapshot(session_percent=50, account_tier="Max"), ProbeStats())
+        comments = [line.split(" ", 2)[1] for line in text.splitlines() if line.startswith("#")]
+
+        assert set(comments) == {"HELP", "TYPE"}
+        assert "info" not in text.split()
+
+
+class TestRecordProbe:
+    """Tests for record_probe function."""
+
+    def test_accumulates_across_loads(self):
+        record_probe(2.0, ok=True)
+        record_probe(3.0, ok=False)
+        stats = ProbeStats.load()
+
+        assert stats.probes_total == 2
+        assert stats.failures_total == 1
+        assert stats.duration_seconds_sum == 5.0
+        assert stats.last_duration_seconds == 3.0
+
+    def test_sums_output_bytes(self):
+        record_probe(1.0, ok=True, diagnostics={"output_bytes": 1000})
+        record_probe(1.0, ok=True, diagnostics={"output_bytes": 500})
+        text = format_openmetrics(None, ProbeStats.load())
+
+        assert _samples(text)["claude_usage_probe_output_bytes_total"] == "1500"
+
+
+class TestExport:
+    """Tests for the textfile and HTTP exporters."""
+
+    def test_write_textfile_uses_cached_snapshot(self, tmp_path):
+        save_latest(CompactSnapshot(session_percent=42, captured_at=NOW))
+        path = tmp_path / "claude.prom"
+
+        write_textfile(str(path))
+
+        text = path.read_text()
+        assert _samples(text)["claude_usage_session_percent"] == "42"
+        assert "# EOF" not in text
+
+    @pytest.mark.parametrize(
+        ("accept", "content_type"),
+        [
+            (None, PROMETHEUS_CONTENT_TYPE),
+            ("application/openmetrics-text;version=1.0.0,text/plain;q=0.5", OPENMETRICS_CONTENT_TYPE),
+        ],
+    )
+    def test_http_endpoint(self, accept, content_type):
+        save_latest(CompactSnapshot(weekly_percent=33, captured_at=NOW))
+        server = make_server("127.0.0.1", 0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            request = urllib.request.Request(url, headers={"Accept": accept} if accept else {})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                body = response.read().decode()
+                served_type = response.headers["Content-Type"]
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert served_type == content_type
+        assert body.endswith("# EOF\n") == (content_type == OPENMETRICS_CONTENT_TYPE)
+        assert _samples(body)["claude_usage_weekly_percent"] == "33"
+
+
+class TestParseListenAddress:
+    """Tests for parse_listen_address function."""
+
+    def test_port_only_binds_localhost(self):
+        assert parse_listen_address("9808") == ("127.0.0.1", 9808)
+
+    def test_host_and_port(self):
+        assert parse_listen_address("0.0.0.0:9000") == ("0.0.0.0", 9000)
+
+    def test_invalid_port_raises(self):
+        with pytest.raises(ValueError):
+            parse_listen_address("localhost:http")
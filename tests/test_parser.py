@@ -1,12 +1,17 @@
 """Tests for parser.py - parsing Claude CLI output."""
 
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
 from claude_usage.parser import (
     strip_ansi,
     extract_section_percent,
     extract_section_reset,
     extract_email,
     extract_account_tier,
+    parse_reset_time,
     parse_usage,
+    split_frames,
 )
 from claude_usage.models import UsageSnapshot
 
@@ -175,3 +180,98 @@ class TestParseUsage:
 
         assert result.session_percent == 50  # 100 - 50
         assert result.weekly_percent is None
+
+    def test_merges_separate_status_capture(self):
+        usage = """
+        Current session
+        █████ 20% used
+        """
+        status = "Login method: Claude Max Account\nEmail: user@example.com"
+
+        result = parse_usage(usage, status)
+
+        assert result.session_percent == 80
+        assert result.account_tier == "Max"
+        assert result.account_email == "user@example.com"
+        assert result.raw_text == usage + "\n" + status
+
+    def test_failed_status_capture_keeps_usage(self, sample_raw_output):
+        result = parse_usage(sample_raw_output, "")
+
+        assert result.session_percent == 26
+        assert result.account_tier == "Pro"
+
+
+class TestSplitFrames:
+    """Tests for split_frames and frame-aware parsing."""
+
+    @staticmethod
+    def _frame(used: int) -> str:
+        return f"\x1b[?2026h Current session\n ███ {used}% used\n Resets 4pm\n\x1b[?2026l"
+
+    def test_newest_frame_first(self):
+        frames = split_frames("a\x1b[?2026hb\x1b[?2026lc\x1b[?2026hd\x1b[?2026le")
+        assert frames == ["e", "d", "c", "b", "a"]
+
+    def test_unclosed_frame_comes_last(self):
+        frames = split_frames("a\x1b[?2026hb\x1b[?2026lc\x1b[?2026hpartial")
+        assert frames == ["c", "b", "a", "partial"]
+
+    def test_no_markers_is_one_frame(self):
+        assert split_frames("plain") == ["plain"]
+
+    def test_markers_without_escape(self):
+        assert split_frames("a[?2026hb[?2026l") == ["", "b", "a"]
+
+    def test_latest_frame_wins(self):
+        result = parse_usage(self._frame(10) + self._frame(40))
+        assert result.session_percent == 60
+
+    def test_half_rendered_frame_does_not_win(self):
+        raw = self._frame(40) + "\x1b[?2026h Current session\n ███ 9"
+        assert parse_usage(raw).session_percent == 60
+
+    def test_fields_from_older_frames(self):
+        account = "\x1b[?2026h Login method: Claude Max Account\n\x1b[?2026l"
+        result = parse_usage(account + self._frame(40))
+
+        assert result.session_percent == 60
+        assert result.account_tier == "Max"
+
+
+class TestParseResetTime:
+    """Tests for parse_reset_time function."""
+
+    NOW = datetime(2025, 12, 30, 8, 0, tzinfo=timezone.utc)
+
+    def test_time_only_resolves_to_next_occurrence(self):
+        result = parse_reset_time("4pm (Europe/Tallinn)", self.NOW)
+        assert result == datetime(2025, 12, 30, 16, 0, tzinfo=ZoneInfo("Europe/Tallinn"))
+
+    def test_time_already_passed_rolls_to_tomorrow(self):
+        result = parse_reset_time("9am (Europe/Tallinn)", self.NOW)
+        assert result == datetime(2025, 12, 31, 9, 0, tzinfo=ZoneInfo("Europe/Tallinn"))
+
+    def test_full_date_and_time(self):
+        result = parse_reset_time("Jan 1, 2026, 10:59am (Europe/Tallinn)", self.NOW)
+        assert result == datetime(2026, 1, 1, 10, 59, tzinfo=ZoneInfo("Europe/Tallinn"))
+
+    def test_date_without_time_is_midnight(self):
+        result = parse_reset_time("Jan 5, 2026", self.NOW)
+        assert result == datetime(2026, 1, 5, 0, 0, tzinfo=timezone.utc)
+
+    def test_date_without_year_rolls_forward(self):
+        result = parse_reset_time("Jan 5", self.NOW)
+        assert result.year == 2026
+
+    def test_12am_is_midnight(self):
+        result = parse_reset_time("12am", self.NOW)
+        assert (result.hour, result.minute) == (0, 0)
+
+    def test_unknown_timezone_falls_back(self):
+        result = parse_reset_time("4pm (Mars/Olympus)", self.NOW)
+        assert result == datetime(2025, 12, 30, 16, 0, tzinfo=timezone.utc)
+
+    def test_unrecognized_returns_none(self):
+        assert parse_reset_time("whenever", self.NOW) is None
+        assert parse_reset_time("", self.NOW) is None
@@ -0,0 +1,103 @@
+"""Tests for phases.py - learned per-phase probe deadlines."""
+
+import os
+
+from claude_usage.phases import (
+    DEADLINE_FACTOR,
+    MIN_DEADLINE,
+    MIN_SAMPLES,
+    SAMPLES_KEPT,
+    PhaseStat,
+    PhaseStats,
+    environment_key,
+    percentile,
+)
+
+
+class TestPercentile:
+    """Tests for the nearest-rank percentile."""
+
+    def test_nearest_rank(self):
+        samples = [float(n) for n in range(1, 101)]
+
+        assert percentile(samples, 99) == 99.0
+        assert percentile(samples, 50) == 50.0
+        assert percentile([3.0], 99) == 3.0
+
+
+class TestPhaseStat:
+    """Tests for one phase's latency history."""
+
+    def test_ewma_follows_samples(self):
+        stat = PhaseStat()
+        stat.record(2.0)
+        stat.record(4.0)
+
+        assert stat.ewma == 2.0 * 0.8 + 4.0 * 0.2
+
+    def test_keeps_recent_samples(self):
+        stat = PhaseStat()
+        for n in range(SAMPLES_KEPT + 10):
+            stat.record(float(n))
+
+        assert len(stat.samples) == SAMPLES_KEPT
+        assert stat.samples[0] == 10.0
+
+    def test_ceiling_until_enough_samples(self):
+        stat = PhaseStat(samples=[1.0] * (MIN_SAMPLES - 1))
+        assert stat.deadline(15) == 15
+
+    def test_learned_deadline(self):
+        stat = PhaseStat(samples=[2.0] * MIN_SAMPLES)
+        assert stat.deadline(15) == 2.0 * DEADLINE_FACTOR
+
+    def test_learned_deadline_is_bounded(self):
+        assert PhaseStat(samples=[0.1] * MIN_SAMPLES).deadline(15) == MIN_DEADLINE
+        assert PhaseStat(samples=[10.0] * MIN_SAMPLES).deadline(15) == 15
+
+
+class TestPhaseStats:
+    """Tests for persisted statistics."""
+
+    def test_round_trip(self):
+        stats = PhaseStats.load("host:/bin/claude@1")
+        stats.record({"startup": 1.5, "usage": 0.5})
+        stats.save()
+
+        loaded = PhaseStats.load("host:/bin/claude@1")
+        assert loaded.phases["startup"].samples == [1.5]
+        assert loaded.summary()["usage"] == {"ewma": 0.5, "p99": 0.5, "samples": 1}
+
+    def test_keys_are_separate(self):
+        stats = PhaseStats.load("host:/bin/claude@1")
+        stats.record({"startup": 1.5})
+        stats.save()
+
+        assert PhaseStats.load("host:/bin/claude@2").phases == {}
+
+    def test_only_recent_keys_kept(self):
+        for n in range(6):
+            stats = PhaseStats(f"key-{n}")
+            stats.record({"startup": 1.0})
+            stats.save()
+
+        assert PhaseStats.load("key-0").phases == {}
+        assert PhaseStats.load("key-5").phases != {}
+
+    def test_deadlines_per_phase(self):
+        stats = PhaseStats("key", {"startup": PhaseStat(samples=[3.0] * MIN_SAMPLES)})
+
+        assert stats.deadlines({"startup": 15, "exit": 5}) == {"startup": 6.0, "exit": 5}
+
+
+class TestEnvironmentKey:
+    """Tests for environment_key."""
+
+    def test_changes_with_binary(self, tmp_path):
+        binary = tmp_path / "claude"
+        binary.write_text("v1")
+        first = environment_key(str(binary))
+
+        os.utime(binary, (1, 1))
+        assert environment_key(str(binary)) != first
+        assert str(binary.resolve()) in first
@@ -0,0 +1,339 @@
+"""Tests for probe.py - child process setup and accounting (no Claude CLI needed)."""
+
+import codecs
+import contextlib
+import ctypes
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import pexpect
+import pytest
+
+from claude_usage import fakeclaude
+from claude_usage.parser import parse_usage
+from claude_usage.phases import MIN_SAMPLES
+from claude_usage.probe import (
+    READ_CHUNK,
+    SEARCH_WINDOW,
+    STATUS_TIMEOUT,
+    USAGE_PATTERNS,
+    DeadlineExceeded,
+    ProbeOptions,
+    ProbeResult,
+    MAX_CAPTURE,
+    _AccountedSpawn,
+    _CountingDecoder,
+    _TailBuffer,
+    _add_rusage,
+    _child_setup,
+    probe_usage,
+)
+
+REPORT_LIMITS = (
+    "import os, resource;"
+    "print(os.nice(0), resource.getrlimit(resource.RLIMIT_NOFILE)[0],"
+    " resource.getrlimit(resource.RLIMIT_CPU)[0])"
+)
+# How far past --deadline a probe may run: reaping the child, not waiting on it
+DEADLINE_SLACK = 0.3
+
+
+def _run_with_setup(options: ProbeOptions) -> list[int]:
+    """Run a child with the probe's preexec setup and return what it reports."""
+    result = subprocess.run(
+        [sys.executable, "-c", REPORT_LIMITS],
+        preexec_fn=_child_setup(options),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [int(value) for value in result.stdout.split()]
+
+
+class TestChildSetup:
+    """Tests for the preexec_fn built by _child_setup."""
+
+    def test_default_changes_nothing(self):
+        niceness, files, cpu = _run_with_setup(ProbeOptions())
+
+        assert niceness == os.nice(0)
+        assert files == resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+
+    def test_low_impact_raises_niceness(self):
+        niceness, _, _ = _run_with_setup(ProbeOptions(low_impact=True, nice=5))
+        assert niceness == min(19, os.nice(0) + 5)
+
+    def test_applies_limits(self):
+        _, files, cpu = _run_with_setup(ProbeOptions(max_open_files=64, max_cpu_seconds=30))
+
+        assert files == 64
+        assert cpu == 30
+
+
+    def test_low_impact_resolves_libc_before_fork(self, monkeypatch):
+        setup = _child_setup(ProbeOptions(low_impact=True, io_idle=True))
+
+        def no_dlopen(*args, **kwargs):
+            raise AssertionError("libc resolved in the child")
+
+        monkeypatch.setattr(ctypes, "CDLL", no_dlopen)
+        subprocess.run([sys.executable, "-c", "pass"], preexec_fn=setup, check=True)
+
+
+class TestAccountedSpawn:
+    """Tests for rusage collection on the spawned child."""
+
+    def test_records_rusage_after_exit(self):
+        child = _AccountedSpawn(sys.executable, ["-c", "x = bytearray(32 * 1024 * 1024)"])
+        child.expect(pexpect.EOF)
+        child.close()
+
+        assert child.exitstatus == 0
+        assert child.ptyproc.rusage is not None
+        assert child.ptyproc.rusage.ru_maxrss > 32 * 1024
+
+    def test_close_of_running_child_still_collects(self):
+        child = _AccountedSpawn(sys.executable, ["-c", "import time; time.sleep(30)"])
+        child.close(force=True)
+
+        assert child.signalstatus is not None
+        assert child.ptyproc.rusage is not None
+
+
+@pytest.fixture
+def fake_claude(tmp_path, monkeypatch):
+    """Put a fake claude on PATH; returns a function to (re)install it with delays."""
+
+    def install(status_delay: float = 0.0, usage_delay: float = 0.0, *extra: str) -> None:
+        fakeclaude.install(
+            tmp_path,
+            ["--status-delay", str(status_delay), "--usage-delay", str(usage_delay), *extra],
+        )
+
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    install()
+    return install
+
+
+class TestProbeUsage:
+    """Tests for probe_usage against a fake claude."""
+
+    def test_status_from_tab(self, fake_claude):
+        result = probe_usage(ProbeOptions(timeout=5))
+
+        assert "30% used" in result.output
+        assert "Login method: Claude Max Account" in result.status_output
+        assert result.missing_views == []
+
+    def test_help_hint_does_not_end_the_usage_wait(self, fake_claude):
+        # The hint drawn under the prompt is still unread when /usage is sent
+        fake_claude(usage_delay=1.5)
+
+        result = probe_usage(ProbeOptions(timeout=5))
+
+        assert result.missing_views == []
+        assert "30% used" in result.output
+
+    def test_status_in_parallel_session(self, fake_claude):
+        result = probe_usage(ProbeOptions(timeout=5, status="parallel"))
+
+        assert "30% used" in result.output
+        assert "Login method: Claude Max Account" in result.status_output
+        assert result.diagnostics["status"] == "parallel"
+        assert "status_error" not in result.diagnostics
+
+    def test_cached_status_skips_status_view(self, fake_claude):
+        result = probe_usage(ProbeOptions(timeout=5, status="cached"))
+
+        assert result.status_output is None
+        assert result.raw_text == result.output
+
+    def test_records_phase_latencies(self, fake_claude):
+        result = probe_usage(ProbeOptions(timeout=5))
+
+        phases = result.diagnostics["phases"]
+        assert set(phases) == {"startup", "usage", "status", "exit"}
+        assert phases["usage"]["samples"] == 1
+        assert phases["usage"]["deadline"] == 5
+
+    def test_adaptive_timeouts_use_learned_deadlines(self, fake_claude):
+        for _ in range(MIN_SAMPLES):
+            probe_usage(ProbeOptions(timeout=5, status="cached"))
+
+        result = probe_usage(ProbeOptions(timeout=5, status="cached", adaptive_timeouts=True))
+
+        assert "30% used" in result.output
+        assert result.diagnostics["phases"]["startup"]["deadline"] < 5
+        # Never observed: keeps the fixed wait
+        assert result.diagnostics["phases"]["status"]["deadline"] == STATUS_TIMEOUT
+
+
+class TestProfiles:
+    """Tests for probe profiles and output accounting."""
+
+    def test_counts_output(self, fake_claude):
+        diagnostics = probe_usage(ProbeOptions(timeout=5, status="cached")).diagnostics
+
+        assert diagnostics["profile"] == "default"
+        assert diagnostics["output_bytes"] >= diagnostics["output_chars"]
+        assert diagnostics["escape_sequences"] > 0
+        assert diagnostics["redraw_frames"] >= 2
+
+    def test_parallel_status_is_counted(self, fake_claude):
+        cached = probe_usage(ProbeOptions(timeout=5, status="cached")).diagnostics
+        parallel = probe_usage(ProbeOptions(timeout=5, status="parallel")).diagnostics
+
+        assert parallel["redraw_frames"] > cached["redraw_frames"]
+
+    def test_quiet_profile_reads_less_and_still_parses(self, fake_claude, tmp_path):
+        fakeclaude.install(tmp_path, ["--frames", "20"])
+        results = {
+            profile: probe_usage(ProbeOptions(timeout=5, status="cached", profile=profile))
+            for profile in ("default", "quiet")
+        }
+
+        default, quiet = (results[name].diagnostics for name in ("default", "quiet"))
+        assert quiet["output_bytes"] < default["output_bytes"]
+        assert quiet["escape_sequences"] < default["escape_sequences"]
+        assert parse_usage(results["quiet"].output).session_percent is not None
+
+    def test_frame_marker_split_across_reads(self):
+        decoder = _CountingDecoder(codecs.getincrementaldecoder("utf-8")())
+
+        text = decoder.decode(b"abc\x1b[?20") + decoder.decode(b"26hdef\x1b[?2026h")
+
+        assert text == "abc\x1b[?2026hdef\x1b[?2026h"
+        assert decoder.counts() == {"output_bytes": 22, "escape_sequences": 2, "redraw_frames": 2}
+
+
+class TestDeadline:
+    """Tests for the overall probe deadline."""
+
+    def test_returns_usage_when_status_runs_out_of_time(self, fake_claude):
+        fake_claude(status_delay=10)
+        started = time.monotonic()
+
+        result = probe_usage(ProbeOptions(timeout=15, deadline=4))
+
+        assert time.monotonic() - started < 5
+        assert "30% used" in result.output
+        assert result.missing_views == ["status"]
+        assert result.diagnostics["deadline_reached"] is True
+
+    def test_parallel_status_is_not_waited_for(self, fake_claude):
+        fake_claude(status_delay=10)
+        started = time.monotonic()
+
+        result = probe_usage(ProbeOptions(timeout=15, deadline=4, status="parallel"))
+
+        assert time.monotonic() - started < 5
+        assert "30% used" in result.output
+        assert result.missing_views == ["status"]
+
+    def test_fails_when_usage_never_rendered(self, fake_claude):
+        fake_claude(usage_delay=10)
+        started = time.monotonic()
+
+        with pytest.raises(RuntimeError, match="before the Usage view rendered"):
+            probe_usage(ProbeOptions(timeout=15, deadline=3))
+        assert time.monotonic() - started < 4
+
+    def test_deadline_during_startup(self, fake_claude):
+        fake_claude(0.0, 0.0, "--startup-delay", "10")
+
+        with pytest.raises(DeadlineExceeded, match="before Claude CLI started"):
+            probe_usage(ProbeOptions(timeout=15, deadline=2))
+
+    @pytest.mark.parametrize("phase", ["usage", "status", "exit"])
+    def test_hung_session_is_killed_at_the_deadline(self, fake_claude, phase):
+        # A hung session ignores /exit and polite signals; close() would wait them out
+        fake_claude(0.0, 0.0, "--hang", phase)
+        started = time.monotonic()
+
+        with contextlib.suppress(RuntimeError):
+            probe_usage(ProbeOptions(timeout=15, deadline=2))
+        assert time.monotonic() - started < 2 + DEADLINE_SLACK
+
+
+class TestProbeHelpers:
+    """Tests for ProbeResult and rusage merging."""
+
+    def test_raw_text_joins_views(self):
+        assert ProbeResult("usage", status_output="status").raw_text == "usage\nstatus"
+
+    def test_add_rusage(self):
+        first = resource.getrusage(resource.RUSAGE_SELF)
+        combined = _add_rusage(first, first)
+
+        assert combined.ru_utime == first.ru_utime * 2
+        assert combined.ru_maxrss == first.ru_maxrss
+        assert _add_rusage(None, first) is first
+
+
+class TestBoundedCapture:
+    """Tests for the capped output buffers."""
+
+    def test_tail_buffer_keeps_the_end(self):
+        buffer = _TailBuffer()
+        for n in range(3 * MAX_CAPTURE // 1000):
+            buffer.write(f"{n:04d}" + "x" * 996)
+
+        value = buffer.getvalue()
+        assert MAX_CAPTURE <= len(value) <= 2 * MAX_CAPTURE
+        assert value.endswith(f"{3 * MAX_CAPTURE // 1000 - 1:04d}" + "x" * 996)
+        assert buffer.tell() == len(value)
+
+    def test_before_is_bounded(self):
+        child = _AccountedSpawn(
+            sys.executable,
+            ["-c", "import sys; sys.stdout.write('x' * 3000000 + ' 42% used')"],
+            encoding="utf-8",
+            timeout=20,
+            maxread=READ_CHUNK,
+            searchwindowsize=SEARCH_WINDOW,
+        )
+        try:
+            child.expect(USAGE_PATTERNS)
+
+            assert child.after == "42% used"
+            assert len(child.before) <= 2 * MAX_CAPTURE
+        finally:
+            child.close(force=True)
+
+
+class TestBoundedMatching:
+    """Tests for the windowed expect patterns."""
+
+    # A redraw-heavy TUI: lots of frames, percentages that are not usage
+    NOISY_OUTPUT = (
+        "import sys\n"
+        "frame = '\\x1b[2K\\x1b[1A' * 20 + 'context 12% | tokens 34%\\n'\n"
+        "sys.stdout.write(frame * 40000)\n"
+        "sys.stdout.write(' Current session\\n ███ 42% used\\n')\n"
+    )
+
+    def test_finds_usage_after_long_output(self):
+        child = _AccountedSpawn(
+            sys.executable,
+            ["-c", self.NOISY_OUTPUT],
+            encoding="utf-8",
+            timeout=20,
+            maxread=READ_CHUNK,
+            searchwindowsize=SEARCH_WINDOW,
+        )
+        try:
+            index = child.expect(USAGE_PATTERNS)
+
+            assert index == 0
+            assert child.after == "42% used"
+            assert child.before.endswith(" Current session\r\n ███ ")
+        finally:
+            child.close(force=True)
+
+    def test_other_percentages_do_not_match(self):
+        assert not USAGE_PATTERNS[0].search("context 12% | tokens 34%")
+        assert USAGE_PATTERNS[0].search("26% used")
+        assert USAGE_PATTERNS[0].search("74 % remaining")
@@ -0,0 +1,110 @@
+"""Tests for shm.py - seqlocked shared snapshot file."""
+
+import struct
+import time
+
+import pytest
+
+from claude_usage.backends import BackendUnavailable, SharedMemoryBackend
+from claude_usage.models import CompactSnapshot, UsageSnapshot
+from claude_usage.shm import (
+    SHM_SIZE,
+    SharedSnapshotReader,
+    SharedSnapshotWriter,
+    read_shared,
+)
+
+SNAPSHOT = CompactSnapshot(session_percent=30, weekly_percent=80, account_tier="Max", captured_at=1000)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "snapshot.shm"
+
+
+class TestSharedSnapshot:
+    """Tests for SharedSnapshotWriter and SharedSnapshotReader."""
+
+    def test_round_trip(self, path):
+        writer = SharedSnapshotWriter(path)
+        writer.publish(SNAPSHOT)
+
+        assert read_shared(path) == SNAPSHOT
+        assert path.stat().st_size == SHM_SIZE
+
+    def test_reader_sees_later_publications(self, path):
+        writer = SharedSnapshotWriter(path)
+        writer.publish(SNAPSHOT)
+        reader = SharedSnapshotReader(path)
+
+        writer.publish(CompactSnapshot(session_percent=10, captured_at=2000))
+
+        assert reader.read().session_percent == 10
+
+    def test_nothing_published(self, path):
+        SharedSnapshotWriter(path)
+        assert read_shared(path) is None
+
+    def test_new_writer_keeps_previous_snapshot(self, path):
+        SharedSnapshotWriter(path).publish(SNAPSHOT)
+        SharedSnapshotWriter(path)
+
+        assert read_shared(path) == SNAPSHOT
+
+    def test_write_in_progress_is_not_read(self, path):
+        writer = SharedSnapshotWriter(path)
+        writer.publish(SNAPSHOT)
+        # Simulate a writer stuck mid-update: odd sequence counter
+        with open(path, "r+b") as f:
+            f.seek(8)
+            f.write(struct.pack("<Q", 3))
+
+        with pytest.raises(ValueError, match="kept changing"):
+            read_shared(path)
+
+    def test_reads_are_stamped_for_the_writer(self, path):
+        writer = SharedSnapshotWriter(path)
+        assert writer.last_read() is None
+
+        read_shared(path)
+
+        assert time.time() - writer.last_read() < 5
+
+    def test_not_a_shared_file(self, path):
+        path.write_bytes(b"x" * SHM_SIZE)
+        with pytest.raises(ValueError):
+            read_shared(path)
+
+    def test_missing_file(self, path):
+        with pytest.raises(OSError):
+            read_shared(path)
+
+
+class TestSharedMemoryBackend:
+    """Tests for SharedMemoryBackend."""
+
+    def test_fresh_snapshot(self, path):
+        SharedSnapshotWriter(path).publish_snapshot(UsageSnapshot(session_percent=45))
+
+        assert SharedMemoryBackend(path).fetch().session_percent == 45
+
+    def test_stale_snapshot_keeps_capture_time_and_marker(self, path):
+        stale = UsageSnapshot(session_percent=45, stale_reason="timed out", captured_at=1000)
+        SharedSnapshotWriter(path).publish_snapshot(stale)
+
+        shared = SharedSnapshotReader(path).read()
+        assert shared.captured_at == 1000
+        assert shared.stale
+        with pytest.raises(BackendUnavailable, match="too old"):
+            SharedMemoryBackend(path, max_age=60).fetch()
+        assert SharedMemoryBackend(path, max_age=float("inf")).fetch().stale_reason is not None
+
+    def test_stale_snapshot_is_unavailable(self, path):
+        SharedSnapshotWriter(path).publish(SNAPSHOT)
+
+        with pytest.raises(BackendUnavailable, match="too old"):
+            SharedMemoryBackend(path, max_age=60).fetch()
+
+    def test_missing_file_is_unavailable(self, path):
+        with pytest.raises(BackendUnavailable):
+            SharedMemoryBackend(path).fetch()
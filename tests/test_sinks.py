@@ -0,0 +1,113 @@
+"""Tests for sinks.py - output destinations."""
+
+import json
+import os
+
+import pytest
+
+from claude_usage.models import UsageSnapshot
+from claude_usage.sinks import Sink, emit, parse_output_spec, write_atomic, write_fifo
+
+
+class TestParseOutputSpec:
+    """Tests for parse_output_spec function."""
+
+    def test_format_only_goes_to_stdout(self):
+        assert parse_output_spec("waybar") == Sink("waybar", "-")
+
+    def test_format_and_path(self):
+        assert parse_output_spec("json:/tmp/usage.json") == Sink("json", "/tmp/usage.json")
+
+    def test_path_may_contain_colons(self):
+        assert parse_output_spec("plain:/tmp/a:b").destination == "/tmp/a:b"
+
+    def test_unknown_format_raises(self):
+        with pytest.raises(ValueError, match="unknown format"):
+            parse_output_spec("xml:/tmp/usage.xml")
+
+    def test_empty_destination_raises(self):
+        with pytest.raises(ValueError, match="missing destination"):
+            parse_output_spec("json:")
+
+    def test_streaming_format_only_to_stdout(self):
+        assert parse_output_spec("i3bar:-") == Sink("i3bar", "-")
+        with pytest.raises(ValueError, match="only go to stdout"):
+            parse_output_spec("i3bar:/tmp/bar.json")
+
+
+class TestWriteAtomic:
+    """Tests for write_atomic function."""
+
+    def test_replaces_contents(self, tmp_path):
+        path = tmp_path / "usage.json"
+        path.write_text("old")
+
+        write_atomic(str(path), "new")
+
+        assert path.read_text() == "new"
+
+    def test_leaves_no_temporary_files(self, tmp_path):
+        write_atomic(str(tmp_path / "usage.json"), "data")
+        assert os.listdir(tmp_path) == ["usage.json"]
+
+
+class TestWriteFifo:
+    """Tests for write_fifo function."""
+
+    def test_without_reader_is_skipped(self, tmp_path):
+        path = tmp_path / "usage.fifo"
+        os.mkfifo(path)
+
+        assert write_fifo(str(path), "data") is False
+
+    def test_with_reader_writes(self, tmp_path):
+        path = tmp_path / "usage.fifo"
+        os.mkfifo(path)
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            assert write_fifo(str(path), "data\n") is True
+            assert os.read(fd, 100) == b"data\n"
+        finally:
+            os.close(fd)
+
+
+class TestEmit:
+    """Tests for emit function."""
+
+    def test_writes_every_sink(self, tmp_path, capsys):
+        json_path = tmp_path / "usage.json"
+        plain_path = tmp_path / "usage.txt"
+        sinks = [
+            Sink("waybar"),
+            Sink("json", str(json_path)),
+            Sink("plain", str(plain_path)),
+        ]
+
+        errors = emit(UsageSnapshot(session_percent=42), sinks)
+
+        assert errors == []
+        assert json.loads(capsys.readouterr().out)["text"] == "42%"
+        assert json.loads(json_path.read_text())["session_percent"] == 42
+        assert plain_path.read_text() == "Session: 42%\n"
+
+    def test_failing_sink_does_not_stop_others(self, tmp_path):
+        good_path = tmp_path / "usage.txt"
+        sinks = [
+            Sink("plain", str(tmp_path / "missing" / "usage.txt")),
+            Sink("plain", str(good_path)),
+        ]
+
+        errors = emit(UsageSnapshot(session_percent=42), sinks)
+
+        assert len(errors) == 1
+        assert good_path.read_text() == "Session: 42%\n"
+
+    def test_fifo_destination(self, tmp_path):
+        path = tmp_path / "usage.fifo"
+        os.mkfifo(path)
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        try:
+            emit(UsageSnapshot(session_percent=42), [Sink("plain", str(path))])
+            assert os.read(fd, 100) == b"Session: 42%\n"
+        finally:
+            os.close(fd)
@@ -0,0 +1,43 @@
+"""Tests for state.py - on-disk state shared between runs."""
+
+import os
+import stat
+
+import pytest
+
+from claude_usage.state import runtime_dir
+
+
+@pytest.fixture
+def temp_fallback(tmp_path, monkeypatch):
+    """Make runtime_dir() use the temp dir fallback, under tmp_path."""
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr("tempfile.gettempdir", lambda: str(tmp_path))
+    return tmp_path / f"claudebar-{os.getuid()}"
+
+
+class TestRuntimeDir:
+    """Tests for runtime_dir function."""
+
+    def test_uses_xdg_runtime_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+        assert runtime_dir() == tmp_path / "claudebar"
+
+    def test_fallback_is_private(self, temp_fallback):
+        assert runtime_dir() == temp_fallback
+        assert stat.S_IMODE(temp_fallback.stat().st_mode) == 0o700
+
+    def test_rejects_shared_fallback(self, temp_fallback):
+        temp_fallback.mkdir(mode=0o777)
+        temp_fallback.chmod(0o777)
+
+        with pytest.raises(PermissionError):
+            runtime_dir()
+
+    def test_rejects_symlinked_fallback(self, temp_fallback, tmp_path):
+        target = tmp_path / "elsewhere"
+        target.mkdir(mode=0o700)
+        temp_fallback.symlink_to(target)
+
+        with pytest.raises(PermissionError):
+            runtime_dir()
@@ -0,0 +1,167 @@
+"""Tests for team.py - shared multi-host snapshot streams and their aggregation."""
+
+import json
+
+import pytest
+
+from claude_usage import team
+from claude_usage.models import CompactSnapshot
+from claude_usage.team import TeamIndex, TeamLog, format_team
+
+NOW = 1_767_000_000
+
+
+def _snapshot(at: int, session: int = 50, email: str | None = "a@example.com", **kwargs):
+    return CompactSnapshot(session_percent=session, account_email=email, captured_at=at, **kwargs)
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return tmp_path / "team"
+
+
+class TestTeamLog:
+    """Tests for TeamLog."""
+
+    def test_appends_one_line_per_snapshot(self, shared):
+        log = TeamLog(shared, "ws-1")
+        log.append(_snapshot(NOW))
+        segment = log.append(_snapshot(NOW + 60, raw_ref="/tmp/raw"))
+
+        lines = segment.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[1]) == {
+            **json.loads(lines[0]),
+            "captured_at": NOW + 60,
+        }
+        assert "raw_ref" not in json.loads(lines[1])
+
+    def test_host_name_is_made_path_safe(self, shared):
+        log = TeamLog(shared, "../ci/runner 1")
+        assert log.path.parent == shared
+
+    def test_rotates_and_prunes_segments(self, shared, monkeypatch):
+        monkeypatch.setattr(team, "SEGMENT_BYTES", 1)
+        log = TeamLog(shared, "ws-1")
+        for n in range(team.SEGMENTS_KEPT + 2):
+            log.append(_snapshot(NOW + n))
+
+        segments = log.segments()
+        assert len(segments) == team.SEGMENTS_KEPT
+        assert segments[-1].name == f"{NOW + team.SEGMENTS_KEPT + 1:012d}.ndjson"
+
+
+class TestTeamIndex:
+    """Tests for TeamIndex."""
+
+    def test_merges_hosts_in_capture_order(self, shared):
+        TeamLog(shared, "ws-1").append(_snapshot(NOW + 10))
+        TeamLog(shared, "ws-1").append(_snapshot(NOW + 30))
+        TeamLog(shared, "ci").append(_snapshot(NOW + 20, email="ci@example.com"))
+
+        merged = TeamIndex(shared).refresh()
+
+        assert [(r["host"], r["captured_at"]) for r in merged] == [
+            ("ws-1", NOW + 10),
+            ("ci", NOW + 20),
+            ("ws-1", NOW + 30),
+        ]
+
+    def test_refresh_reads_only_new_lines(self, shared):
+        log = TeamLog(shared, "ws-1")
+        log.append(_snapshot(NOW))
+        index = TeamIndex(shared)
+        index.refresh()
+
+        assert index.refresh() == []
+        log.append(_snapshot(NOW + 60, session=40))
+        assert [r["session_percent"] for r in index.refresh()] == [40]
+
+    def test_partial_line_waits_for_next_refresh(self, shared):
+        segment = TeamLog(shared, "ws-1").append(_snapshot(NOW))
+        line = segment.read_text()
+        with open(segment, "a") as f:
+            f.write(line[:10])
+        index = TeamIndex(shared)
+
+        assert len(index.refresh()) == 1
+        with open(segment, "a") as f:
+            f.write(line[10:].replace(str(NOW), str(NOW + 1)))
+        assert [r["captured_at"] for r in index.refresh()] == [NOW + 1]
+
+    def test_malformed_lines_are_skipped(self, shared):
+        segment = TeamLog(shared, "ws-1").append(_snapshot(NOW))
+        with open(segment, "a") as f:
+            f.write("not json\n")
+            f.write(json.dumps({"captured_at": NOW + 1, "session_percent": 5}) + "\n")
+            f.write(json.dumps([NOW]) + "\n")
+        index = TeamIndex(shared)
+
+        assert [r["captured_at"] for r in index.refresh()] == [NOW]
+        assert format_team(index.accounts(), "plain", now=NOW).endswith("ws-1, 0m ago")
+
+    def test_malformed_saved_records_are_dropped(self, shared):
+        index = TeamIndex(shared, {"latest": [{"captured_at": NOW}, "junk"]})
+        assert index.accounts() == []
+
+    def test_old_segments_are_sealed(self, shared, monkeypatch):
+        monkeypatch.setattr(team, "SEGMENT_BYTES", 1)
+        log = TeamLog(shared, "ws-1")
+        log.append(_snapshot(NOW))
+        log.append(_snapshot(NOW + 60))
+        index = TeamIndex(shared)
+        index.refresh()
+
+        first, second = (index.files[str(path)] for path in log.segments())
+        assert first["sealed"] and not second["sealed"]
+
+    def test_state_survives_save_and_load(self, shared):
+        TeamLog(shared, "ws-1").append(_snapshot(NOW))
+        index = TeamIndex(shared)
+        index.refresh()
+        index.save()
+
+        loaded = TeamIndex.load(shared)
+
+        assert loaded.refresh() == []
+        assert loaded.accounts()[0]["captured_at"] == NOW
+
+    def test_accounts_take_freshest_host(self, shared):
+        TeamLog(shared, "ws-1").append(_snapshot(NOW, session=60))
+        TeamLog(shared, "ws-2").append(_snapshot(NOW + 60, session=55))
+        TeamLog(shared, "ws-3").append(_snapshot(NOW + 120, error="Not logged in"))
+        TeamLog(shared, "ci").append(_snapshot(NOW, session=10, email="ci@example.com"))
+        index = TeamIndex(shared)
+        index.refresh()
+
+        rows = index.accounts()
+
+        assert [(r["account_email"], r["session_percent"]) for r in rows] == [
+            ("ci@example.com", 10),
+            ("a@example.com", 55),
+        ]
+        assert rows[1]["hosts"] == ["ws-1", "ws-2", "ws-3"]
+
+
+class TestFormatTeam:
+    """Tests for format_team()."""
+
+    def test_waybar_headline_is_lowest_account(self):
+        rows = [
+            {"host": "ci", "account_email": "ci@example.com", "session_percent": 10, "captured_at": NOW - 120},
+            {"host": "ws-1", "account_email": "a@example.com", "session_percent": 55, "captured_at": NOW},
+        ]
+
+        output = json.loads(format_team(rows, "waybar", now=NOW))
+
+        assert output["text"] == "10%"
+        assert output["class"] == "critical"
+        assert "ci@example.com · session 10% · ci, 2m ago" in output["tooltip"]
+
+    def test_empty(self):
+        assert format_team([], "plain") == "No team snapshots yet"
+        assert json.loads(format_team([], "waybar"))["text"] == "?"
+
+    def test_unsupported_format(self):
+        with pytest.raises(ValueError):
+            format_team([], "i3bar")
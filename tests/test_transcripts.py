@@ -0,0 +1,197 @@
+"""Tests for transcripts.py - local transcript usage estimation."""
+
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from claude_usage import transcripts
+from claude_usage.models import CompactSnapshot
+from claude_usage.transcripts import TranscriptIndex, calibrate, estimate
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc).timestamp()
+
+
+def _entry(timestamp: float, tokens: int, message_id: str | None, kind: str = "assistant") -> str:
+    """One transcript line with the given weighted token count (no ids if message_id is None)."""
+    entry = {
+        "type": kind,
+        "timestamp": datetime.fromtimestamp(timestamp, timezone.utc)
+        .isoformat()
+        .replace("+00:00", "Z"),
+        "requestId": f"req_{message_id}",
+        "message": {
+            "id": message_id,
+            "usage": {
+                "input_tokens": tokens,
+                "output_tokens": 0,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 1_000_000,
+            },
+        },
+    }
+    if message_id is None:
+        del entry["requestId"], entry["message"]["id"]
+    return json.dumps(entry)
+
+
+@pytest.fixture
+def projects(tmp_path):
+    """An empty transcripts root with one project directory."""
+    root = tmp_path / "projects"
+    (root / "-home-user-project").mkdir(parents=True)
+    return root
+
+
+def _append(path, *lines: str, newline: bool = True) -> None:
+    with open(path, "a") as f:
+        f.write("\n".join(lines) + ("\n" if newline else ""))
+
+
+class TestTranscriptIndex:
+    """Tests for TranscriptIndex."""
+
+    def test_counts_assistant_usage(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW - 60, 100, "a"), _entry(NOW - 30, 50, "b"))
+        index = TranscriptIndex(projects)
+
+        index.refresh(NOW)
+
+        assert index.tokens_between(NOW - 3600, NOW + 1) == 150
+
+    def test_ignores_other_entries_and_cache_reads(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW, 100, "a", kind="user"), "not json", '{"usage": 1}')
+        index = TranscriptIndex(projects)
+
+        index.refresh(NOW)
+
+        assert index.tokens_between(0, NOW + 1) == 0
+
+    def test_duplicate_entries_count_once(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW, 100, "a"), _entry(NOW, 100, "a"))
+        index = TranscriptIndex(projects)
+
+        index.refresh(NOW)
+
+        assert index.tokens_between(0, NOW + 1) == 100
+
+    def test_entries_without_ids_all_count(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW, 100, None), _entry(NOW, 50, None))
+        index = TranscriptIndex(projects)
+
+        index.refresh(NOW)
+
+        assert index.tokens_between(0, NOW + 1) == 150
+
+    def test_only_reads_appended_lines(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW, 100, "a"))
+        index = TranscriptIndex(projects)
+        first = index.refresh(NOW)
+
+        _append(path, _entry(NOW, 10, "b"))
+        second = index.refresh(NOW)
+
+        assert second < first
+        assert index.refresh(NOW) == 0
+        assert index.tokens_between(0, NOW + 1) == 110
+
+    def test_partial_line_waits_for_newline(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        line = _entry(NOW, 100, "a")
+        _append(path, line[:20], newline=False)
+        index = TranscriptIndex(projects)
+        index.refresh(NOW)
+
+        assert index.tokens_between(0, NOW + 1) == 0
+
+        _append(path, line[20:])
+        index.refresh(NOW)
+
+        assert index.tokens_between(0, NOW + 1) == 100
+
+    def test_truncated_file_is_reindexed(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW - 7200, 100, "a"), _entry(NOW - 7200, 100, "b"))
+        index = TranscriptIndex(projects)
+        index.refresh(NOW)
+
+        path.write_text(_entry(NOW, 5, "c") + "\n")
+        index.refresh(NOW)
+
+        assert index.tokens_between(NOW - 60, NOW + 1) == 5
+
+    def test_large_appends_use_mmap(self, projects, monkeypatch):
+        monkeypatch.setattr(transcripts, "MMAP_THRESHOLD", 1)
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW, 100, "a"))
+        index = TranscriptIndex(projects)
+        index.refresh(NOW)
+
+        _append(path, _entry(NOW, 7, "b"))
+        index.refresh(NOW)
+
+        assert index.tokens_between(0, NOW + 1) == 107
+
+    def test_old_buckets_are_pruned(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW - 30 * 86400, 100, "a"))
+        index = TranscriptIndex(projects)
+
+        index.refresh(NOW)
+
+        assert index.buckets == {}
+
+    def test_state_survives_save_and_load(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW, 100, "a"))
+        index = TranscriptIndex(projects)
+        index.refresh(NOW)
+        index.save()
+
+        restored = TranscriptIndex.load(projects)
+
+        assert restored.refresh(NOW) == 0
+        assert restored.tokens_between(0, NOW + 1) == 100
+
+
+class TestEstimate:
+    """Tests for calibrate and estimate."""
+
+    def test_no_calibration_returns_none(self, projects):
+        assert estimate(TranscriptIndex(projects), NOW) is None
+
+    def test_estimates_from_calibration(self, projects):
+        path = projects / "-home-user-project" / "session.jsonl"
+        _append(path, _entry(NOW - 600, 1000, "a"))
+        index = TranscriptIndex(projects)
+        index.refresh(NOW)
+        # 1000 tokens = 10% used -> 100 tokens per percent
+        calibrate(
+            index,
+            CompactSnapshot(
+                session_percent=90,
+                weekly_percent=98,
+                session_reset_at=int(NOW + 3600),
+                account_tier="Pro",
+                captured_at=int(NOW),
+            ),
+        )
+
+        _append(path, _entry(NOW + 60, 2000, "b"))
+        index.refresh(NOW + 120)
+        result = estimate(index, NOW + 120)
+
+        assert result.session_percent == 70
+        assert result.weekly_percent == 94
+        assert result.account_tier == "Pro"
+        assert result.session_reset is not None
+        assert result.diagnostics["source"] == "transcripts"
+
+    def test_unused_window_is_not_calibrated(self, projects):
+        calibrate(TranscriptIndex(projects), CompactSnapshot(session_percent=100, captured_at=int(NOW)))
+        assert estimate(TranscriptIndex(projects), NOW) is None
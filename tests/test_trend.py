@@ -0,0 +1,81 @@
+"""Tests for trend.py - bucketed usage history and the sparkline."""
+
+from claude_usage.models import UsageSnapshot
+from claude_usage.trend import SPARK_CHARS, TrendBuckets, record_trend, with_trend
+
+HOUR = 3600
+
+
+class TestTrendBuckets:
+    """Tests for TrendBuckets."""
+
+    def test_bucket_size_from_hours(self):
+        buckets = TrendBuckets.for_hours(12, width=24)
+
+        assert buckets.bucket_seconds == 1800
+        assert buckets.hours == 12
+
+    def test_samples_in_a_bucket_are_averaged(self):
+        buckets = TrendBuckets(bucket_seconds=HOUR, width=4)
+        buckets.add(100, None, 10 * HOUR)
+        buckets.add(0, None, 10 * HOUR + 60)
+
+        assert buckets.sparkline(10 * HOUR + 120) == "   " + SPARK_CHARS[4]
+
+    def test_sparkline_scrolls_with_time(self):
+        buckets = TrendBuckets(bucket_seconds=HOUR, width=4)
+        buckets.add(0, None, 10 * HOUR)
+        buckets.add(100, None, 11 * HOUR)
+
+        assert buckets.sparkline(11 * HOUR) == "  ▁█"
+        assert buckets.sparkline(13 * HOUR) == "▁█  "
+        assert buckets.sparkline(20 * HOUR) is None
+
+    def test_skipped_buckets_are_cleared(self):
+        buckets = TrendBuckets(bucket_seconds=HOUR, width=4)
+        buckets.add(100, None, 10 * HOUR)
+        # Same ring slot, one full window later
+        buckets.add(0, None, 14 * HOUR)
+
+        assert buckets.sparkline(14 * HOUR) == "   ▁"
+
+    def test_samples_older_than_window_are_ignored(self):
+        buckets = TrendBuckets(bucket_seconds=HOUR, width=4)
+        buckets.add(50, None, 10 * HOUR)
+        buckets.add(100, None, 2 * HOUR)
+
+        assert buckets.sparkline(10 * HOUR) == "   " + SPARK_CHARS[4]
+
+    def test_weekly_change(self):
+        buckets = TrendBuckets(bucket_seconds=HOUR, width=4)
+        buckets.add(None, 80, 10 * HOUR)
+        assert buckets.weekly_change(10 * HOUR) is None
+
+        buckets.add(None, 70, 12 * HOUR)
+        assert buckets.weekly_change(12 * HOUR) == -10
+
+
+class TestPersistence:
+    """Tests for record_trend/with_trend."""
+
+    def test_recorded_snapshots_show_up(self):
+        record_trend(UsageSnapshot(session_percent=90, weekly_percent=60), hours=12, at=1000 * HOUR)
+        record_trend(UsageSnapshot(session_percent=10, weekly_percent=50), hours=12, at=1005 * HOUR)
+
+        snapshot = with_trend(UsageSnapshot(session_percent=10), hours=12, now=1005 * HOUR)
+
+        assert snapshot.sparkline.rstrip().endswith("▁")
+        assert SPARK_CHARS[7] in snapshot.sparkline
+        assert snapshot.weekly_change == -10
+        assert snapshot.trend_hours == 12
+
+    def test_other_window_starts_afresh(self):
+        record_trend(UsageSnapshot(session_percent=90), hours=12, at=1000 * HOUR)
+
+        snapshot = with_trend(UsageSnapshot(session_percent=90), hours=6, now=1000 * HOUR)
+
+        assert snapshot.sparkline is None
+
+    def test_error_snapshot_untouched(self):
+        snapshot = with_trend(UsageSnapshot(error="boom"))
+        assert snapshot.trend_hours is None
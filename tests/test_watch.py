@@ -0,0 +1,120 @@
+"""Tests for watch.py - resident output loop."""
+
+import json
+import threading
+
+from claude_usage.models import UsageSnapshot
+from claude_usage.sinks import Sink
+from claude_usage.watch import StreamFraming, run_watch
+
+
+def _fetcher(snapshots: list[UsageSnapshot], stop: threading.Event):
+    """Return a fetch callable that yields snapshots, then stops the loop."""
+    remaining = list(snapshots)
+
+    def fetch() -> UsageSnapshot:
+        snapshot = remaining.pop(0)
+        if not remaining:
+            stop.set()
+        return snapshot
+
+    return fetch
+
+
+class TestStreamFraming:
+    """Tests for StreamFraming."""
+
+    def test_i3bar_header_then_commas(self):
+        framing = StreamFraming()
+        sink = Sink("i3bar")
+
+        first = framing.frame(sink, "[{}]")
+        framing.written(sink)
+        second = framing.frame(sink, "[{}]")
+
+        header, bracket, line = first.split("\n")
+        assert json.loads(header) == {"version": 1}
+        assert bracket == "["
+        assert line == "[{}]"
+        assert second == ",[{}]"
+
+    def test_header_repeats_until_written(self):
+        framing = StreamFraming()
+        sink = Sink("i3bar")
+
+        # The first write failed: the next one must still open the stream
+        framing.frame(sink, "[{}]")
+
+        assert framing.frame(sink, "[{}]").startswith('{"version": 1}')
+
+    def test_other_formats_pass_through(self):
+        framing = StreamFraming()
+        assert framing.frame(Sink("polybar"), "50%") == "50%"
+
+
+class TestRunWatch:
+    """Tests for run_watch function."""
+
+    def test_writes_only_on_change(self, capsys):
+        stop = threading.Event()
+        snapshots = [
+            UsageSnapshot(session_percent=50),
+            UsageSnapshot(session_percent=50),
+            UsageSnapshot(session_percent=40),
+        ]
+
+        run_watch(_fetcher(snapshots, stop), [Sink("plain")], interval=0, stop=stop)
+
+        assert capsys.readouterr().out == "Session: 50%\nSession: 40%\n"
+
+    def test_i3bar_stream(self, capsys):
+        stop = threading.Event()
+        snapshots = [UsageSnapshot(session_percent=50), UsageSnapshot(session_percent=40)]
+
+        run_watch(_fetcher(snapshots, stop), [Sink("i3bar")], interval=0, stop=stop)
+
+        lines = capsys.readouterr().out.splitlines()
+        assert json.loads(lines[0]) == {"version": 1}
+        assert lines[1] == "["
+        assert json.loads(lines[2])[0]["short_text"] == "50%"
+        assert lines[3].startswith(",")
+        assert json.loads(lines[3][1:])[0]["short_text"] == "40%"
+
+    def test_each_sink_tracked_separately(self, tmp_path, capsys):
+        stop = threading.Event()
+        path = tmp_path / "usage.txt"
+        snapshots = [UsageSnapshot(session_percent=50), UsageSnapshot(session_percent=50)]
+
+        run_watch(
+            _fetcher(snapshots, stop),
+            [Sink("tmux", str(path)), Sink("polybar")],
+            interval=0,
+            stop=stop,
+        )
+
+        assert path.read_text() == "#[fg=#f9e2af]50%#[default]\n"
+        assert capsys.readouterr().out == "%{F#f9e2af}50%%{F-}\n"
+
+    def test_unwritable_sink_keeps_running(self, tmp_path, capsys):
+        stop = threading.Event()
+        snapshots = [UsageSnapshot(session_percent=50), UsageSnapshot(session_percent=40)]
+
+        run_watch(
+            _fetcher(snapshots, stop),
+            [Sink("plain", str(tmp_path / "missing" / "usage.txt")), Sink("plain")],
+            interval=0,
+            stop=stop,
+        )
+
+        captured = capsys.readouterr()
+        assert captured.out == "Session: 50%\nSession: 40%\n"
+        assert "could not write" in captured.err
+
+    def test_custom_wait_between_fetches(self, capsys):
+        stop = threading.Event()
+        snapshots = [UsageSnapshot(session_percent=50), UsageSnapshot(session_percent=40)]
+        waits = []
+
+        run_watch(_fetcher(snapshots, stop), [Sink("plain")], interval=3600, stop=stop, wait=waits.append)
+
+        assert waits == [stop, stop]